@@ -0,0 +1,238 @@
+"""
+Admission control
+
+Requests are put in a priority class by route:
+
+    critical  probes, /metrics, JWKS          never limited
+    auth      login / register (password hashing)
+    write     other non-GET requests
+    read      GET / HEAD
+
+Each limited class has its own concurrency limit, so a login storm cannot
+starve reads and nothing can queue in front of the probes. Limits adapt by
+AIMD on observed latency: while requests finish under the class's latency
+target and the limit is in use, it grows by about one per limit's worth of
+requests; a slow request (or a deadline 504) cuts it by
+`backoff`, at most once per `decrease_cooldown`. A request over the limit
+waits in a short FIFO queue, bounded by the queue timeout and the request
+deadline; when the queue is full or the wait runs out it is rejected with
+AdmissionRejected, which the middleware turns into 503 + Retry-After.
+"""
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+
+import deadlines
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+CRITICAL = "critical"
+AUTH = "auth"
+WRITE = "write"
+READ = "read"
+
+CRITICAL_PREFIXES = ("/health", "/api/health", "/metrics", "/.well-known/")
+AUTH_PATHS = frozenset({
+    "/api/v1/auth/login",
+    "/api/v1/auth/register",
+    "/api/auth/login",
+    "/api/auth/register"
+})
+
+admission_limit = Gauge("admission_limit", "Current adaptive concurrency limit", ["priority"])
+admission_in_flight = Gauge("admission_in_flight", "Requests admitted and not yet finished", ["priority"])
+admission_queued = Gauge("admission_queued", "Requests waiting for a slot", ["priority"])
+admission_queue_wait = Histogram(
+    "admission_queue_wait_seconds",
+    "Time admitted requests waited for a slot",
+    ["priority"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+)
+admission_shed = Counter("admission_shed_total", "Requests rejected by admission control", ["priority", "reason"])
+
+class AdmissionRejected(Exception):
+    """Request shed; retry_after is a hint in seconds"""
+
+    def __init__(self, priority: str, reason: str, retry_after: int):
+        super().__init__(f"{priority} request shed ({reason})")
+        self.priority = priority
+        self.reason = reason
+        self.retry_after = retry_after
+
+def classify(method: str, path: str) -> str:
+    """Priority class of a request"""
+    if path.startswith(CRITICAL_PREFIXES):
+        return CRITICAL
+    if method == "POST" and path.rstrip("/") in AUTH_PATHS:
+        return AUTH
+    if method in ("GET", "HEAD", "OPTIONS"):
+        return READ
+    return WRITE
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit with a bounded FIFO wait queue"""
+
+    def __init__(
+        self,
+        name: str,
+        initial_limit: int,
+        latency_target: float,
+        min_limit: int = 1,
+        max_limit: Optional[int] = None,
+        max_queue: int = 50,
+        queue_timeout: float = 1.0,
+        backoff: float = 0.9,
+        decrease_cooldown: float = 1.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.limit = float(initial_limit)
+        self.latency_target = latency_target
+        self.min_limit = min_limit
+        self.max_limit = max_limit if max_limit is not None else initial_limit * 2
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.backoff = backoff
+        self.decrease_cooldown = decrease_cooldown
+        self._clock = clock
+        self.in_flight = 0
+        self.latency_ewma = latency_target / 2
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._last_decrease = -math.inf
+        self._update_gauges()
+
+    def retry_after(self) -> int:
+        """Rough time for the current backlog to drain"""
+        backlog = len(self._waiters) + 1
+        return max(1, math.ceil(self.latency_ewma * backlog / max(1.0, self.limit)))
+
+    def _reject(self, reason: str):
+        admission_shed.labels(priority=self.name, reason=reason).inc()
+        raise AdmissionRejected(self.name, reason, self.retry_after())
+
+    async def acquire(self):
+        """Take a slot, waiting in the queue if needed; raises AdmissionRejected"""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self._update_gauges()
+            return
+        if len(self._waiters) >= self.max_queue:
+            self._reject("queue_full")
+
+        left = deadlines.remaining()
+        timeout = self.queue_timeout if left is None else min(self.queue_timeout, left)
+        if timeout <= 0:
+            self._reject("timeout")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._update_gauges()
+        start = self._clock()
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            self._forget(waiter)
+            self._reject("timeout")
+        except asyncio.CancelledError:
+            # Client went away; give back a slot that was already handed over
+            if waiter.done() and not waiter.cancelled():
+                self.in_flight = max(0, self.in_flight - 1)
+                self._wake()
+            self._forget(waiter)
+            raise
+        admission_queue_wait.labels(priority=self.name).observe(self._clock() - start)
+
+    def _forget(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        self._update_gauges()
+
+    def release(self, latency: float, overloaded: bool = False):
+        """Return a slot and feed the request's latency into the limit"""
+        self.in_flight = max(0, self.in_flight - 1)
+        if latency > 0:
+            self.latency_ewma += 0.1 * (latency - self.latency_ewma)
+        self._adjust(latency, overloaded)
+        self._wake()
+        self._update_gauges()
+
+    def _adjust(self, latency: float, overloaded: bool):
+        now = self._clock()
+        if overloaded or latency > self.latency_target:
+            if now - self._last_decrease >= self.decrease_cooldown:
+                self._last_decrease = now
+                new_limit = max(float(self.min_limit), self.limit * self.backoff)
+                if int(new_limit) < int(self.limit):
+                    logger.info(f"Admission limit for {self.name} lowered to {int(new_limit)} (latency {latency:.3f}s)")
+                self.limit = new_limit
+        elif self.in_flight + 1 >= int(self.limit) or self._waiters:
+            # Only grow while the limit is what holds requests back
+            self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+
+    def _wake(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(True)
+
+    def _update_gauges(self):
+        admission_limit.labels(priority=self.name).set(int(self.limit))
+        admission_in_flight.labels(priority=self.name).set(self.in_flight)
+        admission_queued.labels(priority=self.name).set(len(self._waiters))
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "latency_target": self.latency_target,
+            "latency_ewma": round(self.latency_ewma, 4)
+        }
+
+class AdmissionController:
+    """One AdaptiveLimiter per limited priority class"""
+
+    def __init__(self, limiters: Dict[str, AdaptiveLimiter], enabled: bool = True):
+        self.limiters = limiters
+        self.enabled = enabled
+
+    def limiter_for(self, priority: str) -> Optional[AdaptiveLimiter]:
+        if not self.enabled:
+            return None
+        return self.limiters.get(priority)
+
+    def state(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "classes": {name: limiter.state() for name, limiter in self.limiters.items()}}
+
+def _build_controller() -> AdmissionController:
+    def limiter(name: str, initial: int, target: float) -> AdaptiveLimiter:
+        return AdaptiveLimiter(
+            name,
+            initial_limit=initial,
+            latency_target=target,
+            min_limit=max(1, initial // 10),
+            max_limit=initial * 2,
+            max_queue=settings.admission_queue_size,
+            queue_timeout=settings.admission_queue_timeout
+        )
+
+    return AdmissionController(
+        {
+            AUTH: limiter(AUTH, settings.admission_auth_limit, settings.admission_auth_latency_target),
+            WRITE: limiter(WRITE, settings.admission_write_limit, settings.admission_write_latency_target),
+            READ: limiter(READ, settings.admission_read_limit, settings.admission_read_latency_target)
+        },
+        enabled=settings.admission_control_enabled
+    )
+
+# Global instance
+admission_controller = _build_controller()
@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Request
+from sqlalchemy.orm import Session
+from typing import List
+import logging
+from database import get_db
+from models import User, ApiKey
+from schemas import ApiKeyCreate, ApiKeyCreateResponse, ApiKeyResponse, MessageResponse
+from auth import is_admin
+from csrf_protection import require_csrf_protection
+from api_keys import api_key_manager
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+@router.get("/", response_model=List[ApiKeyResponse])
+async def list_api_keys(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(is_admin)
+):
+    """List service-account API keys (Admin only, secrets are never returned)"""
+    return db.query(ApiKey).order_by(ApiKey.created_at.desc()).all()
+
+@router.post("/", response_model=ApiKeyCreateResponse)
+async def create_api_key(
+    key_data: ApiKeyCreate,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(is_admin),
+    _csrf: None = Depends(require_csrf_protection)
+):
+    """Create an API key for a service-account user (Admin only)"""
+    user = db.query(User).filter(User.id == key_data.user_id).first()
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    if not user.is_service_account:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="API keys can only be created for service accounts"
+        )
+    
+    full_key, record = api_key_manager.create_key(
+        db,
+        user,
+        name=key_data.name,
+        created_by=current_user.username,
+        expires_in_days=key_data.expires_in_days
+    )
+    
+    return ApiKeyCreateResponse(
+        message=f"API key {record.key_id} created for {user.username}",
+        api_key=full_key,
+        key=ApiKeyResponse.model_validate(record)
+    )
+
+@router.delete("/{key_id}", response_model=MessageResponse)
+async def revoke_api_key(
+    key_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(is_admin),
+    _csrf: None = Depends(require_csrf_protection)
+):
+    """Revoke an API key (Admin only)"""
+    if not api_key_manager.revoke_key(db, key_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="API key not found"
+        )
+    
+    logger.warning("API key revoked", extra={
+        "revoked_by": current_user.username,
+        "key_id": key_id
+    })
+    return MessageResponse(message="API key revoked")
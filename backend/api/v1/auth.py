@@ -1,18 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Request
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 import logging
-from database import get_db
+from typing import Any, Dict
+from database import get_db, unique_violation
 from models import User, Role
-from schemas import LoginRequest, LoginResponse, RegisterRequest, RegisterResponse, UserResponse
-from auth import create_access_token, create_refresh_token, verify_token, verify_password, get_password_hash, get_user_permissions
+from schemas import LoginRequest, LoginResponse, RegisterRequest, RegisterResponse
+from auth import create_access_token, create_refresh_token
+from serialization import json_response, user_response
+from password_utils import hash_password_async, verify_and_update_password_async
 from rate_limiter import check_auth_rate_limit, check_login_rate_limit, rate_limiter
 from security_monitor import security_monitor
 from csrf_protection import require_csrf_protection, csrf_protection
 from slowapi_limiter import limiter
-from sentry_config import capture_auth_error
+from sentry_config import capture_auth_error, capture_failed_login, set_user_context
 from telemetry import record_auth_attempt, record_active_user
 from config import settings
-import sentry_sdk
+from jwt_utils import jwt_manager
+from token_revocation import token_revocation
+from refresh_rotation import refresh_rotator, new_token_family, RefreshTokenReuseError, RefreshFamilyUnavailable
+from jose import JWTError
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -21,23 +28,8 @@ logger = logging.getLogger(__name__)
 @limiter.limit("5/minute")
 async def register(request: Request, register_data: RegisterRequest, db: Session = Depends(get_db), _: None = Depends(check_auth_rate_limit), _csrf: None = Depends(require_csrf_protection)):
     """Register a new user"""
-    # Check if user already exists
-    existing_user = db.query(User).filter(User.username == register_data.username).first()
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
-        )
-    
-    existing_email = db.query(User).filter(User.email == register_data.email).first()
-    if existing_email:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
     # Create new user with default role (if available)
-    hashed_password = get_password_hash(register_data.password)
+    hashed_password = await hash_password_async(register_data.password)
     db_user = User(
         username=register_data.username,
         email=register_data.email,
@@ -51,20 +43,22 @@ async def register(request: Request, register_data: RegisterRequest, db: Session
         db_user.role_id = default_role.id
     
     db.add(db_user)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        column = unique_violation(e, ("username", "email"))
+        if column is None:
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{column.capitalize()} already registered"
+        )
     db.refresh(db_user)
     
     return RegisterResponse(
         message="User registered successfully",
-        user=UserResponse(
-            id=db_user.id,
-            username=db_user.username,
-            email=db_user.email,
-            role=db_user.role.name if db_user.role else None,
-            permissions=get_user_permissions(db_user),
-            is_active=db_user.is_active,
-            created_at=db_user.created_at
-        )
+        user=user_response(db_user)
     )
 
 @router.post("/login", response_model=LoginResponse)
@@ -78,7 +72,10 @@ async def login(request: Request, login_data: LoginRequest, response: Response,
     })
     
     user = db.query(User).filter(User.username == login_data.username).first()
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    password_ok, new_hash = False, None
+    if user:
+        password_ok, new_hash = await verify_and_update_password_async(login_data.password, user.hashed_password)
+    if not user or not password_ok:
         # Record failed attempt for brute force protection
         client_ip = request.client.host if request.client else "unknown"
         rate_limiter.record_failed_login(request, login_data.username)
@@ -88,13 +85,7 @@ async def login(request: Request, login_data: LoginRequest, response: Response,
         record_auth_attempt(login_data.username, False)
         
         # Capture failed login in Sentry
-        with sentry_sdk.configure_scope() as scope:
-            scope.set_tag("event_type", "failed_login")
-            scope.set_context("login_attempt", {
-                "username": login_data.username,
-                "ip_address": client_ip
-            })
-            sentry_sdk.capture_message("Failed login attempt", level="warning")
+        capture_failed_login(login_data.username, client_ip)
         
         logger.warning("Failed login attempt", extra={
             "username": login_data.username,
@@ -112,8 +103,14 @@ async def login(request: Request, login_data: LoginRequest, response: Response,
             detail="User account is deactivated"
         )
     
+    if new_hash:
+        # Transparently upgrade legacy bcrypt or outdated argon2 hashes
+        user.hashed_password = new_hash
+        db.commit()
+        logger.info("Password hash upgraded", extra={"user_id": user.id})
+    
     access_token = create_access_token(data={"sub": user.username})
-    refresh_token = create_refresh_token(data={"sub": user.username})
+    refresh_token = create_refresh_token(data={"sub": user.username, "fam": new_token_family()})
     
     # Set HTTP-only cookies
     response.set_cookie(
@@ -144,11 +141,7 @@ async def login(request: Request, login_data: LoginRequest, response: Response,
     record_active_user("login")
     
     # Set user context in Sentry
-    sentry_sdk.set_user({
-        "id": user.id,
-        "username": user.username,
-        "role": user.role.name if user.role else None
-    })
+    set_user_context(user.id, user.username, user.role.name if user.role else None)
     
     logger.info("Successful login", extra={
         "user_id": user.id,
@@ -160,32 +153,38 @@ async def login(request: Request, login_data: LoginRequest, response: Response,
     return LoginResponse(
         access_token=access_token,
         token_type="bearer",
-        user=UserResponse(
-            id=user.id,
-            username=user.username,
-            email=user.email,
-            role=user.role.name if user.role else None,
-            permissions=get_user_permissions(user),
-            is_active=user.is_active,
-            created_at=user.created_at
-        )
+        user=user_response(user)
     )
 
 @router.post("/logout")
 @limiter.limit("10/minute")
 async def logout(request: Request, response: Response, _csrf: None = Depends(require_csrf_protection)):
-    """Logout user (clear cookies)"""
+    """Logout user (revoke tokens and clear cookies)"""
     # Record user logout in metrics
     record_active_user("logout")
     
+    # Revoke the presented tokens so copies of them stop working too
+    auth_header = request.headers.get("Authorization", "")
+    access_token = request.cookies.get("access_token") or (
+        auth_header[len("Bearer "):] if auth_header.startswith("Bearer ") else None
+    )
+    for token, token_type in ((access_token, "access"), (request.cookies.get("refresh_token"), "refresh")):
+        if not token:
+            continue
+        try:
+            payload = jwt_manager.validate_token(token, token_type)
+        except JWTError:
+            continue
+        await token_revocation.revoke(payload["jti"], payload["exp"])
+    
     response.delete_cookie(key="access_token")
     response.delete_cookie(key="refresh_token")
     return {"message": "Successfully logged out"}
 
 @router.post("/refresh", response_model=LoginResponse)
 @limiter.limit("10/minute")
-async def refresh_token(request: Request, response: Response, db: Session = Depends(get_db), _: None = Depends(check_auth_rate_limit), _csrf: None = Depends(require_csrf_protection)):
-    """Refresh access token using refresh token"""
+async def refresh_token(request: Request, db: Session = Depends(get_db), _: None = Depends(check_auth_rate_limit), _csrf: None = Depends(require_csrf_protection)):
+    """Refresh access token using refresh token (rotates the refresh token)"""
     refresh_token = request.cookies.get("refresh_token")
     if not refresh_token:
         raise HTTPException(
@@ -193,23 +192,41 @@ async def refresh_token(request: Request, response: Response, db: Session = Depe
             detail="Refresh token not found"
         )
     
-    username = verify_token(refresh_token, "refresh")
-    if not username:
+    try:
+        rotated = await refresh_rotator.rotate(refresh_token, db)
+    except RefreshTokenReuseError as e:
+        client_ip = request.client.host if request.client else "unknown"
+        security_monitor.log_refresh_token_reuse(client_ip, e.username)
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token reuse detected"
+        )
+    except RefreshFamilyUnavailable:
+        # Fails closed; the client keeps its refresh token and can retry
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Token refresh temporarily unavailable"
+        )
+    except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid refresh token"
         )
     
-    user = db.query(User).filter(User.username == username).first()
-    if not user or not user.is_active:
+    if rotated is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found or inactive"
         )
     
-    # Create new tokens
-    new_access_token = create_access_token(data={"sub": user.username})
-    new_refresh_token = create_refresh_token(data={"sub": user.username})
+    new_access_token = rotated["access_token"]
+    new_refresh_token = rotated["refresh_token"]
+    # The rotation result is already JSON-ready; serialize it once, unvalidated
+    response = json_response(Dict[str, Any], {
+        "access_token": new_access_token,
+        "token_type": "bearer",
+        "user": rotated["user"]
+    })
     
     # Set new HTTP-only cookies
     response.set_cookie(
@@ -230,16 +247,4 @@ async def refresh_token(request: Request, response: Response, db: Session = Depe
         max_age=settings.refresh_token_expire_days * 24 * 60 * 60
     )
     
-    return LoginResponse(
-        access_token=new_access_token,
-        token_type="bearer",
-        user=UserResponse(
-            id=user.id,
-            username=user.username,
-            email=user.email,
-            role=user.role.name if user.role else None,
-            permissions=get_user_permissions(user),
-            is_active=user.is_active,
-            created_at=user.created_at
-        )
-    )
\ No newline at end of file
+    return response
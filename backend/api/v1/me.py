@@ -1,19 +1,26 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
+from sqlalchemy.orm import Session
 from models import User
 from schemas import UserResponse
-from auth import get_current_user, get_user_permissions
+from auth import get_current_user_read
+from db_routing import get_read_db
+from etags import USERS, ROLES, PERMISSIONS, compute_etag, not_modified, cacheable
+from serialization import json_response, user_response
 
 router = APIRouter()
 
 @router.get("/", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
-    """Get current user information"""
-    return UserResponse(
-        id=current_user.id,
-        username=current_user.username,
-        email=current_user.email,
-        role=current_user.role.name if current_user.role else None,
-        permissions=get_user_permissions(current_user),
-        is_active=current_user.is_active,
-        created_at=current_user.created_at
-    )
\ No newline at end of file
+async def get_current_user_info(
+    request: Request,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(get_current_user_read)
+):
+    """Get current user information; conditional on If-None-Match"""
+    etag = compute_etag(db, request, [USERS, ROLES, PERMISSIONS], current_user.id)
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    # The user was loaded before the versions were read; reload so the body is
+    # never older than the ETag it is stored under
+    db.refresh(current_user)
+    return cacheable(json_response(UserResponse, user_response(current_user)), etag)
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from . import auth, users, me, csrf, token_info
+from . import auth, users, me, csrf, token_info, stats, api_keys, system
 
 # Create v1 API router
 v1_router = APIRouter(prefix="/v1")
@@ -9,4 +9,7 @@ v1_router.include_router(auth.router, prefix="/auth", tags=["Authentication"])
 v1_router.include_router(users.router, prefix="/users", tags=["Users"])
 v1_router.include_router(me.router, prefix="/me", tags=["Current User"])
 v1_router.include_router(csrf.router, prefix="/csrf", tags=["CSRF Protection"])
-v1_router.include_router(token_info.router, prefix="/token", tags=["Token Info"])
\ No newline at end of file
+v1_router.include_router(token_info.router, prefix="/token", tags=["Token Info"])
+v1_router.include_router(stats.router, prefix="/stats", tags=["Stats"])
+v1_router.include_router(api_keys.router, prefix="/api-keys", tags=["API Keys"])
+v1_router.include_router(system.router, prefix="/system", tags=["System"])
\ No newline at end of file
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from datetime import datetime
+from database import get_db
+from models import User
+from schemas import StatsResponse, EntityStatsResponse
+from auth import requires_permission
+from entity_stats import entity_stats, USERS, PERSONS
+
+router = APIRouter()
+
+@router.get("/", response_model=StatsResponse)
+async def get_stats(
+    estimate: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(requires_permission("user:read"))
+):
+    """
+    User and person totals by role and active state (requires user:read permission).
+    Served from maintained counters; estimate=true returns planner estimates without breakdowns.
+    """
+    if estimate:
+        estimates = entity_stats.get_estimates(db)
+        return StatsResponse(
+            users=EntityStatsResponse(total=estimates[USERS]),
+            persons=EntityStatsResponse(total=estimates[PERSONS]),
+            estimated=True,
+            generated_at=datetime.utcnow()
+        )
+    
+    counts = entity_stats.get_counts(db)
+    return StatsResponse(
+        users=EntityStatsResponse(**counts[USERS]),
+        persons=EntityStatsResponse(**counts[PERSONS]),
+        generated_at=datetime.utcnow()
+    )
@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, Query
+from typing import Any, Dict, Optional
+from models import User
+from auth import is_admin
+from monitoring.pool_metrics import pool_state
+from monitoring.slow_queries import slow_query_log
+from admission_control import admission_controller
+from startup import startup_report
+
+router = APIRouter()
+
+@router.get("/db-pool")
+async def get_db_pool_state(current_user: User = Depends(is_admin)) -> Dict[str, Any]:
+    """
+    Connection pool state of the worker that serves the request (Admin only).
+    Each worker process has its own pools; repeat the call to sample others.
+    """
+    return pool_state()
+
+@router.get("/slow-queries")
+async def get_slow_queries(
+    limit: int = Query(50, ge=1, le=500),
+    fingerprint: Optional[str] = None,
+    current_user: User = Depends(is_admin)
+) -> Dict[str, Any]:
+    """
+    Recent slow statements of the worker that serves the request, with
+    captured plans, plus a per-fingerprint summary of the buffer (Admin only)
+    """
+    return {
+        "threshold_ms": slow_query_log.threshold_ms,
+        "sample_rate": slow_query_log.sample_rate,
+        "summary": slow_query_log.summary(),
+        "entries": slow_query_log.recent(limit, fingerprint)
+    }
+
+@router.get("/admission")
+async def get_admission_state(current_user: User = Depends(is_admin)) -> Dict[str, Any]:
+    """Adaptive concurrency limits of the worker that serves the request (Admin only)"""
+    return admission_controller.state()
+
+@router.get("/startup")
+async def get_startup_report(current_user: User = Depends(is_admin)) -> Dict[str, Any]:
+    """Import and per-subsystem startup times of the worker that serves the request (Admin only)"""
+    return startup_report.summary()
@@ -1,62 +1,59 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List
 import logging
-from database import get_db
+from database import get_db, unique_violation
+from db_routing import get_read_db
 from models import User, Role
-from schemas import UserResponse, UserCreate, UserUpdate, UserCreateWithAutoPassword, UserCreateResponse
-from auth import requires_permission, get_password_hash, get_user_permissions
+from schemas import UserResponse, UserSparseResponse, UserCreate, UserUpdate, UserCreateWithAutoPassword, UserCreateResponse
+from auth import requires_permission, requires_read_permission
+from serialization import json_response, user_response
+from fieldsets import FieldSelection, user_selection, query_users
+from etags import USERS, ROLES, PERMISSIONS, compute_etag, not_modified, cacheable
 from csrf_protection import require_csrf_protection
 from password_security import password_security_manager
+from password_utils import hash_password_async
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
-@router.get("/", response_model=List[UserResponse])
+@router.get("/", response_model=List[UserSparseResponse])
 async def get_users(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(requires_permission("user:read"))
+    selection: FieldSelection = Depends(user_selection),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(requires_read_permission("user:read"))
 ):
-    """Get all users (requires user:read permission)"""
-    users = db.query(User).offset(skip).limit(limit).all()
-    return [
-        UserResponse(
-            id=user.id,
-            username=user.username,
-            email=user.email,
-            role=user.role.name if user.role else None,
-            permissions=get_user_permissions(user),
-            is_active=user.is_active,
-            created_at=user.created_at
-        )
-        for user in users
-    ]
+    """
+    Get all users (requires user:read permission); ?fields= / ?expand= select
+    what is returned; conditional on If-None-Match
+    """
+    etag = compute_etag(db, request, [USERS, ROLES, PERMISSIONS])
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    users = query_users(db, selection, skip=skip, limit=limit)
+    return cacheable(json_response(List[UserSparseResponse], users, exclude_unset=True), etag)
 
-@router.get("/{user_id}", response_model=UserResponse)
+@router.get("/{user_id}", response_model=UserSparseResponse)
 async def get_user(
     user_id: int,
+    selection: FieldSelection = Depends(user_selection),
     db: Session = Depends(get_db),
     current_user: User = Depends(requires_permission("user:read"))
 ):
-    """Get specific user by ID (requires user:read permission)"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
+    """Get specific user by ID (requires user:read permission); ?fields= / ?expand= select what is returned"""
+    users = query_users(db, selection, user_id=user_id, limit=1)
+    if not users:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    return UserResponse(
-        id=user.id,
-        username=user.username,
-        email=user.email,
-        role=user.role.name if user.role else None,
-        permissions=get_user_permissions(user),
-        is_active=user.is_active,
-        created_at=user.created_at
-    )
+    return json_response(UserSparseResponse, users[0], exclude_unset=True)
 
 @router.post("/", response_model=UserResponse)
 async def create_user(
@@ -73,27 +70,8 @@ async def create_user(
         "user_id": current_user.id
     })
     
-    # Check if user already exists
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
-    if existing_user:
-        logger.warning("User creation failed - username exists", extra={
-            "created_by": current_user.username,
-            "attempted_username": user_data.username
-        })
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
-        )
-    
-    existing_email = db.query(User).filter(User.email == user_data.email).first()
-    if existing_email:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
-    # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    # Create new user; the unique constraints on username/email reject duplicates
+    hashed_password = await hash_password_async(user_data.password)
     db_user = User(
         username=user_data.username,
         email=user_data.email,
@@ -102,7 +80,22 @@ async def create_user(
     )
     
     db.add(db_user)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        column = unique_violation(e, ("username", "email"))
+        if column is None:
+            raise
+        if column == "username":
+            logger.warning("User creation failed - username exists", extra={
+                "created_by": current_user.username,
+                "attempted_username": user_data.username
+            })
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{column.capitalize()} already registered"
+        )
     db.refresh(db_user)
     
     logger.info("User created successfully", extra={
@@ -112,15 +105,7 @@ async def create_user(
         "role_id": db_user.role_id
     })
     
-    return UserResponse(
-        id=db_user.id,
-        username=db_user.username,
-        email=db_user.email,
-        role=db_user.role.name if db_user.role else None,
-        permissions=get_user_permissions(db_user),
-        is_active=db_user.is_active,
-        created_at=db_user.created_at
-    )
+    return user_response(db_user)
 
 @router.put("/{user_id}", response_model=UserResponse)
 async def update_user(
@@ -140,24 +125,11 @@ async def update_user(
         )
     
     # Update fields if provided
+    # Username/email uniqueness is enforced by the constraints at commit
     if user_data.username is not None:
-        # Check if username is already taken
-        existing_user = db.query(User).filter(User.username == user_data.username, User.id != user_id).first()
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already taken"
-            )
         user.username = user_data.username
     
     if user_data.email is not None:
-        # Check if email is already taken
-        existing_email = db.query(User).filter(User.email == user_data.email, User.id != user_id).first()
-        if existing_email:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already taken"
-            )
         user.email = user_data.email
     
     if user_data.role_id is not None:
@@ -173,18 +145,23 @@ async def update_user(
     if user_data.is_active is not None:
         user.is_active = user_data.is_active
     
-    db.commit()
+    if user_data.is_service_account is not None:
+        user.is_service_account = user_data.is_service_account
+    
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        column = unique_violation(e, ("username", "email"))
+        if column is None:
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{column.capitalize()} already taken"
+        )
     db.refresh(user)
     
-    return UserResponse(
-        id=user.id,
-        username=user.username,
-        email=user.email,
-        role=user.role.name if user.role else None,
-        permissions=get_user_permissions(user),
-        is_active=user.is_active,
-        created_at=user.created_at
-    )
+    return user_response(user)
 
 @router.delete("/{user_id}")
 async def delete_user(
@@ -12,7 +12,8 @@ def create_api_info() -> Dict[str, Any]:
             "v1": {
                 "auth": "/api/v1/auth",
                 "users": "/api/v1/users", 
-                "me": "/api/v1/me"
+                "me": "/api/v1/me",
+                "stats": "/api/v1/stats"
             }
         },
         "legacy_endpoints": {
@@ -0,0 +1,209 @@
+"""
+Service-account API keys
+
+Keys look like ``sk_<key_id>_<secret>``. The key id is a public, unique
+prefix used to find the stored record with an index lookup; the secret is
+checked against a keyed HMAC-SHA256 with a constant-time comparison, which
+costs microseconds instead of a bcrypt/argon2 verification. Verified keys
+are cached per worker for api_key_cache_ttl seconds (revocations in the same
+worker take effect immediately, other workers within the TTL). Last-used
+timestamps are buffered in memory and written in batches.
+
+Only users flagged is_service_account can hold keys. The owning user is
+loaded on every request, so unflagging or deactivating it disables its keys
+at once, cached or not.
+
+Clients send ``Authorization: ApiKey sk_...`` or ``X-API-Key: sk_...``.
+"""
+import asyncio
+import hashlib
+import hmac
+import logging
+import secrets
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from fastapi import Request
+from sqlalchemy import bindparam, update
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal
+from models import ApiKey, User
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "sk"
+
+def _hmac_secret() -> bytes:
+    return (settings.api_key_hmac_secret or settings.secret_key).encode()
+
+def hash_api_key_secret(secret: str) -> str:
+    """Keyed HMAC-SHA256 of an API key secret"""
+    return hmac.new(_hmac_secret(), secret.encode(), hashlib.sha256).hexdigest()
+
+def generate_api_key() -> Tuple[str, str, str]:
+    """
+    Generate a new API key.
+
+    Returns:
+        Tuple of (full_key, key_id, secret_hash); the full key is shown once
+    """
+    key_id = secrets.token_hex(6)
+    secret = secrets.token_urlsafe(32)
+    return f"{KEY_PREFIX}_{key_id}_{secret}", key_id, hash_api_key_secret(secret)
+
+def parse_api_key(api_key: str) -> Optional[Tuple[str, str]]:
+    """Split a full key into (key_id, secret)"""
+    parts = api_key.split("_", 2)
+    if len(parts) != 3 or parts[0] != KEY_PREFIX or not parts[1] or not parts[2]:
+        return None
+    return parts[1], parts[2]
+
+def extract_api_key(request: Request) -> Optional[str]:
+    """Get the API key from the Authorization (ApiKey scheme) or X-API-Key header"""
+    auth_header = request.headers.get("Authorization")
+    if auth_header and auth_header.startswith("ApiKey "):
+        return auth_header[len("ApiKey "):].strip()
+    return request.headers.get("X-API-Key")
+
+class ApiKeyUsageRecorder:
+    """Buffers last-used timestamps and writes them in batches"""
+
+    def __init__(self, flush_interval: int = None):
+        self.flush_interval = flush_interval or settings.api_key_usage_flush_interval
+        self._pending: Dict[str, datetime] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def touch(self, key_id: str):
+        """Record a use of a key (in memory only)"""
+        self._pending[key_id] = datetime.now(timezone.utc)
+
+    def flush(self) -> int:
+        """Write buffered timestamps with one executemany UPDATE"""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        db = SessionLocal()
+        try:
+            table = ApiKey.__table__
+            db.execute(
+                update(table)
+                .where(table.c.key_id == bindparam("b_key_id"))
+                .values(last_used_at=bindparam("b_last_used_at")),
+                [{"b_key_id": key_id, "b_last_used_at": used_at} for key_id, used_at in pending.items()]
+            )
+            db.commit()
+            return len(pending)
+        except Exception as e:
+            db.rollback()
+            # Keep newer timestamps recorded meanwhile, re-queue the rest
+            for key_id, used_at in pending.items():
+                self._pending.setdefault(key_id, used_at)
+            logger.error(f"Failed to write API key usage: {e}")
+            return 0
+        finally:
+            db.close()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await asyncio.to_thread(self.flush)
+
+    async def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush loop and write what is left"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+class ApiKeyManager:
+    """Creates, verifies and revokes API keys"""
+
+    def __init__(self, cache_ttl: int = None):
+        self.cache_ttl = cache_ttl if cache_ttl is not None else settings.api_key_cache_ttl
+        # key_id -> (secret_hash, user_id, cache expiry, key expiry timestamp or None)
+        self._verified: Dict[str, Tuple[str, int, float, Optional[float]]] = {}
+
+    def create_key(self, db: Session, user: User, name: str, created_by: str, expires_in_days: Optional[int] = None) -> Tuple[str, ApiKey]:
+        """Create a key for a service-account user; returns (full_key, record)"""
+        if not user.is_service_account:
+            raise ValueError(f"{user.username} is not a service account")
+        full_key, key_id, secret_hash = generate_api_key()
+        record = ApiKey(
+            key_id=key_id,
+            secret_hash=secret_hash,
+            name=name,
+            user_id=user.id,
+            created_by=created_by,
+            expires_at=datetime.now(timezone.utc) + timedelta(days=expires_in_days) if expires_in_days else None
+        )
+        db.add(record)
+        db.commit()
+        db.refresh(record)
+        logger.info("API key created", extra={"user_id": user.id, "key_id": key_id})
+        return full_key, record
+
+    def revoke_key(self, db: Session, key_id: str) -> bool:
+        """Revoke a key; returns False if it does not exist"""
+        record = db.query(ApiKey).filter(ApiKey.key_id == key_id).first()
+        if record is None:
+            return False
+        if record.revoked_at is None:
+            record.revoked_at = datetime.now(timezone.utc)
+            db.commit()
+        self._verified.pop(key_id, None)
+        logger.warning("API key revoked", extra={"key_id": key_id})
+        return True
+
+    def authenticate(self, api_key: str, db: Session) -> Optional[User]:
+        """Return the service-account user for a valid key, else None"""
+        parsed = parse_api_key(api_key)
+        if not parsed:
+            return None
+        key_id, secret = parsed
+        presented_hash = hash_api_key_secret(secret)
+        now = time.time()
+
+        cached = self._verified.get(key_id)
+        if cached and cached[2] > now and (cached[3] is None or cached[3] > now):
+            if not hmac.compare_digest(presented_hash, cached[0]):
+                return None
+            user_id = cached[1]
+        else:
+            record = db.query(ApiKey).filter(ApiKey.key_id == key_id, ApiKey.revoked_at.is_(None)).first()
+            if record is None or not hmac.compare_digest(presented_hash, record.secret_hash):
+                return None
+            key_expiry = _timestamp(record.expires_at)
+            if key_expiry is not None and key_expiry <= now:
+                return None
+            user_id = record.user_id
+            self._verified[key_id] = (record.secret_hash, user_id, now + self.cache_ttl, key_expiry)
+
+        user = db.get(User, user_id)
+        if user is None or not user.is_active or not user.is_service_account:
+            self._verified.pop(key_id, None)
+            return None
+
+        api_key_usage.touch(key_id)
+        return user
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+# Global instances
+api_key_usage = ApiKeyUsageRecorder()
+api_key_manager = ApiKeyManager()
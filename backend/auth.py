@@ -3,20 +3,19 @@ from typing import Optional, List
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 from functools import wraps
 from database import get_db
+from db_routing import get_read_db
 from models import User, Role, Permission
 from config import settings
 from jwt_utils import jwt_manager
+from password_utils import pwd_context
+from api_keys import api_key_manager, extract_api_key
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # JWT token handling
 security = HTTPBearer()
 
@@ -57,6 +56,11 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    # Service accounts authenticate with an API key instead of a JWT
+    api_key = extract_api_key(request)
+    if api_key:
+        return authenticate_api_key(api_key, db)
+    
     # Get username from validated JWT payload (set by middleware)
     username = getattr(request.state, 'username', None)
     if not username:
@@ -80,6 +84,13 @@ def get_current_user(
     
     return user
 
+def get_current_user_read(
+    request: Request,
+    db: Session = Depends(get_read_db)
+) -> User:
+    """get_current_user for read-only endpoints (user loaded from a read replica when available)"""
+    return get_current_user(request, db)
+
 def get_current_user_from_header(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     db: Session = Depends(get_db)
@@ -112,9 +123,14 @@ def get_current_user_fallback(
     db: Session = Depends(get_db)
 ) -> User:
     """
-    Fallback authentication function that tries cookie first, then header.
+    Fallback authentication function that tries an API key, then cookie, then header.
     This provides backward compatibility while supporting cookie-based auth.
     """
+    # Service-account API key (machine clients, no login round trip)
+    api_key = extract_api_key(request)
+    if api_key:
+        return authenticate_api_key(api_key, db)
+    
     # Try to get token from cookie first (preferred for web app)
     token = request.cookies.get("access_token")
     
@@ -149,6 +165,20 @@ def get_current_user_fallback(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+def authenticate_api_key(api_key: str, db: Session) -> User:
+    """
+    Authenticate a service account by API key.
+    Raises 401 for unknown, revoked or expired keys.
+    """
+    user = api_key_manager.authenticate(api_key, db)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid API key",
+            headers={"WWW-Authenticate": "ApiKey"},
+        )
+    return user
+
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -169,25 +199,38 @@ def requires_role(required_role: str):
         return current_user
     return role_checker
 
+def _check_permission(user: User, required_permission: str) -> User:
+    if not user.role:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User has no role assigned"
+        )
+    
+    user_permissions = [perm.name for perm in user.role.permissions]
+    if required_permission not in user_permissions:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"Access denied. Required permission: {required_permission}"
+        )
+    return user
+
 def requires_permission(required_permission: str):
     """
     Dependency that checks if the current user has the required permission.
     Usage: @requires_permission("user:read")
     """
     def permission_checker(current_user: User = Depends(get_current_active_user)):
-        if not current_user.role:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="User has no role assigned"
-            )
-        
-        user_permissions = [perm.name for perm in current_user.role.permissions]
-        if required_permission not in user_permissions:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail=f"Access denied. Required permission: {required_permission}"
-            )
-        return current_user
+        return _check_permission(current_user, required_permission)
+    return permission_checker
+
+def requires_read_permission(required_permission: str):
+    """
+    requires_permission for read-only endpoints: the user, role and permissions
+    are loaded through get_read_db (a replica when available), like the rest
+    of the request, instead of from the primary.
+    """
+    def permission_checker(current_user: User = Depends(get_current_user_read)):
+        return _check_permission(get_current_active_user(current_user), required_permission)
     return permission_checker
 
 def requires_any_role(required_roles: List[str]):
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+CPU per request of the user list response, before and after serialization.py
+
+Builds --users User rows in memory (with roles and permissions, no database)
+and renders the GET /api/v1/users/ body --requests times per path:
+
+    validated  handler builds UserResponse(...) per row, FastAPI validates the
+               list against response_model again and renders with JSONResponse
+               (the previous path)
+    orjson     the same, rendered with ORJSONResponse (the app's default
+               response class; still validates twice)
+    direct     user_response() rows serialized once by the cached TypeAdapter
+               (json_response, what the read endpoints return now)
+
+CPU is process time per request; the bodies are checked to decode to the
+same JSON. Nothing is written anywhere:
+
+    python benchmark_serialization.py --users 1000 --requests 200
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timezone
+from typing import Callable, List
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from models import Permission, Role, User
+from schemas import UserResponse
+from serialization import json_response, user_response
+
+def make_users(count: int) -> List[User]:
+    permissions = [Permission(id=i, name=f"resource{i}:read") for i in range(1, 9)]
+    roles = [
+        Role(id=1, name="admin", permissions=permissions),
+        Role(id=2, name="user", permissions=permissions[:2])
+    ]
+    created_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        User(
+            id=i,
+            username=f"user{i:05d}",
+            email=f"user{i:05d}@example.com",
+            role=roles[0] if i % 10 == 0 else roles[1],
+            is_active=True,
+            created_at=created_at
+        )
+        for i in range(1, count + 1)
+    ]
+
+def validated_path(response_class) -> Callable[[List[User]], bytes]:
+    # What FastAPI builds for response_model=List[UserResponse]
+    field = create_model_field("Response_get_users", List[UserResponse], mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    def render(users: List[User]) -> bytes:
+        content = [
+            UserResponse(
+                id=user.id,
+                username=user.username,
+                email=user.email,
+                role=user.role.name if user.role else None,
+                permissions=[perm.name for perm in user.role.permissions],
+                is_active=user.is_active,
+                created_at=user.created_at
+            )
+            for user in users
+        ]
+        serialized = loop.run_until_complete(serialize_response(field=field, response_content=content, is_coroutine=True))
+        return response_class(serialized).body
+    return render
+
+def direct_path(users: List[User]) -> bytes:
+    return json_response(List[UserResponse], [user_response(user) for user in users]).body
+
+PATHS = {
+    "validated": validated_path(JSONResponse),
+    "orjson": validated_path(ORJSONResponse),
+    "direct": direct_path
+}
+
+def measure(render: Callable[[List[User]], bytes], users: List[User], requests: int):
+    render(users)  # build adapters / validators outside the timing
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for _ in range(requests):
+        body = render(users)
+    cpu = (time.process_time() - cpu_start) / requests
+    wall = (time.perf_counter() - wall_start) / requests
+    return cpu, wall, body
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark user list response serialization")
+    parser.add_argument("--users", type=int, default=1000, help="Rows per response")
+    parser.add_argument("--requests", type=int, default=200, help="Responses rendered per path")
+    parser.add_argument("--path", action="append", choices=sorted(PATHS), help="Path to run (repeatable; default all)")
+    args = parser.parse_args()
+
+    users = make_users(args.users)
+    results = {}
+    for name in args.path or list(PATHS):
+        cpu, wall, body = measure(PATHS[name], users, args.requests)
+        results[name] = (cpu, json.loads(body))
+        print(f"{name:10} cpu {cpu * 1000:7.2f}ms/request  wall {wall * 1000:7.2f}ms  {len(body):,} bytes")
+
+    bodies = [body for _, body in results.values()]
+    if any(body != bodies[0] for body in bodies[1:]):
+        raise SystemExit("response bodies differ between paths")
+    if "validated" in results:
+        baseline = results["validated"][0]
+        for name, (cpu, _) in results.items():
+            if name != "validated":
+                print(f"{name}: {baseline / cpu:.1f}x less CPU than validated")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Compare server launches: memory per worker and throughput
+
+Starts the app once per launch mode on a scratch port, waits for /health,
+drives it with keep-alive HTTP clients for --duration seconds and then reads
+/proc/<pid>/smaps_rollup of every process in the tree:
+
+    uvicorn  `uvicorn main:app --workers N` (the previous Dockerfile command;
+             each worker imports the app itself)
+    serve    `python serve.py --workers N` (preloaded app, gc.freeze(),
+             uvloop + httptools)
+
+RSS counts shared pages in every process; PSS splits them between the
+processes sharing them, so total PSS is the memory the launch really costs.
+Linux only. Use a scratch DATABASE_URL, e.g.:
+
+    DATABASE_URL=sqlite:///bench_server.db python benchmark_server.py --workers 4
+"""
+
+import argparse
+import http.client
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List
+
+# SecurityMiddleware blocks clients without a user agent
+HEADERS = {"User-Agent": "benchmark-server/1.0"}
+
+LAUNCHES = {
+    "uvicorn": lambda port, workers: [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+                                      "--port", str(port), "--workers", str(workers)],
+    "serve": lambda port, workers: [sys.executable, "serve.py", "--workers", str(workers)]
+}
+
+def wait_ready(port: int, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            connection.request("GET", "/health", headers=HEADERS)
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"server on port {port} did not become ready")
+
+def process_tree(root: int) -> List[int]:
+    """root and all its descendants"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # ppid is the 2nd field after the parenthesised command
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    tree, pending = [], [root]
+    while pending:
+        pid = pending.pop()
+        tree.append(pid)
+        pending.extend(children.get(pid, []))
+    return tree
+
+def memory(pid: int) -> Dict[str, int]:
+    """Rss / Pss / private (USS) in KiB"""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                values[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss": values.get("Rss", 0),
+        "pss": values.get("Pss", 0),
+        "uss": values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)
+    }
+
+def client(port: int, path: str, deadline: float, latencies: List[float], errors: List[str]):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            connection.request("GET", path, headers=HEADERS)
+            response = connection.getresponse()
+            response.read()
+            if response.status >= 500:
+                errors.append(str(response.status))
+            latencies.append(time.perf_counter() - start)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    connection.close()
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000
+
+def run(mode: str, port: int, workers: int, clients: int, duration: float, path: str):
+    env = dict(os.environ, SERVER_HOST="127.0.0.1", SERVER_PORT=str(port))
+    server = subprocess.Popen(LAUNCHES[mode](port, workers), env=env, stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL, start_new_session=True)
+    try:
+        wait_ready(port)
+        latencies: List[float] = []
+        errors: List[str] = []
+        deadline = time.perf_counter() + duration
+        threads = [threading.Thread(target=client, args=(port, path, deadline, latencies, errors)) for _ in range(clients)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        processes = {}
+        for pid in process_tree(server.pid):
+            try:
+                processes[pid] = memory(pid)
+            except OSError:
+                pass
+    finally:
+        os.killpg(server.pid, signal.SIGTERM)
+        server.wait(timeout=30)
+
+    print(f"\n{mode}: {workers} workers, {clients} clients, GET {path}")
+    print(f"  {len(latencies) / duration:,.0f} req/s, {len(errors)} errors"
+          + (f" ({', '.join(sorted(set(errors)))})" if errors else "")
+          + f"  p50 {percentile(latencies, 0.5):.2f}ms  "
+          f"p99 {percentile(latencies, 0.99):.2f}ms  mean {statistics.mean(latencies or [0]) * 1000:.2f}ms")
+    for pid, usage in processes.items():
+        role = "parent" if pid == server.pid else "child"
+        print(f"  {role:6} {pid:>7}  rss {usage['rss'] / 1024:7.1f} MiB  pss {usage['pss'] / 1024:7.1f} MiB  "
+              f"uss {usage['uss'] / 1024:7.1f} MiB")
+    print(f"  total  rss {sum(u['rss'] for u in processes.values()) / 1024:.1f} MiB  "
+          f"pss {sum(u['pss'] for u in processes.values()) / 1024:.1f} MiB")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory and throughput of server launch modes")
+    parser.add_argument("--mode", action="append", choices=sorted(LAUNCHES), help="Launch mode (repeatable; default both)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent keep-alive connections")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load per mode")
+    parser.add_argument("--path", default="/health")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    for mode in args.mode or ["uvicorn", "serve"]:
+        run(mode, args.port, args.workers, args.clients, args.duration, args.path)
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,50 @@
 from fastapi_cache import FastAPICache
 from fastapi_cache.backends.redis import RedisBackend
 from fastapi_cache.decorator import cache
-import redis.asyncio as redis
+import redis
+import redis.asyncio as aioredis
 from typing import Optional
 import logging
 from config import settings
+from circuit_breaker import CircuitBreaker
 
 logger = logging.getLogger(__name__)
 
+# Shared breaker for every consumer of the Redis server
+redis_breaker = CircuitBreaker(
+    "redis",
+    failure_rate_threshold=settings.redis_breaker_failure_rate,
+    minimum_calls=settings.redis_breaker_min_calls,
+    window_seconds=settings.redis_breaker_window_seconds,
+    open_seconds=settings.redis_breaker_open_seconds,
+    call_timeout=settings.redis_socket_timeout
+)
+
+_sync_client: Optional[redis.Redis] = None
+
+def redis_client_options() -> dict:
+    """Connection options shared by all Redis clients"""
+    return {
+        "password": settings.redis_password,
+        "socket_timeout": settings.redis_socket_timeout,
+        "socket_connect_timeout": settings.redis_connect_timeout,
+        "decode_responses": True
+    }
+
+def create_async_redis_client(db: Optional[int] = None) -> aioredis.Redis:
+    """Create an asyncio Redis client with bounded socket timeouts"""
+    options = redis_client_options()
+    if db is not None:
+        options["db"] = db
+    return aioredis.from_url(settings.redis_url, **options)
+
+def get_redis_client() -> redis.Redis:
+    """Get the shared synchronous Redis client"""
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = redis.from_url(settings.redis_url, **redis_client_options())
+    return _sync_client
+
 class CacheConfig:
     def __init__(self):
         self.redis_client = None
@@ -16,11 +53,7 @@ class CacheConfig:
     async def init_cache(self):
         """Initialize Redis cache"""
         try:
-            self.redis_client = redis.from_url(
-                settings.redis_url,
-                password=settings.redis_password,
-                decode_responses=True
-            )
+            self.redis_client = create_async_redis_client()
             
             backend = RedisBackend(self.redis_client)
             FastAPICache.init(backend, prefix="saas-cache")
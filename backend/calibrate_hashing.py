@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Calibrate argon2id parameters for this machine
+
+Benchmarks password verification and picks the largest cost that keeps the
+median verify time under the target latency within the memory budget.
+Memory cost is preferred over time cost (it is what makes argon2 expensive
+for attackers), so the search starts at the memory budget and only lowers it
+when a single pass is already too slow. Run it on each instance type and put
+the printed values into the environment / .env.
+
+Usage:
+    python calibrate_hashing.py --target-ms 250 --max-memory-mib 64
+"""
+
+import argparse
+import os
+import statistics
+import time
+from typing import Dict, List
+
+from argon2 import PasswordHasher
+from argon2.low_level import Type
+
+SAMPLE_PASSWORD = "Calibration-Passw0rd!"
+
+def measure_verify_ms(time_cost: int, memory_cost: int, parallelism: int, rounds: int) -> Dict[str, float]:
+    """Median and p95 verify latency in milliseconds for one parameter set"""
+    hasher = PasswordHasher(
+        time_cost=time_cost,
+        memory_cost=memory_cost,
+        parallelism=parallelism,
+        type=Type.ID
+    )
+    encoded = hasher.hash(SAMPLE_PASSWORD)
+    timings: List[float] = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        hasher.verify(encoded, SAMPLE_PASSWORD)
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        "median": statistics.median(timings),
+        "p95": timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    }
+
+def calibrate(target_ms: float, max_memory_kib: int, parallelism: int, rounds: int, max_time_cost: int = 10) -> Dict[str, float]:
+    """Find the strongest parameters with a median verify time under target_ms"""
+    memory_cost = max_memory_kib
+    min_memory_kib = 8 * parallelism  # argon2 lower bound
+
+    while memory_cost >= min_memory_kib:
+        best = None
+        for time_cost in range(1, max_time_cost + 1):
+            timing = measure_verify_ms(time_cost, memory_cost, parallelism, rounds)
+            print(f"  t={time_cost} m={memory_cost // 1024}MiB p={parallelism}: "
+                  f"median {timing['median']:.1f}ms, p95 {timing['p95']:.1f}ms")
+            if timing["median"] > target_ms:
+                break
+            best = {"time_cost": time_cost, "memory_cost": memory_cost, "parallelism": parallelism, **timing}
+        if best:
+            return best
+        memory_cost //= 2
+
+    raise SystemExit(f"No argon2id parameters reach a {target_ms}ms verify time on this machine")
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate argon2id password hashing cost")
+    parser.add_argument("--target-ms", type=float, default=250, help="Target median verify latency (default 250ms)")
+    parser.add_argument("--max-memory-mib", type=int, default=64, help="Memory budget per hash in MiB (default 64)")
+    parser.add_argument("--parallelism", type=int, default=min(4, os.cpu_count() or 1), help="Lanes per hash")
+    parser.add_argument("--rounds", type=int, default=10, help="Verifications per measurement")
+    args = parser.parse_args()
+
+    print(f"Calibrating argon2id on {os.cpu_count()} CPUs: target {args.target_ms}ms, "
+          f"memory budget {args.max_memory_mib}MiB")
+    result = calibrate(args.target_ms, args.max_memory_mib * 1024, args.parallelism, args.rounds)
+
+    print()
+    print(f"Selected: median {result['median']:.1f}ms, p95 {result['p95']:.1f}ms per verify")
+    print("Add to the environment:")
+    print(f"PASSWORD_ARGON2_TIME_COST={result['time_cost']}")
+    print(f"PASSWORD_ARGON2_MEMORY_COST={result['memory_cost']}")
+    print(f"PASSWORD_ARGON2_PARALLELISM={result['parallelism']}")
+
+if __name__ == "__main__":
+    main()
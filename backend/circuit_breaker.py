@@ -0,0 +1,213 @@
+"""
+Circuit breaker for the shared Redis client
+
+The breaker tracks the outcome of every Redis call in a rolling time window.
+Once enough calls have been made and the failure rate crosses the threshold
+the circuit opens and calls are rejected immediately with CircuitOpenError,
+so requests no longer wait for the socket timeout of a stalled server.
+After the open period a limited number of probe calls are let through
+(half-open); a successful probe closes the circuit, a failed one re-opens it.
+
+Degraded modes of the Redis consumers while the circuit is open:
+    - cache (middleware/cache_middleware.py): reads miss and writes are skipped,
+      so every request falls through to the database.
+    - sessions (middleware/session_middleware.py): sessions seen recently are
+      served from a short-lived per-worker cache; unknown sessions get a 503.
+    - rate limiting (slowapi_limiter.py): slowapi switches to in-memory
+      counters per worker; rate_limiter.py is always in-memory.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Awaitable, Callable, Deque, Optional, Tuple
+from prometheus_client import Counter, Gauge
+import deadlines
+
+logger = logging.getLogger(__name__)
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+# Numeric encoding used by the state gauge
+STATE_VALUES = {
+    CircuitState.CLOSED: 0,
+    CircuitState.HALF_OPEN: 1,
+    CircuitState.OPEN: 2,
+}
+
+circuit_state_gauge = Gauge(
+    'circuit_breaker_state',
+    'Circuit breaker state (0=closed, 1=half_open, 2=open)',
+    ['name']
+)
+
+circuit_transitions = Counter(
+    'circuit_breaker_transitions_total',
+    'Circuit breaker state transitions',
+    ['name', 'state']
+)
+
+circuit_rejections = Counter(
+    'circuit_breaker_rejected_calls_total',
+    'Calls rejected because the circuit was open',
+    ['name']
+)
+
+circuit_failures = Counter(
+    'circuit_breaker_failures_total',
+    'Calls that failed or timed out through the circuit breaker',
+    ['name']
+)
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the circuit is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"Circuit '{name}' is open")
+        self.name = name
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """Failure-rate circuit breaker with half-open probing"""
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        minimum_calls: int = 10,
+        window_seconds: float = 30,
+        open_seconds: float = 15,
+        half_open_max_calls: int = 1,
+        call_timeout: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.minimum_calls = minimum_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+        self.call_timeout = call_timeout
+        self._clock = clock
+        self._calls: Deque[Tuple[float, bool]] = deque()
+        self._state = CircuitState.CLOSED
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+        circuit_state_gauge.labels(name=name).set(STATE_VALUES[self._state])
+
+    @property
+    def state(self) -> CircuitState:
+        """Current state; an expired open period moves the circuit to half-open"""
+        if self._state == CircuitState.OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._transition(CircuitState.HALF_OPEN)
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Return True if a call may be attempted now"""
+        state = self.state
+        if state == CircuitState.CLOSED:
+            return True
+        if state == CircuitState.HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls:
+            self._half_open_in_flight += 1
+            return True
+        circuit_rejections.labels(name=self.name).inc()
+        return False
+
+    def record_success(self):
+        """Record a successful call"""
+        if self._state == CircuitState.HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+            self._transition(CircuitState.CLOSED)
+            return
+        self._record(True)
+
+    def record_failure(self):
+        """Record a failed call, opening the circuit if the threshold is crossed"""
+        circuit_failures.labels(name=self.name).inc()
+        if self._state == CircuitState.HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+            self._transition(CircuitState.OPEN)
+            return
+        self._record(False)
+        if self._state == CircuitState.CLOSED and self._failure_rate_exceeded():
+            self._transition(CircuitState.OPEN)
+
+    def retry_after(self) -> float:
+        """Seconds until the next probe is allowed"""
+        if self._state != CircuitState.OPEN:
+            return 0.0
+        return max(0.0, self.open_seconds - (self._clock() - self._opened_at))
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Run an async call through the breaker, bounded by call_timeout and the request deadline"""
+        if not self.allow_request():
+            raise CircuitOpenError(self.name, self.retry_after())
+
+        try:
+            timeout = deadlines.timeout(self.call_timeout, self.name)
+        except deadlines.DeadlineExceeded:
+            self._release_probe()
+            raise
+        cut_by_deadline = timeout is not None and timeout != self.call_timeout
+        try:
+            if timeout:
+                result = await asyncio.wait_for(func(*args, **kwargs), timeout)
+            else:
+                result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            # The caller went away; the outcome says nothing about Redis
+            self._release_probe()
+            raise
+        except asyncio.TimeoutError:
+            if cut_by_deadline:
+                # The request's deadline, not Redis, ran out
+                self._release_probe()
+                raise deadlines.DeadlineExceeded(self.name) from None
+            self.record_failure()
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+
+        self.record_success()
+        return result
+
+    def _release_probe(self):
+        if self._state == CircuitState.HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+
+    def reset(self):
+        """Force the circuit closed and forget the call history"""
+        self._transition(CircuitState.CLOSED)
+
+    def _record(self, success: bool):
+        now = self._clock()
+        self._calls.append((now, success))
+        while self._calls and self._calls[0][0] < now - self.window_seconds:
+            self._calls.popleft()
+
+    def _failure_rate_exceeded(self) -> bool:
+        if len(self._calls) < self.minimum_calls:
+            return False
+        failures = sum(1 for _, success in self._calls if not success)
+        return failures / len(self._calls) >= self.failure_rate_threshold
+
+    def _transition(self, new_state: CircuitState):
+        if new_state == self._state and new_state != CircuitState.CLOSED:
+            return
+        old_state = self._state
+        self._state = new_state
+        self._half_open_in_flight = 0
+        if new_state == CircuitState.OPEN:
+            self._opened_at = self._clock()
+        if new_state == CircuitState.CLOSED:
+            self._calls.clear()
+        circuit_state_gauge.labels(name=self.name).set(STATE_VALUES[new_state])
+        if old_state != new_state:
+            circuit_transitions.labels(name=self.name, state=new_state.value).inc()
+            log = logger.warning if new_state == CircuitState.OPEN else logger.info
+            log(f"Circuit '{self.name}' {old_state.value} -> {new_state.value}")
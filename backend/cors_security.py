@@ -71,9 +71,10 @@ def get_cors_config(environment: str, allowed_origins: List[str]) -> dict:
                 "Accept",
                 "Origin",
                 "X-Requested-With",
-                "Cache-Control"
+                "Cache-Control",
+                "If-None-Match"
             ],
-            "expose_headers": ["Content-Length", "Content-Type"],
+            "expose_headers": ["Content-Length", "Content-Type", "ETag"],
         }
     else:
         return {
@@ -81,4 +82,5 @@ def get_cors_config(environment: str, allowed_origins: List[str]) -> dict:
             "allow_origins": allowed_origins,
             "allow_methods": ["*"],
             "allow_headers": ["*"],
+            "expose_headers": ["ETag"],
         }
\ No newline at end of file
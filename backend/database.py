@@ -1,16 +1,162 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from typing import Iterable, Optional, Tuple
 from config import settings
+import deadlines
+from monitoring.pool_metrics import InstrumentedQueuePool
+from monitoring.slow_queries import slow_query_log
 
-# Create database engine
-engine = create_engine(
-    settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
-)
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    """Per-connection SQLite tuning (WAL persists in the file; the rest is per connection)"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_kib)}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+def create_sqlite_engines(url: str) -> Tuple[Engine, Engine]:
+    """
+    SQLite profile: a pool of reader connections and a single writer connection.
+    The writer takes the write lock up front (BEGIN IMMEDIATE), so concurrent
+    writers queue on the pool / busy_timeout instead of failing lock upgrades.
+    """
+    connect_args = {"check_same_thread": False}
+    read_engine = create_engine(
+        url,
+        connect_args=connect_args,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.sqlite_reader_pool_size,
+        max_overflow=0,
+        pool_pre_ping=False,
+        pool_label="sqlite_read"
+    )
+    write_engine = create_engine(
+        url,
+        connect_args=connect_args,
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=settings.sqlite_busy_timeout_ms / 1000,
+        pool_label="sqlite_write"
+    )
+    event.listen(read_engine, "connect", _sqlite_pragmas)
+    event.listen(write_engine, "connect", _sqlite_pragmas)
+
+    @event.listens_for(write_engine, "connect")
+    def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+        # Let SQLAlchemy emit BEGIN itself (see the "begin" hook below)
+        dbapi_connection.isolation_level = None
+
+    @event.listens_for(write_engine, "begin")
+    def _begin_immediate(connection):
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+    return read_engine, write_engine
+
+def create_pooled_engine(url: str, name: str = "primary") -> Engine:
+    """
+    Server database engine with the pool configured from settings.
+
+    In PgBouncer mode (transaction pooling) nothing session-level may be
+    relied on: statement_timeout is set per transaction with SET LOCAL
+    instead of as a startup option, which PgBouncer rejects. Inside a request
+    whose deadline is closer than the timeout, the transaction gets the
+    remaining time instead (see deadlines.py).
+    """
+    connect_args = {}
+    is_postgres = url.startswith("postgresql")
+    timeout_ms = int(settings.db_statement_timeout_ms)
+    if is_postgres and timeout_ms and not settings.db_pgbouncer_mode:
+        connect_args["options"] = f"-c statement_timeout={timeout_ms}"
+
+    engine = create_engine(
+        url,
+        connect_args=connect_args,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_use_lifo=True,
+        pool_label=name
+    )
+
+    if is_postgres:
+        @event.listens_for(engine, "begin")
+        def _set_statement_timeout(connection):
+            deadline_ms = deadlines.statement_timeout_ms(timeout_ms)
+            if deadline_ms is not None:
+                connection.exec_driver_sql(f"SET LOCAL statement_timeout = {deadline_ms}")
+            elif timeout_ms and settings.db_pgbouncer_mode:
+                connection.exec_driver_sql(f"SET LOCAL statement_timeout = {timeout_ms}")
+
+        @event.listens_for(engine, "handle_error")
+        def _deadline_cancellation(context):
+            # 57014 query_canceled: statement_timeout, here cut short by the deadline
+            if getattr(context.original_exception, "pgcode", None) == "57014":
+                left = deadlines.remaining()
+                if left is not None and left <= 0.05:
+                    return deadlines.DeadlineExceeded("database")
+
+    return engine
+
+class RoutingSession(Session):
+    """
+    Sends plain SELECTs to the reader pool and everything else - flushes, DML,
+    textual SQL, SELECT ... FOR UPDATE, bare connection() calls - to the
+    writer engine. Once a transaction has written, or has changes waiting to
+    be flushed, its reads stay on the writer so they see its own changes.
+    """
+
+    def __init__(self, *args, write_bind: Optional[Engine] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.write_bind = write_bind
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.write_bind is not None and self._needs_writer(clause):
+            self.info["wrote"] = True
+            return self.write_bind
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+    def _needs_writer(self, clause) -> bool:
+        if self._flushing or self.info.get("wrote"):
+            return True
+        # text() may hold anything, including UPDATE; only SELECT constructs are known reads
+        if clause is None or not getattr(clause, "is_select", False):
+            return True
+        if getattr(clause, "_for_update_arg", None) is not None:
+            return True
+        return bool(self.new or self.dirty or self.deleted)
+
+@event.listens_for(RoutingSession, "after_transaction_end")
+def _reset_write_routing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("wrote", None)
+
+# Create database engine(s)
+if settings.database_url.startswith("sqlite") and ":memory:" not in settings.database_url and settings.database_url != "sqlite://":
+    engine, write_engine = create_sqlite_engines(settings.database_url)
+elif settings.database_url.startswith("sqlite"):
+    engine = create_engine(settings.database_url, connect_args={"check_same_thread": False})
+    write_engine = None
+else:
+    engine = create_pooled_engine(settings.database_url)
+    write_engine = None
+
+for _engine in (engine, write_engine):
+    if _engine is not None:
+        slow_query_log.attach(_engine)
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RoutingSession, write_bind=write_engine)
 
 # Create base class for models
 Base = declarative_base()
@@ -21,4 +167,21 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+def unique_violation(error: IntegrityError, columns: Iterable[str]) -> Optional[str]:
+    """
+    Which of the given columns a unique-constraint violation is about, or None.
+    Works from the Postgres constraint name / "Key (email)=..." detail and the
+    SQLite "UNIQUE constraint failed: users.email" message.
+    """
+    orig = getattr(error, "orig", error)
+    diag = getattr(orig, "diag", None)
+    constraint = (getattr(diag, "constraint_name", None) or "").lower()
+    message = str(orig).lower()
+    if "unique" not in message and "duplicate" not in message and not constraint:
+        return None
+    for column in columns:
+        if constraint.endswith(f"_{column}") or f"({column})" in message or f".{column}" in message:
+            return column
+    return None
@@ -1,4 +1,12 @@
-from sqlalchemy import text
+import argparse
+import re
+import statistics
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import create_engine, text
+from config import settings
 from database import engine
 import logging
 
@@ -51,6 +59,437 @@ def analyze_tables():
                 logger.error(f"Failed to analyze table {table}: {e}")
         conn.commit()
 
+# Index audit
+#
+# `python db_optimizer.py audit` inventories the live indexes, finds exact and
+# prefix-redundant ones plus unused ones, protects anything the top
+# pg_stat_statements queries plan to use, measures the insert cost of the
+# current vs proposed index set and writes the drops as a migration.
+
+INDEX_INVENTORY_SQL = text("""
+    SELECT s.relname AS table_name,
+           s.indexrelname AS index_name,
+           s.schemaname AS schema_name,
+           am.amname AS method,
+           ARRAY(SELECT pg_get_indexdef(ix.indexrelid, k, true)
+                 FROM generate_series(1, ix.indnkeyatts) AS k ORDER BY k) AS key_columns,
+           ARRAY(SELECT pg_get_indexdef(ix.indexrelid, k, true)
+                 FROM generate_series(ix.indnkeyatts + 1, ix.indnatts) AS k ORDER BY k) AS include_columns,
+           ix.indclass::text AS opclasses,
+           ix.indoption::text AS options,
+           pg_get_expr(ix.indpred, ix.indrelid) AS predicate,
+           ix.indisunique AS is_unique,
+           ix.indisprimary AS is_primary,
+           ix.indisvalid AS is_valid,
+           c.conname AS constraint_name,
+           pg_relation_size(ix.indexrelid) AS size_bytes,
+           s.idx_scan AS scans,
+           pg_get_indexdef(ix.indexrelid) AS definition
+    FROM pg_stat_user_indexes s
+    JOIN pg_index ix ON ix.indexrelid = s.indexrelid
+    JOIN pg_class i ON i.oid = ix.indexrelid
+    JOIN pg_am am ON am.oid = i.relam
+    LEFT JOIN pg_constraint c ON c.conindid = ix.indexrelid AND c.contype IN ('p', 'u', 'x')
+    WHERE s.schemaname = ANY(current_schemas(false))
+    ORDER BY s.relname, s.indexrelname
+""")
+
+INDEX_SCANS_SQL = text("""
+    SELECT relname, indexrelname, idx_scan FROM pg_stat_user_indexes
+    WHERE schemaname = ANY(current_schemas(false))
+""")
+
+TABLE_WRITES_SQL = text("""
+    SELECT relname, n_tup_ins, n_tup_upd, n_tup_del, COALESCE(idx_scan, 0) + seq_scan AS scans
+    FROM pg_stat_user_tables
+    WHERE schemaname = ANY(current_schemas(false))
+""")
+
+TOP_STATEMENTS_SQL = text("""
+    SELECT query, calls, total_exec_time
+    FROM pg_stat_statements
+    WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+    ORDER BY total_exec_time DESC
+    LIMIT :limit
+""")
+
+@dataclass
+class IndexInfo:
+    table: str
+    name: str
+    key_columns: Tuple[str, ...]
+    schema: str = "public"
+    method: str = "btree"
+    include_columns: Tuple[str, ...] = ()
+    opclasses: Tuple[str, ...] = ()
+    options: Tuple[int, ...] = ()
+    predicate: Optional[str] = None
+    is_unique: bool = False
+    is_primary: bool = False
+    is_valid: bool = True
+    constraint: Optional[str] = None
+    size_bytes: int = 0
+    scans: int = 0
+    definition: str = ""
+
+    @property
+    def qualified_name(self) -> str:
+        return f"{self.schema}.{self.name}"
+
+    def keys(self, count: Optional[int] = None) -> Tuple:
+        """
+        First `count` key columns as (column, opclass, direction) with the
+        directions normalised so an index and its backward scan compare equal
+        """
+        count = len(self.key_columns) if count is None else count
+        options = list(self.options[:count]) or [0] * count
+        if options and options[0] & 1:
+            # bit 0 = DESC, bit 1 = NULLS FIRST; a backward scan flips both
+            options = [option ^ 3 for option in options]
+        opclasses = self.opclasses[:count] or ("",) * count
+        return tuple(zip(self.key_columns[:count], opclasses, options))
+
+    def protected(self) -> bool:
+        return self.is_primary or self.constraint is not None
+
+@dataclass
+class IndexFinding:
+    index: IndexInfo
+    reason: str
+    covered_by: Optional[IndexInfo] = None
+
+    def describe(self) -> str:
+        if self.reason == "duplicate":
+            return f"duplicate of {self.covered_by.name}"
+        if self.reason == "prefix":
+            return f"prefix of {self.covered_by.name} ({', '.join(self.covered_by.key_columns)})"
+        if self.reason == "invalid":
+            return "invalid (failed CREATE INDEX CONCURRENTLY)"
+        return "no scans since statistics reset"
+
+@dataclass
+class AuditReport:
+    indexes: List[IndexInfo]
+    findings: List[IndexFinding]
+    used_by_statements: Set[str] = field(default_factory=set)
+    table_activity: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    write_cost: Dict[str, Dict[str, Dict[str, float]]] = field(default_factory=dict)
+    stats_reset: Optional[datetime] = None
+    replicas: int = 0
+
+def _rank(index: IndexInfo) -> Tuple:
+    """Which of two equivalent indexes to keep: the higher rank"""
+    return (index.protected(), index.is_unique, index.scans, -index.size_bytes, index.name)
+
+def find_redundant_indexes(indexes: Iterable[IndexInfo], used: Iterable[str] = (), min_scans: int = 0) -> List[IndexFinding]:
+    """
+    Indexes that can go without losing any access path or constraint:
+
+    - invalid indexes
+    - exact duplicates (same method, keys, INCLUDE list and predicate);
+      the constraint-backed / unique / most-scanned copy is kept
+    - non-unique btree indexes whose keys are a leading prefix of another
+      btree index with the same predicate
+    - with min_scans > 0, non-unique indexes scanned fewer times than that
+
+    Primary key, unique and exclusion constraint indexes are never proposed,
+    and neither are indexes named in `used` (from query plans). A unique
+    index is only proposed as the exact duplicate of another unique index.
+    """
+    used = set(used)
+    by_table: Dict[str, List[IndexInfo]] = {}
+    for index in indexes:
+        by_table.setdefault(index.table, []).append(index)
+
+    findings: List[IndexFinding] = []
+    for table_indexes in by_table.values():
+        for index in table_indexes:
+            if index.protected():
+                continue
+            if not index.is_valid:
+                findings.append(IndexFinding(index, "invalid"))
+                continue
+            if index.name in used:
+                continue
+            finding = None
+            for other in table_indexes:
+                if other is index or not other.is_valid:
+                    continue
+                if other.method != index.method or other.predicate != index.predicate:
+                    continue
+                if (
+                    other.keys() == index.keys()
+                    and other.include_columns == index.include_columns
+                    and (other.is_unique or not index.is_unique)
+                    and _rank(other) > _rank(index)
+                ):
+                    finding = IndexFinding(index, "duplicate", other)
+                    break
+                if (
+                    index.method == "btree"
+                    and not index.is_unique
+                    and not index.include_columns
+                    and len(index.key_columns) < len(other.key_columns)
+                    and other.keys(len(index.key_columns)) == index.keys()
+                ):
+                    finding = IndexFinding(index, "prefix", other)
+                    break
+            if finding is None and min_scans > 0 and not index.is_unique and index.scans < min_scans:
+                finding = IndexFinding(index, "unused")
+            if finding is not None:
+                findings.append(finding)
+    return findings
+
+def inventory_indexes(conn) -> List[IndexInfo]:
+    """Current indexes in the search path with their usage counters"""
+    indexes = []
+    for row in conn.execute(INDEX_INVENTORY_SQL).mappings():
+        indexes.append(IndexInfo(
+            table=row["table_name"],
+            name=row["index_name"],
+            schema=row["schema_name"],
+            method=row["method"],
+            key_columns=tuple(row["key_columns"]),
+            include_columns=tuple(row["include_columns"]),
+            opclasses=tuple(row["opclasses"].split()),
+            options=tuple(int(option) for option in row["options"].split()),
+            predicate=row["predicate"],
+            is_unique=row["is_unique"],
+            is_primary=row["is_primary"],
+            is_valid=row["is_valid"],
+            constraint=row["constraint_name"],
+            size_bytes=row["size_bytes"],
+            scans=row["scans"] or 0,
+            definition=row["definition"]
+        ))
+    return indexes
+
+def add_replica_scans(indexes: List[IndexInfo], urls: Iterable[str]) -> int:
+    """Add index scans counted on replicas (reads are routed there); returns replicas read"""
+    by_name = {(index.table, index.name): index for index in indexes}
+    count = 0
+    for url in urls:
+        replica_engine = create_engine(url, pool_size=1, max_overflow=0)
+        try:
+            with replica_engine.connect() as conn:
+                for table_name, index_name, scans in conn.execute(INDEX_SCANS_SQL):
+                    index = by_name.get((table_name, index_name))
+                    if index is not None:
+                        index.scans += scans or 0
+            count += 1
+        except Exception as e:
+            logger.warning(f"Could not read index usage from replica: {e}")
+        finally:
+            replica_engine.dispose()
+    return count
+
+def _statement_tables(query: str, tables: Iterable[str]) -> List[str]:
+    return [table for table in tables if re.search(rf'\b"?{re.escape(table)}"?\b', query, re.IGNORECASE)]
+
+def statement_activity(conn, tables: Iterable[str], limit: int = 200) -> Tuple[Dict[str, Dict[str, int]], Set[str]]:
+    """
+    Read/write calls per table from pg_stat_statements, and the indexes the
+    top SELECTs plan to use (EXPLAIN GENERIC_PLAN, PostgreSQL 16+)
+    """
+    tables = list(tables)
+    activity = {table: {"read_calls": 0, "write_calls": 0} for table in tables}
+    used: Set[str] = set()
+    try:
+        with conn.begin_nested():
+            statements = conn.execute(TOP_STATEMENTS_SQL, {"limit": limit}).all()
+    except Exception as e:
+        logger.warning(f"pg_stat_statements unavailable, skipping statement analysis: {e}")
+        return activity, used
+
+    can_explain = conn.dialect.server_version_info >= (16,)
+    for query, calls, _total in statements:
+        verb = query.lstrip().split(None, 1)[0].upper() if query.strip() else ""
+        touched = _statement_tables(query, tables)
+        for table in touched:
+            key = "write_calls" if verb in ("INSERT", "UPDATE", "DELETE", "MERGE") else "read_calls"
+            activity[table][key] += calls
+        if can_explain and verb in ("SELECT", "WITH") and touched:
+            try:
+                with conn.begin_nested():
+                    plan = conn.execute(text("EXPLAIN (GENERIC_PLAN, FORMAT JSON) " + query.replace(":", r"\:"))).scalar()
+                used.update(_plan_indexes(plan))
+            except Exception:
+                continue
+    return activity, used
+
+def _plan_indexes(node) -> Set[str]:
+    names: Set[str] = set()
+    if isinstance(node, list):
+        for item in node:
+            names |= _plan_indexes(item)
+    elif isinstance(node, dict):
+        if "Index Name" in node:
+            names.add(node["Index Name"])
+        for value in node.values():
+            if isinstance(value, (list, dict)):
+                names |= _plan_indexes(value)
+    return names
+
+def _scratch_definition(definition: str, table: str, scratch: str, suffix: str) -> str:
+    """Point a pg_get_indexdef() statement at the scratch table under a new name"""
+    statement = re.sub(r"^(CREATE (?:UNIQUE )?INDEX )(\S+)", lambda m: f"{m.group(1)}{m.group(2).split('.')[-1]}_{suffix}", definition)
+    return re.sub(rf" ON (?:ONLY )?(?:\S+\.)?{re.escape(table)} ", f" ON {scratch} ", statement, count=1)
+
+def measure_insert_cost(conn, table: str, definitions: List[str], sample: int, repeat: int = 3) -> Dict[str, float]:
+    """
+    Insert up to `sample` existing rows into a scratch copy of `table` that
+    carries the given indexes; returns median ms per 1k rows and WAL bytes
+    per row. Everything happens in a transaction that is rolled back.
+    """
+    scratch = f"_index_audit_{table}"
+    timings: List[float] = []
+    wal: List[float] = []
+    rows = 0
+    for attempt in range(repeat):
+        transaction = conn.begin()
+        try:
+            conn.execute(text(f'CREATE TABLE {scratch} (LIKE "{table}" INCLUDING DEFAULTS)'))
+            for number, definition in enumerate(definitions):
+                conn.execute(text(_scratch_definition(definition, table, scratch, f"audit{number}")))
+            start_lsn = conn.execute(text("SELECT pg_current_wal_insert_lsn()")).scalar()
+            start = time.perf_counter()
+            rows = conn.execute(text(f'INSERT INTO {scratch} SELECT * FROM "{table}" LIMIT :sample'), {"sample": sample}).rowcount
+            elapsed = time.perf_counter() - start
+            wal_bytes = conn.execute(
+                text("SELECT pg_wal_lsn_diff(pg_current_wal_insert_lsn(), :start)"), {"start": start_lsn}
+            ).scalar()
+        finally:
+            transaction.rollback()
+        if rows:
+            timings.append(elapsed * 1000 / rows * 1000)
+            wal.append(float(wal_bytes) / rows)
+    return {
+        "indexes": len(definitions),
+        "rows": rows,
+        "ms_per_1k_rows": statistics.median(timings) if timings else 0.0,
+        "wal_bytes_per_row": statistics.median(wal) if wal else 0.0
+    }
+
+def audit_indexes(min_scans: int = 0, sample: int = 20000, statements: int = 200, replica_urls: Optional[List[str]] = None) -> AuditReport:
+    """Inventory, classify and measure; see find_redundant_indexes for the rules"""
+    if engine.dialect.name != "postgresql":
+        raise RuntimeError("The index audit needs PostgreSQL statistics views")
+    replica_urls = settings.database_replica_urls if replica_urls is None else replica_urls
+
+    with engine.connect() as conn:
+        indexes = inventory_indexes(conn)
+        replicas = add_replica_scans(indexes, replica_urls)
+        tables = sorted({index.table for index in indexes})
+        activity, used = statement_activity(conn, tables, statements)
+        for table_name, inserts, updates, deletes, scans in conn.execute(TABLE_WRITES_SQL):
+            if table_name in activity:
+                activity[table_name].update({"rows_written": inserts + updates + deletes, "table_scans": scans})
+        stats_reset = conn.execute(text(
+            "SELECT stats_reset FROM pg_stat_database WHERE datname = current_database()"
+        )).scalar()
+        conn.rollback()
+
+        findings = find_redundant_indexes(indexes, used, min_scans)
+        report = AuditReport(indexes, findings, used, activity, stats_reset=stats_reset, replicas=replicas)
+
+        dropped = {finding.index.name for finding in findings}
+        for table in sorted({finding.index.table for finding in findings}):
+            current = [index.definition for index in indexes if index.table == table and index.is_valid]
+            proposed = [index.definition for index in indexes if index.table == table and index.is_valid and index.name not in dropped]
+            try:
+                report.write_cost[table] = {
+                    "current": measure_insert_cost(conn, table, current, sample),
+                    "proposed": measure_insert_cost(conn, table, proposed, sample)
+                }
+            except Exception as e:
+                logger.warning(f"Could not measure write cost for {table}: {e}")
+    return report
+
+def _size(size_bytes: int) -> str:
+    for unit in ("B", "kB", "MB", "GB"):
+        if size_bytes < 1024 or unit == "GB":
+            return f"{size_bytes:.0f} {unit}" if unit == "B" else f"{size_bytes:.1f} {unit}"
+        size_bytes /= 1024
+
+def render_migration(report: AuditReport) -> str:
+    """SQL migration dropping the proposed indexes, with the evidence as comments"""
+    lines = [
+        "-- Index pruning proposed by `python db_optimizer.py audit`",
+        f"-- Generated {datetime.now().isoformat(timespec='seconds')}; usage counted since "
+        f"{report.stats_reset or 'statistics were last reset'}"
+        + (f" on the primary and {report.replicas} replica(s)" if report.replicas else " on the primary"),
+        "-- Review the reasons below before applying. DROP INDEX CONCURRENTLY cannot run",
+        "-- inside a transaction block, so apply this file statement by statement.",
+        ""
+    ]
+    if report.write_cost:
+        lines.append("-- Measured insert cost, current -> proposed (median, rows copied into a scratch table):")
+        for table, cost in sorted(report.write_cost.items()):
+            current, proposed = cost["current"], cost["proposed"]
+            lines.append(
+                f"--   {table}: {current['indexes']} -> {proposed['indexes']} indexes, "
+                f"{current['ms_per_1k_rows']:.2f} -> {proposed['ms_per_1k_rows']:.2f} ms per 1k rows, "
+                f"{current['wal_bytes_per_row']:,.0f} -> {proposed['wal_bytes_per_row']:,.0f} WAL bytes per row "
+                f"({current['rows']:,} rows)"
+            )
+        lines.append("")
+    if not report.findings:
+        lines.append("-- No redundant indexes found.")
+        return "\n".join(lines) + "\n"
+
+    for finding in sorted(report.findings, key=lambda f: (f.index.table, f.index.name)):
+        index = finding.index
+        lines.append(f"-- {index.table}.{index.name}: {finding.describe()} [{index.scans:,} scans, {_size(index.size_bytes)}]")
+        lines.append(f"DROP INDEX CONCURRENTLY IF EXISTS {index.qualified_name};")
+    lines.append("")
+    lines.append("-- Rollback:")
+    for finding in sorted(report.findings, key=lambda f: (f.index.table, f.index.name)):
+        definition = finding.index.definition.replace(" INDEX ", " INDEX CONCURRENTLY IF NOT EXISTS ", 1)
+        lines.append(f"-- {definition};")
+    return "\n".join(lines) + "\n"
+
+def print_audit(report: AuditReport):
+    """Human-readable summary of an audit"""
+    dropped = {finding.index.name: finding for finding in report.findings}
+    for table in sorted({index.table for index in report.indexes}):
+        activity = report.table_activity.get(table, {})
+        print(f"\n{table}: {activity.get('rows_written', 0):,} rows written, "
+              f"{activity.get('write_calls', 0):,} write / {activity.get('read_calls', 0):,} read statement calls")
+        for index in (index for index in report.indexes if index.table == table):
+            finding = dropped.get(index.name)
+            flags = [flag for flag, on in (("pk", index.is_primary), ("unique", index.is_unique), ("planned", index.name in report.used_by_statements)) if on]
+            print(f"  {'DROP' if finding else 'keep'}  {index.name:<40} ({', '.join(index.key_columns)})"
+                  f"{' WHERE ' + index.predicate if index.predicate else ''}  {index.scans:>10,} scans  {_size(index.size_bytes):>9}"
+                  f"{'  [' + ', '.join(flags) + ']' if flags else ''}"
+                  f"{'  <- ' + finding.describe() if finding else ''}")
+    total = sum(finding.index.size_bytes for finding in report.findings)
+    print(f"\n{len(report.findings)} of {len(report.indexes)} indexes proposed for removal ({_size(total)})")
+
 if __name__ == "__main__":
-    create_performance_indexes()
-    analyze_tables()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Database index maintenance")
+    subcommands = parser.add_subparsers(dest="command")
+    subcommands.add_parser("create", help="Create performance indexes and analyze tables (default)")
+    subcommands.add_parser("analyze", help="Update table statistics")
+    audit_parser = subcommands.add_parser("audit", help="Find redundant indexes and propose a pruning migration")
+    audit_parser.add_argument("--output", help="Write the migration here (default: print it)")
+    audit_parser.add_argument("--min-scans", type=int, default=0, help="Also propose non-unique indexes with fewer scans (0 disables)")
+    audit_parser.add_argument("--sample", type=int, default=20000, help="Rows copied per write-cost measurement")
+    audit_parser.add_argument("--statements", type=int, default=200, help="Top pg_stat_statements entries to analyze")
+    args = parser.parse_args()
+
+    if args.command == "audit":
+        report = audit_indexes(min_scans=args.min_scans, sample=args.sample, statements=args.statements)
+        print_audit(report)
+        migration = render_migration(report)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(migration)
+            print(f"Migration written to {args.output}")
+        else:
+            print()
+            print(migration)
+    elif args.command == "analyze":
+        analyze_tables()
+    else:
+        create_performance_indexes()
+        analyze_tables()
@@ -0,0 +1,226 @@
+"""
+Read-replica routing
+
+Read-only endpoints take their session from get_read_db, which binds it to
+a replica picked round-robin among the healthy ones. A background checker
+measures each replica's replication lag; replicas that fail the check or lag
+more than replica_max_lag_seconds are skipped, and with none left reads go
+to the primary.
+
+Read-your-writes: when a request commits a write, the client is pinned to
+the primary for read_your_writes_seconds, in this worker (by client key) and
+across workers (by a short-lived cookie set by DBRoutingMiddleware).
+"""
+import asyncio
+import contextvars
+import hashlib
+import itertools
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from config import settings
+from database import SessionLocal, create_pooled_engine
+from monitoring.slow_queries import slow_query_log
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = "db_primary_until"
+
+# Per-request routing state, set by DBRoutingMiddleware
+_request_state: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "db_routing_state", default=None
+)
+
+# Lag of a caught-up standby is 0 even if the primary has been idle
+REPLICA_LAG_SQL = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+class Replica:
+    """One replica engine and its last health sample"""
+
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self.session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.checked_at = 0.0
+        self.error: Optional[str] = None
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": self.lag,
+            "checked_at": self.checked_at,
+            "error": self.error
+        }
+
+class ReplicaRouter:
+    """Round-robin over healthy replicas with lag-based fallback to the primary"""
+
+    def __init__(self, replicas: List[Replica], max_lag: float = None, check_interval: float = None, pin_seconds: float = None):
+        self.replicas = replicas
+        self.max_lag = max_lag if max_lag is not None else settings.replica_max_lag_seconds
+        self.check_interval = check_interval if check_interval is not None else settings.replica_check_interval
+        self.pin_seconds = pin_seconds if pin_seconds is not None else settings.read_your_writes_seconds
+        self._cycle = itertools.cycle(range(len(replicas))) if replicas else None
+        self._cycle_lock = threading.Lock()
+        self._pins: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    # Health
+
+    def check(self, replica: Replica):
+        try:
+            with replica.engine.connect() as connection:
+                lag = float(connection.execute(REPLICA_LAG_SQL).scalar() or 0.0)
+            replica.lag = lag
+            replica.error = None
+            healthy = lag <= self.max_lag
+            if replica.healthy and not healthy:
+                logger.warning(f"Replica {replica.name} lagging {lag:.1f}s, routing reads elsewhere")
+            replica.healthy = healthy
+        except Exception as e:
+            if replica.healthy:
+                logger.warning(f"Replica {replica.name} unavailable: {e}")
+            replica.healthy = False
+            replica.error = str(e)
+        replica.checked_at = time.time()
+
+    def check_all(self):
+        for replica in self.replicas:
+            self.check(replica)
+
+    async def _run(self):
+        while True:
+            await asyncio.to_thread(self.check_all)
+            await asyncio.sleep(self.check_interval)
+
+    async def start(self):
+        if self.replicas and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    # Selection
+
+    def pick(self) -> Optional[Replica]:
+        """Next healthy replica, or None to use the primary"""
+        if not self.replicas:
+            return None
+        with self._cycle_lock:
+            for _ in range(len(self.replicas)):
+                replica = self.replicas[next(self._cycle)]
+                if replica.healthy:
+                    return replica
+        return None
+
+    # Read-your-writes
+
+    def pin(self, client_key: Optional[str]) -> float:
+        """Pin a client to the primary; returns the pin expiry"""
+        until = time.time() + self.pin_seconds
+        if client_key:
+            self._pins[client_key] = until
+            if len(self._pins) > 10000:
+                now = time.time()
+                self._pins = {key: expiry for key, expiry in self._pins.items() if expiry > now}
+        return until
+
+    def is_pinned(self, client_key: Optional[str]) -> bool:
+        return bool(client_key) and self._pins.get(client_key, 0) > time.time()
+
+    def session(self) -> Session:
+        """Session for a read-only dependency"""
+        state = _request_state.get()
+        if state is not None and state.get("pinned"):
+            return SessionLocal()
+        replica = self.pick()
+        if replica is None:
+            return SessionLocal()
+        db = replica.session_factory()
+        db.info["replica"] = replica.name
+        return db
+
+    def state(self) -> Dict[str, Any]:
+        return {"max_lag_seconds": self.max_lag, "replicas": [replica.state() for replica in self.replicas]}
+
+def client_key(cookies: Dict[str, str], headers) -> Optional[str]:
+    """Stable per-client key from its credentials (never stored in clear)"""
+    credential = (
+        cookies.get("access_token")
+        or headers.get("authorization")
+        or headers.get("x-api-key")
+    )
+    if not credential:
+        return None
+    return hashlib.sha256(credential.encode()).hexdigest()[:32]
+
+def begin_request(pinned: bool, key: Optional[str]):
+    return _request_state.set({"pinned": pinned, "wrote": False, "client_key": key})
+
+def end_request(token) -> Dict[str, Any]:
+    state = _request_state.get()
+    _request_state.reset(token)
+    return state
+
+def _note_write(session, flush_context=None):
+    session.info["flushed"] = True
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_bulk_write(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["flushed"] = True
+
+@event.listens_for(Session, "after_commit")
+def _record_write(session):
+    if not session.info.pop("flushed", False):
+        return
+    state = _request_state.get()
+    if state is not None:
+        state["wrote"] = True
+
+@event.listens_for(Session, "after_rollback")
+def _forget_write(session):
+    session.info.pop("flushed", None)
+
+event.listen(Session, "after_flush", _note_write)
+
+def _build_router() -> ReplicaRouter:
+    replicas = [
+        Replica(f"replica_{index}", create_pooled_engine(url, name=f"replica_{index}"))
+        for index, url in enumerate(settings.database_replica_urls)
+    ]
+    for replica in replicas:
+        slow_query_log.attach(replica.engine)
+    return ReplicaRouter(replicas)
+
+# Global instance
+replica_router = _build_router()
+
+def get_read_db():
+    """Dependency for read-only endpoints: replica session when one is usable"""
+    db = replica_router.session()
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,105 @@
+"""
+Request deadlines
+
+DeadlineMiddleware gives each request a time budget (request_deadline_seconds,
+overridable per path prefix with request_deadline_overrides) and stores the
+absolute deadline in a contextvar. Code that waits on a dependency asks for
+the remaining time instead of using its own fixed timeout:
+
+    - PostgreSQL: each transaction runs SET LOCAL statement_timeout with the
+      remaining time when that is below db_statement_timeout_ms (database.py)
+    - Redis: calls through the circuit breaker are bounded by the remaining
+      time (circuit_breaker.py)
+    - password hashing: the wait for a hashing worker is bounded, and queued
+      work is cancelled when the deadline passes (password_utils.py)
+
+Running out raises DeadlineExceeded, which the middleware turns into a 504
+and counts in request_deadline_exceeded_total. Outside a request (startup,
+background tasks, scripts) there is no deadline and nothing changes.
+"""
+import asyncio
+import contextvars
+import time
+from typing import Awaitable, Dict, Optional, TypeVar
+
+from prometheus_client import Counter
+
+from config import settings
+
+T = TypeVar("T")
+
+deadline_exceeded_total = Counter(
+    "request_deadline_exceeded_total",
+    "Requests failed with 504 because their deadline passed",
+    ["dependency"]
+)
+
+# Absolute time.monotonic() deadline of the current request
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+class DeadlineExceeded(Exception):
+    """The request ran out of time while waiting on `dependency`"""
+
+    def __init__(self, dependency: str):
+        super().__init__(f"Request deadline exceeded waiting on {dependency}")
+        self.dependency = dependency
+
+def budget_for(path: str, overrides: Optional[Dict[str, float]] = None, default: Optional[float] = None) -> float:
+    """Budget of a path: the longest matching prefix override, else the default"""
+    overrides = settings.request_deadline_overrides if overrides is None else overrides
+    default = settings.request_deadline_seconds if default is None else default
+    matches = [prefix for prefix in overrides if path.startswith(prefix)]
+    if not matches:
+        return default
+    return overrides[max(matches, key=len)]
+
+def start(budget: float):
+    """Set the deadline of the current context; returns a token for reset()"""
+    return _deadline.set(time.monotonic() + budget if budget and budget > 0 else None)
+
+def reset(token):
+    _deadline.reset(token)
+
+def remaining() -> Optional[float]:
+    """Seconds left, or None without a deadline"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+def check(dependency: str) -> Optional[float]:
+    """Remaining seconds; raises DeadlineExceeded if none are left"""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(dependency)
+    return left
+
+def timeout(default: Optional[float], dependency: str) -> Optional[float]:
+    """The smaller of a dependency's own timeout and the time left"""
+    left = check(dependency)
+    if left is None:
+        return default
+    return left if default is None else min(default, left)
+
+async def bounded(awaitable: Awaitable[T], dependency: str) -> T:
+    """Await within the remaining time"""
+    left = check(dependency)
+    if left is None:
+        return await awaitable
+    try:
+        return await asyncio.wait_for(awaitable, left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(dependency) from None
+
+def statement_timeout_ms(configured_ms: int) -> Optional[int]:
+    """
+    statement_timeout for a transaction started now: the time left when it
+    is below the configured timeout, else None (keep the configured one)
+    """
+    left = check("database")
+    if left is None:
+        return None
+    left_ms = max(1, int(left * 1000))
+    if configured_ms and left_ms >= configured_ms:
+        return None
+    return left_ms
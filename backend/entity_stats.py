@@ -0,0 +1,217 @@
+"""
+Entity counts for dashboards and stats endpoints
+
+Counts of users and persons by role and active state are kept in the small
+entity_counts table. ORM events adjust the matching counter row in the same
+transaction as every insert, update and delete, so reading totals never scans
+the users or person tables. Bulk query.update()/delete() and raw SQL bypass the
+ORM events; a periodic reconciliation recomputes the counters with GROUP BY
+queries to correct any drift. Where exactness isn't needed, planner estimates
+(pg_class.reltuples) are available at no scan cost.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import event, func, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from config import settings
+from database import SessionLocal, engine
+from models import EntityCount, Person, Role, User
+
+logger = logging.getLogger(__name__)
+
+USERS = "users"
+PERSONS = "person"
+
+counts_table = EntityCount.__table__
+
+def _role_key(role: Any) -> str:
+    """Normalise a role id / PersonRole to the counter key"""
+    if role is None:
+        return ""
+    return str(getattr(role, "value", role))
+
+def _active_key(is_active: Optional[bool]) -> bool:
+    # Column default is True; a None here means the default applies
+    return True if is_active is None else bool(is_active)
+
+def _adjust(connection, entity: str, role: Any, is_active: Optional[bool], delta: int):
+    """Apply a delta to one counter row, creating it if needed"""
+    values = {"entity": entity, "role": _role_key(role), "is_active": _active_key(is_active)}
+    dialect = connection.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        # One statement, so concurrent first writes to a counter cannot collide
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        statement = insert(counts_table).values(count=delta, **values)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=[counts_table.c.entity, counts_table.c.role, counts_table.c.is_active],
+            set_={"count": counts_table.c.count + delta}
+        ))
+        return
+    result = connection.execute(
+        counts_table.update()
+        .where(*(counts_table.c[name] == value for name, value in values.items()))
+        .values(count=counts_table.c.count + delta)
+    )
+    if result.rowcount == 0:
+        # A negative count is kept so a later increment balances it; readers skip it
+        connection.execute(counts_table.insert().values(count=delta, **values))
+
+def _previous(target, attribute: str) -> Any:
+    """Value of an attribute before the pending flush"""
+    history = inspect(target).attrs[attribute].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(target, attribute)
+
+def _keep_history(target, value, oldvalue, initiator):
+    return value
+
+def _register_listeners(model, entity: str, role_attribute: str):
+    # Load the old value when an expired attribute is set (e.g. after a
+    # commit); otherwise its history is empty and the update is not counted
+    for attribute in (role_attribute, "is_active"):
+        event.listen(getattr(model, attribute), "set", _keep_history, active_history=True)
+
+    @event.listens_for(model, "after_insert")
+    def _after_insert(mapper, connection, target):
+        _adjust(connection, entity, getattr(target, role_attribute), target.is_active, 1)
+
+    @event.listens_for(model, "after_delete")
+    def _after_delete(mapper, connection, target):
+        _adjust(connection, entity, getattr(target, role_attribute), target.is_active, -1)
+
+    @event.listens_for(model, "after_update")
+    def _after_update(mapper, connection, target):
+        old_key = (_role_key(_previous(target, role_attribute)), _active_key(_previous(target, "is_active")))
+        new_key = (_role_key(getattr(target, role_attribute)), _active_key(target.is_active))
+        if old_key != new_key:
+            _adjust(connection, entity, old_key[0], old_key[1], -1)
+            _adjust(connection, entity, new_key[0], new_key[1], 1)
+
+_register_listeners(User, USERS, "role_id")
+_register_listeners(Person, PERSONS, "role")
+
+class EntityStats:
+    """Reads counters with a short per-worker cache and reconciles them periodically"""
+
+    def __init__(self, cache_ttl: float = None, reconcile_interval: float = None):
+        self.cache_ttl = cache_ttl if cache_ttl is not None else settings.stats_cache_ttl
+        self.reconcile_interval = (
+            reconcile_interval if reconcile_interval is not None else settings.stats_reconcile_interval
+        )
+        self._cached: Optional[Dict[str, Any]] = None
+        self._cached_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def get_counts(self, db: Session) -> Dict[str, Any]:
+        """Totals by role and active state for users and persons"""
+        if self._cached is not None and time.monotonic() - self._cached_at < self.cache_ttl:
+            return self._cached
+
+        role_names = {str(role_id): name for role_id, name in db.query(Role.id, Role.name).all()}
+        result = {USERS: self._empty(), PERSONS: self._empty()}
+        for row in db.query(EntityCount).all():
+            if row.entity not in result or row.count <= 0:
+                continue
+            stats = result[row.entity]
+            role = role_names.get(row.role, row.role) if row.entity == USERS else row.role
+            role = role or "none"
+            stats["total"] += row.count
+            stats["active" if row.is_active else "inactive"] += row.count
+            stats["by_role"][role] = stats["by_role"].get(role, 0) + row.count
+
+        self._cached = result
+        self._cached_at = time.monotonic()
+        return result
+
+    def get_estimates(self, db: Session) -> Dict[str, int]:
+        """Planner row estimates (PostgreSQL reltuples); exact counters elsewhere"""
+        if engine.dialect.name != "postgresql":
+            counts = self.get_counts(db)
+            return {USERS: counts[USERS]["total"], PERSONS: counts[PERSONS]["total"]}
+
+        rows = db.execute(
+            text("SELECT relname, reltuples FROM pg_class WHERE relname IN (:users, :persons) AND relkind = 'r'"),
+            {"users": USERS, "persons": PERSONS}
+        ).all()
+        estimates = {USERS: 0, PERSONS: 0}
+        for relname, reltuples in rows:
+            # reltuples is -1 for tables that were never vacuumed/analyzed
+            estimates[relname] = max(int(reltuples), 0)
+        return estimates
+
+    def reconcile(self, db: Session):
+        """Recompute all counters from the source tables"""
+        # Lock the counter rows first: writers that already bumped a counter
+        # commit before the counts below are taken, later ones wait for us
+        stored = {
+            (row.entity, row.role, row.is_active): row
+            for row in db.query(EntityCount).with_for_update().all()
+        }
+        # count(*) grouped in index column order, so the recount can read
+        # ix_users_active_role / ix_person_active_role alone (index-only scans)
+        user_rows = db.query(User.role_id, User.is_active, func.count()).group_by(User.is_active, User.role_id).all()
+        person_rows = db.query(Person.role, Person.is_active, func.count()).group_by(Person.is_active, Person.role).all()
+
+        exact: Dict[Tuple[str, str, bool], int] = {}
+        for entity, rows in ((USERS, user_rows), (PERSONS, person_rows)):
+            for role, is_active, count in rows:
+                key = (entity, _role_key(role), _active_key(is_active))
+                exact[key] = exact.get(key, 0) + count
+
+        drift = 0
+        for key, row in stored.items():
+            expected = exact.pop(key, 0)
+            if row.count != expected:
+                drift += abs(row.count - expected)
+                row.count = expected
+        for (entity, role, is_active), count in exact.items():
+            drift += count
+            db.add(EntityCount(entity=entity, role=role, is_active=is_active, count=count))
+        db.commit()
+
+        self._cached = None
+        if drift:
+            logger.warning(f"Entity counters reconciled, corrected drift of {drift}")
+        return drift
+
+    def _reconcile_once(self):
+        db = SessionLocal()
+        try:
+            self.reconcile(db)
+        finally:
+            db.close()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.to_thread(self._reconcile_once)
+            except Exception as e:
+                logger.error(f"Entity counter reconciliation failed: {e}")
+            await asyncio.sleep(self.reconcile_interval)
+
+    async def start(self):
+        """Reconcile now and then on a schedule"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @staticmethod
+    def _empty() -> Dict[str, Any]:
+        return {"total": 0, "active": 0, "inactive": 0, "by_role": {}}
+
+# Global instance
+entity_stats = EntityStats()
@@ -0,0 +1,117 @@
+"""
+ETags and conditional GET
+
+Reference data and list pages are revalidated by the frontend's SWR hooks
+far more often than they change. Every flush that inserts, updates or
+deletes users, persons, roles or permissions bumps that table's row in
+table_versions, in the same transaction. A cacheable endpoint derives a
+strong ETag from the versions of the tables its body depends on, plus the
+request's path and query string, the principal where the body is per-user,
+and the app version. The versions are one small indexed query, run before
+any rows are fetched. A matching If-None-Match is answered with 304 right
+there, without loading or serializing anything. Versions are read before
+the rows, so a body is never older than the ETag it is sent with.
+
+Responses are `Cache-Control: private, no-cache` (browsers keep them but
+revalidate every time, shared caches do not store them) and vary on the
+credentials. Like entity_stats, the versions only see ORM flushes: bulk
+query.update()/delete() and raw SQL must call bump_versions themselves.
+"""
+import hashlib
+from itertools import chain
+from typing import Any, Iterable, List, Optional, Tuple
+
+from fastapi import Request, Response
+from sqlalchemy import event, func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from config import settings
+from models import Permission, Person, Role, TableVersion, User
+
+USERS = "users"
+PERSONS = "person"
+ROLES = "roles"
+PERMISSIONS = "permissions"
+
+TRACKED = {User: USERS, Person: PERSONS, Role: ROLES, Permission: PERMISSIONS}
+
+CACHE_CONTROL = "private, no-cache"
+VARY = "Authorization, Cookie, X-API-Key"  # every way credentials arrive (see api_keys.extract_api_key)
+
+versions_table = TableVersion.__table__
+
+def bump_versions(connection, tables: Iterable[str]):
+    """Increment the version of each table (upsert, so a missing row is created)"""
+    for name in sorted(set(tables)):
+        dialect = connection.dialect.name
+        if dialect in ("postgresql", "sqlite"):
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            statement = insert(versions_table).values(table_name=name, version=1)
+            connection.execute(statement.on_conflict_do_update(
+                index_elements=[versions_table.c.table_name],
+                set_={"version": versions_table.c.version + 1, "updated_at": func.now()}
+            ))
+            continue
+        result = connection.execute(
+            versions_table.update()
+            .where(versions_table.c.table_name == name)
+            .values(version=versions_table.c.version + 1)
+        )
+        if result.rowcount == 0:
+            connection.execute(versions_table.insert().values(table_name=name, version=1))
+
+@event.listens_for(Session, "after_flush")
+def _bump_flushed_tables(session, flush_context):
+    # new / dirty / deleted still hold the pre-flush state here
+    tables = set()
+    for instance in chain(session.new, session.deleted):
+        if type(instance) in TRACKED:
+            tables.add(TRACKED[type(instance)])
+    for instance in session.dirty:
+        # Dirty also lists objects whose only change was a no-op
+        if type(instance) in TRACKED and session.is_modified(instance):
+            tables.add(TRACKED[type(instance)])
+    if tables:
+        bump_versions(session.connection(), tables)
+
+def versions(db: Session, tables: Iterable[str]) -> List[Tuple[str, int, Any]]:
+    """(table, version, updated_at) for each table; version 0 when not yet written"""
+    names = sorted(set(tables))
+    rows = {
+        row.table_name: row
+        for row in db.query(TableVersion.table_name, TableVersion.version, TableVersion.updated_at)
+        .filter(TableVersion.table_name.in_(names))
+    }
+    # updated_at keeps an ETag from being reused if the counters are ever reset
+    return [
+        (name, rows[name].version, str(rows[name].updated_at)) if name in rows else (name, 0, None)
+        for name in names
+    ]
+
+def compute_etag(db: Session, request: Request, tables: Iterable[str], *parts: Any) -> str:
+    """Strong ETag for a body built from `tables` for this request"""
+    state = (settings.app_version, request.url.path, request.url.query, versions(db, tables), parts)
+    return '"' + hashlib.blake2b(repr(state).encode(), digest_size=16).hexdigest() + '"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match uses the weak comparison: W/ prefixes are ignored"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in header.split(","))
+    return etag in (candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates)
+
+def cacheable(response: Response, etag: str) -> Response:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    response.headers["Vary"] = VARY
+    return response
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """The 304 to return when the client already has this version, else None"""
+    if not etag_matches(request, etag):
+        return None
+    return cacheable(Response(status_code=304), etag)
@@ -0,0 +1,137 @@
+"""
+Sparse fieldsets for user and person reads
+
+The user and person list / detail endpoints take
+
+    ?fields=username,email      columns to return (id is always included)
+    ?expand=role,permissions    user relationships to resolve
+
+and select only those columns in SQL; the role name is an outer join and
+permissions are one query for all the roles on the page, made only when
+asked for. Without either parameter the full response is returned, as
+before. Fields that were not selected are left out of the body (not null);
+the valid names are in USER_FIELDS / USER_EXPANSIONS / PERSON_FIELDS, and
+the query parameters' patterns in the OpenAPI schema.
+"""
+import uuid
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from models import Permission, Person, Role, User, role_permissions
+from schemas import PersonRole, PersonSparseResponse, UserSparseResponse
+
+USER_FIELDS = ("id", "username", "email", "is_active", "created_at")
+USER_EXPANSIONS = ("role", "permissions")
+PERSON_FIELDS = ("id", "username", "email", "role", "is_active", "created_at")
+
+def _list_pattern(names: Tuple[str, ...]) -> str:
+    name = "|".join(names)
+    return rf"^({name})(,({name}))*$"
+
+@dataclass(frozen=True)
+class FieldSelection:
+    columns: Tuple[str, ...]
+    expansions: Tuple[str, ...] = ()
+
+def parse_selection(fields: Optional[str], expand: Optional[str], all_fields: Tuple[str, ...],
+                    all_expansions: Tuple[str, ...] = ()) -> FieldSelection:
+    """Columns and expansions to return; with neither given, everything"""
+    requested = [name for name in (fields or "").split(",") if name]
+    expansions = [name for name in (expand or "").split(",") if name]
+    unknown = [name for name in requested if name not in all_fields]
+    unknown += [name for name in expansions if name not in all_expansions]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+    if expand is None and fields is None:
+        expansions = list(all_expansions)
+    columns = ["id"] + [name for name in (requested or all_fields) if name != "id"]
+    # Keep the schema's order so responses do not depend on the query string
+    return FieldSelection(
+        columns=tuple(name for name in all_fields if name in columns),
+        expansions=tuple(name for name in all_expansions if name in expansions)
+    )
+
+def user_selection(
+    fields: Optional[str] = Query(
+        None, pattern=_list_pattern(USER_FIELDS),
+        description=f"Comma-separated columns to return: {', '.join(USER_FIELDS)} (id is always included)"
+    ),
+    expand: Optional[str] = Query(
+        None, pattern=_list_pattern(USER_EXPANSIONS),
+        description=f"Comma-separated relationships to resolve: {', '.join(USER_EXPANSIONS)}; "
+                    "both are included when neither fields nor expand is given"
+    )
+) -> FieldSelection:
+    return parse_selection(fields, expand, USER_FIELDS, USER_EXPANSIONS)
+
+def person_selection(
+    fields: Optional[str] = Query(
+        None, pattern=_list_pattern(PERSON_FIELDS),
+        description=f"Comma-separated columns to return: {', '.join(PERSON_FIELDS)} (id is always included)"
+    )
+) -> FieldSelection:
+    return parse_selection(fields, None, PERSON_FIELDS)
+
+def _permissions_by_role(db: Session, role_ids: List[int]) -> Dict[int, List[str]]:
+    names: Dict[int, List[str]] = defaultdict(list)
+    if role_ids:
+        rows = (
+            db.query(role_permissions.c.role_id, Permission.name)
+            .join(Permission, Permission.id == role_permissions.c.permission_id)
+            .filter(role_permissions.c.role_id.in_(role_ids))
+        )
+        for role_id, name in rows:
+            names[role_id].append(name)
+    return names
+
+def query_users(db: Session, selection: FieldSelection, skip: int = 0, limit: int = 100,
+                user_id: Optional[int] = None) -> List[UserSparseResponse]:
+    """The selected user columns (one user when user_id is given) as sparse responses"""
+    query = db.query(*(getattr(User, name) for name in selection.columns))
+    if "role" in selection.expansions:
+        query = query.outerjoin(Role, Role.id == User.role_id).add_columns(Role.name.label("role_name"))
+    if "permissions" in selection.expansions:
+        query = query.add_columns(User.role_id)
+    if user_id is not None:
+        query = query.filter(User.id == user_id)
+    rows = query.offset(skip).limit(limit).all()
+
+    permissions = {}
+    if "permissions" in selection.expansions:
+        permissions = _permissions_by_role(db, sorted({row.role_id for row in rows if row.role_id is not None}))
+    users = []
+    for row in rows:
+        values = {name: getattr(row, name) for name in selection.columns}
+        if "role" in selection.expansions:
+            values["role"] = row.role_name
+        if "permissions" in selection.expansions:
+            values["permissions"] = list(permissions.get(row.role_id, []))
+        # Only the given fields are marked set; the rest are excluded when serialized
+        users.append(UserSparseResponse.model_construct(**values))
+    return users
+
+def query_persons(db: Session, selection: FieldSelection, skip: int = 0, limit: int = 100,
+                  person_id: Optional[str] = None) -> List[PersonSparseResponse]:
+    """The selected person columns (one person when person_id is given) as sparse responses"""
+    query = db.query(*(getattr(Person, name) for name in selection.columns))
+    if person_id is not None:
+        try:
+            # The Uuid column binds UUID objects, not strings
+            query = query.filter(Person.id == uuid.UUID(person_id))
+        except ValueError:
+            return []
+    persons = []
+    for row in query.offset(skip).limit(limit).all():
+        values = {name: getattr(row, name) for name in selection.columns}
+        values["id"] = str(values["id"])
+        if "role" in values:
+            values["role"] = PersonRole(values["role"].value)
+        persons.append(PersonSparseResponse.model_construct(**values))
+    return persons
@@ -0,0 +1,18 @@
+"""
+JWKS endpoint publishing the public JWT signing keys
+"""
+
+from fastapi import APIRouter, Response
+from config import settings
+from jwt_keys import jwt_key_store
+
+router = APIRouter()
+
+@router.get("/.well-known/jwks.json")
+async def get_jwks(response: Response):
+    """
+    Public keys for verifying access and refresh tokens.
+    Includes the next signing key ahead of rotation and the previous one until its tokens expire.
+    """
+    response.headers["Cache-Control"] = f"public, max-age={settings.jwks_cache_ttl}"
+    return jwt_key_store.jwks()
@@ -0,0 +1,129 @@
+"""
+Asymmetric JWT signing keys and the JWKS document
+
+With ALGORITHM=RS256 and JWT_KEYS_DIR set, tokens are signed with a private
+key from that directory and carry its key id (kid) in the header. Other
+services verify tokens locally against the public keys published at
+/.well-known/jwks.json, so they never need the signing secret. RS256
+without JWT_KEYS_DIR is a configuration error and fails at startup.
+
+The directory holds <kid>.pem private keys and a keyset.json manifest:
+
+    {"keys": [{"kid": "...", "activate_at": 1700000000}, ...]}
+
+The signing key is the one with the latest activate_at in the past. Every
+key in the manifest is published, so a rotation publishes the next key well
+before it signs anything (at least jwks_cache_ttl ahead, so verifiers have
+it cached) and keeps the previous key until the tokens it signed expire.
+Workers pick up manifest changes without a restart. Manage the directory
+with `python manage_jwt_keys.py`.
+
+EdDSA is not supported by python-jose, hence RS256.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from jose import jwk
+from jose.exceptions import JWTError
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "keyset.json"
+ASYMMETRIC_ALGORITHMS = {"RS256", "RS384", "RS512"}
+
+class SigningKey:
+    """One key pair from the key directory"""
+
+    def __init__(self, kid: str, activate_at: float, private_pem: str, algorithm: str):
+        self.kid = kid
+        self.activate_at = activate_at
+        self.private_pem = private_pem
+        public_key = jwk.construct(private_pem, algorithm).public_key()
+        self.public_jwk = {**public_key.to_dict(), "kid": kid, "use": "sig"}
+        self.public_pem = public_key.to_pem().decode()
+
+class JWTKeyStore:
+    """Loads the key directory and picks signing / verification keys"""
+
+    def __init__(self, keys_dir: Optional[str], algorithm: str, reload_interval: float = 10.0, clock=time.time):
+        if algorithm in ASYMMETRIC_ALGORITHMS and not keys_dir:
+            # Fail at startup rather than on every login (the secret is no RSA key)
+            raise ValueError(f"ALGORITHM={algorithm} requires JWT_KEYS_DIR (see manage_jwt_keys.py)")
+        self.keys_dir = keys_dir
+        self.algorithm = algorithm
+        self.reload_interval = reload_interval
+        self._clock = clock
+        self._keys: Dict[str, SigningKey] = {}
+        self._manifest_mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.keys_dir) and self.algorithm in ASYMMETRIC_ALGORITHMS
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if self._keys and now - self._checked_at < self.reload_interval:
+            return
+        with self._lock:
+            self._checked_at = now
+            manifest_path = os.path.join(self.keys_dir, MANIFEST_FILE)
+            try:
+                mtime = os.stat(manifest_path).st_mtime
+            except OSError as e:
+                raise JWTError(f"JWT key manifest unavailable: {e}")
+            if mtime == self._manifest_mtime:
+                return
+            self._keys = self._load(manifest_path)
+            self._manifest_mtime = mtime
+            logger.info(f"Loaded {len(self._keys)} JWT signing keys", extra={"kids": list(self._keys)})
+
+    def _load(self, manifest_path: str) -> Dict[str, SigningKey]:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        keys = {}
+        for entry in manifest.get("keys", []):
+            kid = entry["kid"]
+            # Keep keys already parsed; RSA key construction is not free
+            existing = self._keys.get(kid)
+            if existing is not None and existing.activate_at == entry["activate_at"]:
+                keys[kid] = existing
+                continue
+            with open(os.path.join(self.keys_dir, f"{kid}.pem")) as f:
+                keys[kid] = SigningKey(kid, entry["activate_at"], f.read(), self.algorithm)
+        return keys
+
+    def signing_key(self) -> SigningKey:
+        """The newest key whose activation time has passed"""
+        self._maybe_reload()
+        now = self._clock()
+        active = [key for key in self._keys.values() if key.activate_at <= now]
+        if not active:
+            raise JWTError("No active JWT signing key")
+        return max(active, key=lambda key: key.activate_at)
+
+    def verification_key(self, kid: Optional[str]) -> str:
+        """Public key for a token's kid"""
+        self._maybe_reload()
+        key = self._keys.get(kid) if kid else None
+        if key is None:
+            raise JWTError(f"Unknown signing key: {kid}")
+        return key.public_pem
+
+    def jwks(self) -> Dict[str, List[Dict[str, Any]]]:
+        """Public keys of the previous, current and next signing keys"""
+        if not self.enabled:
+            return {"keys": []}
+        self._maybe_reload()
+        keys = sorted(self._keys.values(), key=lambda key: key.activate_at)
+        return {"keys": [key.public_jwk for key in keys]}
+
+# Global key store
+jwt_key_store = JWTKeyStore(settings.jwt_keys_dir, settings.algorithm)
@@ -2,6 +2,8 @@ from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
 from jose import JWTError, jwt
 from config import settings
+from token_revocation import token_revocation
+from jwt_keys import jwt_key_store
 import logging
 
 logger = logging.getLogger(__name__)
@@ -42,7 +44,13 @@ class JWTManager:
         })
         
         try:
-            encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
+            if jwt_key_store.enabled:
+                signing_key = jwt_key_store.signing_key()
+                encoded_jwt = jwt.encode(
+                    to_encode, signing_key.private_pem, algorithm=self.algorithm, headers={"kid": signing_key.kid}
+                )
+            else:
+                encoded_jwt = jwt.encode(to_encode, self.secret_key, algorithm=self.algorithm)
             logger.info(f"Created {token_type} token", extra={
                 "username": data.get("sub"),
                 "expires": expire.isoformat(),
@@ -53,13 +61,19 @@ class JWTManager:
             logger.error(f"Failed to create {token_type} token: {e}")
             raise
     
-    def validate_token(self, token: str, expected_type: str = "access") -> Dict[str, Any]:
+    def verification_key(self, token: str) -> str:
+        """Key to verify a token: the public key for its kid, or the shared secret"""
+        if not jwt_key_store.enabled:
+            return self.secret_key
+        return jwt_key_store.verification_key(jwt.get_unverified_header(token).get("kid"))
+    
+    def validate_token(self, token: str, expected_type: str = "access", check_revocation: bool = True) -> Dict[str, Any]:
         """Validate JWT token with comprehensive checks"""
         try:
             # Decode with all validations enabled
             payload = jwt.decode(
                 token,
-                self.secret_key,
+                self.verification_key(token),
                 algorithms=[self.algorithm],
                 options={
                     "verify_exp": True,
@@ -99,6 +113,10 @@ class JWTManager:
             if payload["iat"] > current_time + 60:  # 1 minute buffer for clock skew
                 raise JWTError("Token issued in the future")
             
+            # Check the revocation denylist (in memory)
+            if check_revocation and token_revocation.is_revoked(payload["jti"], payload["exp"]):
+                raise JWTError("Token has been revoked")
+            
             logger.debug(f"Token validation successful", extra={
                 "username": payload.get("sub"),
                 "token_type": payload.get("type"),
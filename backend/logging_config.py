@@ -35,6 +35,8 @@ class JSONFormatter(logging.Formatter):
             log_entry['status_code'] = record.status_code
         if hasattr(record, 'duration'):
             log_entry['duration_ms'] = record.duration
+        if hasattr(record, 'slow_query'):
+            log_entry['slow_query'] = record.slow_query
             
         # Add exception info if present
         if record.exc_info:
@@ -1,13 +1,19 @@
+import time
+_import_started = time.perf_counter()
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException, status, Response, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, JSONResponse, ORJSONResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from typing import List
 import os
 import json
 import logging
+import uuid
 from input_sanitizer import InputSanitizer
 from cors_security import get_cors_config, SecureCORSMiddleware
 from logging_config import setup_logging
@@ -15,57 +21,132 @@ from middleware.logging_middleware import LoggingMiddleware
 from middleware.security_middleware import SecurityMiddleware
 from middleware.security_headers import SecurityHeadersMiddleware
 from middleware.jwt_middleware import JWTValidationMiddleware
-from middleware.sentry_middleware import SentryContextMiddleware
+from middleware.db_routing_middleware import DBRoutingMiddleware
+from middleware.deadline_middleware import DeadlineMiddleware, deadline_exceeded_response
+from middleware.admission_middleware import AdmissionControlMiddleware
+from deadlines import DeadlineExceeded
 from rate_limiter import check_auth_rate_limit, check_login_rate_limit, rate_limiter
 from security_monitor import security_monitor
 from csrf_protection import init_csrf_protection, require_csrf_protection, csrf_protection
 from slowapi_limiter import limiter, rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from sentry_config import init_sentry, capture_api_error
-from telemetry import init_telemetry, record_request, record_auth_attempt, record_active_user
-import sentry_sdk
-import time
+from telemetry import TracingMiddleware, init_telemetry, record_request, record_auth_attempt, record_active_user
+from startup import startup_report
+from warmup import warm_up
 
-from database import get_db, engine
+from database import get_db, engine, write_engine, unique_violation
 from models import Base, User, Role, Permission, Person, PersonRole
 from schemas import (
     UserCreate, UserResponse, LoginRequest, LoginResponse, PersonCreate, PersonResponse, PersonUpdate,
     RegisterRequest, RegisterResponse, UserUpdate, UserRoleUpdate, UserPromoteRequest, UserPromoteResponse,
     RoleCreate, RoleResponse, RoleUpdate, PermissionCreate, PermissionResponse, PermissionUpdate,
-    MessageResponse, UserCreateWithAutoPassword, UserCreateResponse, PersonCreateWithAutoPassword, PersonCreateResponse
+    MessageResponse, UserCreateWithAutoPassword, UserCreateResponse, PersonCreateWithAutoPassword, PersonCreateResponse,
+    UserSparseResponse, PersonSparseResponse
 )
-from password_utils import generate_and_hash_password, generate_strong_password
+from password_utils import generate_and_hash_password, generate_strong_password, hash_password_async
 from password_security import password_security_manager
 from password_audit_endpoint import router as password_audit_router
+from jwks_endpoint import router as jwks_router
 from auth import (
-    create_access_token, create_refresh_token, verify_token, get_current_user, verify_password, get_password_hash,
-    requires_role, requires_permission, requires_any_role, is_admin, get_user_permissions
+    create_access_token, create_refresh_token, verify_token, get_current_user, verify_password,
+    requires_role, requires_permission, requires_read_permission, requires_any_role, is_admin
 )
+from serialization import json_response, user_response, person_response, role_response, permission_response
+from fieldsets import FieldSelection, user_selection, person_selection, query_users, query_persons
+from etags import USERS, PERSONS, ROLES, PERMISSIONS, compute_etag, not_modified, cacheable
 from config import settings
+from monitoring.health_checks import router as health_router, health_sampler
+from entity_stats import entity_stats
+from db_routing import replica_router, get_read_db
+from token_revocation import token_revocation
+from api_keys import api_key_usage
+from monitoring.slow_queries import slow_query_log
 
-# Setup logging
-setup_logging()
 logger = logging.getLogger(__name__)
 
-# Initialize Sentry
-init_sentry()
+# serve.py preloads this module in its master process and sets APP_PRELOADED;
+# the lifespan then runs in each worker after the fork
+PRELOADED = os.getenv("APP_PRELOADED") == "1"
 
-# Initialize OpenTelemetry
-init_telemetry()
-
-# Initialize CSRF protection
+# Initialize CSRF protection (routers bind the instance when they are imported)
 init_csrf_protection(settings.secret_key)
 
+# Background tasks, started in this order and stopped in reverse
+BACKGROUND_TASKS = [
+    ("health_sampler", health_sampler),  # samples dependencies so probes answer from memory
+    ("entity_stats", entity_stats),  # reconciles entity counters at startup and periodically
+    ("replica_router", replica_router),  # tracks replica health and lag for read routing
+    ("token_revocation", token_revocation),  # loads the jti denylist and follows other workers' revocations
+    ("api_key_usage", api_key_usage)  # writes API key last-used timestamps in batches
+]
+
+def _engines():
+    engines = [e for e in (engine, write_engine) if e is not None]
+    engines.extend(replica.engine for replica in replica_router.replicas)
+    return engines
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Start the subsystems in order, each timed into startup_report (see
+    startup.py); optional ones that are not configured are not imported
+    """
+    startup_report.begin()
+    with startup_report.step("logging"):
+        setup_logging()
+
+    if settings.sentry_dsn:
+        with startup_report.step("sentry", optional=True):
+            init_sentry()
+    else:
+        startup_report.skip("sentry", "sentry_dsn not set")
+
+    if settings.telemetry_enabled:
+        with startup_report.step("telemetry", optional=True):
+            # Under serve.py every worker runs this; the app serves /metrics itself
+            init_telemetry(app=app, engines=_engines(), metrics_port=None if PRELOADED else 8001)
+    else:
+        startup_report.skip("telemetry", "telemetry_enabled is off")
+
+    with startup_report.step("database_schema", optional=True):
+        # Create database tables (if they don't exist)
+        try:
+            Base.metadata.create_all(bind=engine)
+        except Exception:
+            logger.warning("Please run 'python init_db.py' to initialize the database")
+            raise
+
+    for name, task in BACKGROUND_TASKS:
+        with startup_report.step(name):
+            await task.start()
+    # Runs in the background; /health/readiness answers 503 until it is done
+    await warm_up.start(app, _engines())
+    startup_report.finish()
+
+    yield
+
+    await warm_up.stop()
+    for name, task in reversed(BACKGROUND_TASKS):
+        await task.stop()
+    slow_query_log.shutdown()
+
 app = FastAPI(
     title="ACI API",
     description="Internal SaaS Application API with Role-Based Access Control",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson for everything the handlers do not serialize themselves (see serialization.py)
+    default_response_class=ORJSONResponse
 )
 
 # Add rate limiting
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, rate_limit_exceeded_handler)
 
+# 504 when a request outlives its deadline
+app.add_exception_handler(DeadlineExceeded, deadline_exceeded_response)
+
 # Metrics middleware
 @app.middleware("http")
 async def metrics_middleware(request: Request, call_next):
@@ -103,25 +184,11 @@ async def global_exception_handler(request: Request, exc: Exception):
     }, exc_info=True)
     
     # Return generic error response
-    raise HTTPException(
+    return JSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-        detail="Internal server error"
+        content={"detail": "Internal server error"}
     )
 
-# Create database tables (if they don't exist)
-try:
-    Base.metadata.create_all(bind=engine)
-    logger.info("Database tables created successfully")
-except Exception as e:
-    logger.error(f"Could not create database tables: {e}")
-    logger.warning("Please run 'python init_db.py' to initialize the database")
-
-app = FastAPI(
-    title="ACI API",
-    description="Internal SaaS Application API with Role-Based Access Control",
-    version="1.0.0"
-)
-
 # Include API routers
 from api.v1.router import v1_router
 from api.versioning import version_router
@@ -129,18 +196,27 @@ app.include_router(v1_router, prefix="/api")
 app.include_router(version_router, prefix="/api", tags=["API Info"])
 
 # Include health check router
-from api.health import health_router
 app.include_router(health_router)
 
 # Include password audit router
 app.include_router(password_audit_router)
 
+# Public JWT signing keys
+app.include_router(jwks_router)
+
+# Read-your-writes pinning for replica reads
+app.add_middleware(DBRoutingMiddleware)
+
 # Add security and logging middleware
 app.add_middleware(SecurityHeadersMiddleware)
-app.add_middleware(SentryContextMiddleware)
+if settings.sentry_dsn:
+    from middleware.sentry_middleware import SentryContextMiddleware
+    app.add_middleware(SentryContextMiddleware)
 app.add_middleware(JWTValidationMiddleware)
 app.add_middleware(SecurityMiddleware)
 app.add_middleware(LoggingMiddleware)
+app.add_middleware(AdmissionControlMiddleware)
+app.add_middleware(DeadlineMiddleware)
 # app.add_middleware(BusinessFlowMiddleware)  # Removed because BusinessFlowMiddleware is not defined
 
 # Input sanitization middleware
@@ -181,6 +257,10 @@ async def cors_security_middleware(request: Request, call_next):
 cors_config = get_cors_config(settings.environment, settings.cors_origins)
 app.add_middleware(CORSMiddleware, **cors_config)
 
+# Outermost, so spans cover the whole stack; filled in by init_telemetry
+if settings.telemetry_enabled:
+    app.add_middleware(TracingMiddleware)
+
 security = HTTPBearer()
 
 @app.get("/")
@@ -249,17 +329,20 @@ async def login_legacy(login_data: LoginRequest, response: Response, request: Re
     return await login(login_data, response, request, db, None)
 
 @app.get("/api/auth/me", response_model=UserResponse, deprecated=True)
-async def get_current_user_info_legacy(current_user: User = Depends(get_current_user)):
+async def get_current_user_info_legacy(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
     """Legacy user info endpoint - use /api/v1/auth/me instead"""
-    return UserResponse(
-        id=current_user.id,
-        username=current_user.username,
-        email=current_user.email,
-        role=current_user.role.name if current_user.role else None,
-        permissions=get_user_permissions(current_user),
-        is_active=current_user.is_active,
-        created_at=current_user.created_at
-    )
+    etag = compute_etag(db, request, [USERS, ROLES, PERMISSIONS], current_user.id)
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    # The user was loaded before the versions were read; reload so the body is
+    # never older than the ETag it is stored under
+    db.refresh(current_user)
+    return cacheable(json_response(UserResponse, user_response(current_user)), etag)
 
 @app.post("/api/auth/logout", deprecated=True)
 async def logout_legacy(response: Response, request: Request, _csrf: None = Depends(require_csrf_protection)):
@@ -316,51 +399,42 @@ async def get_secure_files(current_user: User = Depends(requires_any_role(["ITRA
     }
 
 # User management endpoints (Admin only)
-@app.get("/api/users", response_model=List[UserResponse])
+@app.get("/api/users", response_model=List[UserSparseResponse])
 async def get_users(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(requires_permission("user:read"))
+    selection: FieldSelection = Depends(user_selection),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(requires_read_permission("user:read"))
 ):
-    """Get all users (requires user:read permission)"""
-    users = db.query(User).offset(skip).limit(limit).all()
-    return [
-        UserResponse(
-            id=user.id,
-            username=user.username,
-            email=user.email,
-            role=user.role.name if user.role else None,
-            permissions=get_user_permissions(user),
-            is_active=user.is_active,
-            created_at=user.created_at
-        )
-        for user in users
-    ]
-
-@app.get("/api/users/{user_id}", response_model=UserResponse)
+    """
+    Get all users (requires user:read permission); ?fields= / ?expand= select
+    what is returned; conditional on If-None-Match
+    """
+    etag = compute_etag(db, request, [USERS, ROLES, PERMISSIONS])
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    users = query_users(db, selection, skip=skip, limit=limit)
+    return cacheable(json_response(List[UserSparseResponse], users, exclude_unset=True), etag)
+
+@app.get("/api/users/{user_id}", response_model=UserSparseResponse)
 async def get_user(
     user_id: int,
+    selection: FieldSelection = Depends(user_selection),
     db: Session = Depends(get_db),
     current_user: User = Depends(requires_permission("user:read"))
 ):
-    """Get specific user by ID (requires user:read permission)"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if user is None:
+    """Get specific user by ID (requires user:read permission); ?fields= / ?expand= select what is returned"""
+    users = query_users(db, selection, user_id=user_id, limit=1)
+    if not users:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found"
         )
     
-    return UserResponse(
-        id=user.id,
-        username=user.username,
-        email=user.email,
-        role=user.role.name if user.role else None,
-        permissions=get_user_permissions(user),
-        is_active=user.is_active,
-        created_at=user.created_at
-    )
+    return json_response(UserSparseResponse, users[0], exclude_unset=True)
 
 @app.post("/api/users", response_model=UserResponse)
 async def create_user(
@@ -375,27 +449,8 @@ async def create_user(
         "user_id": current_user.id
     })
     
-    # Check if user already exists
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
-    if existing_user:
-        logger.warning("User creation failed - username exists", extra={
-            "created_by": current_user.username,
-            "attempted_username": user_data.username
-        })
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
-        )
-    
-    existing_email = db.query(User).filter(User.email == user_data.email).first()
-    if existing_email:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
-    # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    # Create new user; the unique constraints on username/email reject duplicates
+    hashed_password = await hash_password_async(user_data.password)
     db_user = User(
         username=user_data.username,
         email=user_data.email,
@@ -404,7 +459,22 @@ async def create_user(
     )
     
     db.add(db_user)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        column = unique_violation(e, ("username", "email"))
+        if column is None:
+            raise
+        if column == "username":
+            logger.warning("User creation failed - username exists", extra={
+                "created_by": current_user.username,
+                "attempted_username": user_data.username
+            })
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{column.capitalize()} already registered"
+        )
     db.refresh(db_user)
     
     logger.info("User created successfully", extra={
@@ -414,15 +484,7 @@ async def create_user(
         "role_id": db_user.role_id
     })
     
-    return UserResponse(
-        id=db_user.id,
-        username=db_user.username,
-        email=db_user.email,
-        role=db_user.role.name if db_user.role else None,
-        permissions=get_user_permissions(db_user),
-        is_active=db_user.is_active,
-        created_at=db_user.created_at
-    )
+    return user_response(db_user)
 
 @app.post("/api/users/auto-password", response_model=UserCreateResponse)
 async def create_user_with_auto_password(
@@ -431,21 +493,6 @@ async def create_user_with_auto_password(
     current_user: User = Depends(requires_permission("user:create"))
 ):
     """Create a new user with auto-generated secure password (requires user:create permission)"""
-    # Check if user already exists
-    existing_user = db.query(User).filter(User.username == user_data.username).first()
-    if existing_user:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
-        )
-    
-    existing_email = db.query(User).filter(User.email == user_data.email).first()
-    if existing_email:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
     # Generate secure password with audit logging
     password_data = password_security_manager.create_user_password(
         username=user_data.username,
@@ -463,20 +510,22 @@ async def create_user_with_auto_password(
     )
     
     db.add(db_user)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        column = unique_violation(e, ("username", "email"))
+        if column is None:
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{column.capitalize()} already registered"
+        )
     db.refresh(db_user)
     
     return UserCreateResponse(
         message=f"User {user_data.username} created successfully with auto-generated password",
-        user=UserResponse(
-            id=db_user.id,
-            username=db_user.username,
-            email=db_user.email,
-            role=db_user.role.name if db_user.role else None,
-            permissions=get_user_permissions(db_user),
-            is_active=db_user.is_active,
-            created_at=db_user.created_at
-        ),
+        user=user_response(db_user),
         generated_password=password_data['plain_password']  # Only returned once for security
     )
 
@@ -496,24 +545,11 @@ async def update_user(
         )
     
     # Update fields if provided
+    # Username/email uniqueness is enforced by the constraints at commit
     if user_data.username is not None:
-        # Check if username is already taken
-        existing_user = db.query(User).filter(User.username == user_data.username, User.id != user_id).first()
-        if existing_user:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already taken"
-            )
         user.username = user_data.username
     
     if user_data.email is not None:
-        # Check if email is already taken
-        existing_email = db.query(User).filter(User.email == user_data.email, User.id != user_id).first()
-        if existing_email:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already taken"
-            )
         user.email = user_data.email
     
     if user_data.role_id is not None:
@@ -529,18 +565,23 @@ async def update_user(
     if user_data.is_active is not None:
         user.is_active = user_data.is_active
     
-    db.commit()
+    if user_data.is_service_account is not None:
+        user.is_service_account = user_data.is_service_account
+    
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        column = unique_violation(e, ("username", "email"))
+        if column is None:
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{column.capitalize()} already taken"
+        )
     db.refresh(user)
     
-    return UserResponse(
-        id=user.id,
-        username=user.username,
-        email=user.email,
-        role=user.role.name if user.role else None,
-        permissions=get_user_permissions(user),
-        is_active=user.is_active,
-        created_at=user.created_at
-    )
+    return user_response(user)
 
 @app.delete("/api/users/{user_id}")
 async def delete_user(
@@ -607,35 +648,23 @@ async def promote_user(
     
     return UserPromoteResponse(
         message=f"User {user.username} promoted to {role.name} role",
-        user=UserResponse(
-            id=user.id,
-            username=user.username,
-            email=user.email,
-            role=user.role.name if user.role else None,
-            permissions=get_user_permissions(user),
-            is_active=user.is_active,
-            created_at=user.created_at
-        )
+        user=user_response(user)
     )
 
 # Role management endpoints (Admin only)
 @app.get("/api/roles", response_model=List[RoleResponse])
 async def get_roles(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(requires_permission("role:read"))
+    request: Request,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(requires_read_permission("role:read"))
 ):
-    """Get all roles (requires role:read permission)"""
+    """Get all roles (requires role:read permission); conditional on If-None-Match"""
+    etag = compute_etag(db, request, [ROLES, PERMISSIONS])
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
     roles = db.query(Role).all()
-    return [
-        RoleResponse(
-            id=role.id,
-            name=role.name,
-            description=role.description,
-            permissions=[perm.name for perm in role.permissions],
-            created_at=role.created_at
-        )
-        for role in roles
-    ]
+    return cacheable(json_response(List[RoleResponse], [role_response(role) for role in roles]), etag)
 
 @app.post("/api/roles", response_model=RoleResponse)
 async def create_role(
@@ -667,31 +696,22 @@ async def create_role(
     db.commit()
     db.refresh(db_role)
     
-    return RoleResponse(
-        id=db_role.id,
-        name=db_role.name,
-        description=db_role.description,
-        permissions=[perm.name for perm in db_role.permissions],
-        created_at=db_role.created_at
-    )
+    return role_response(db_role)
 
 # Permission management endpoints (Admin only)
 @app.get("/api/permissions", response_model=List[PermissionResponse])
 async def get_permissions(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(requires_permission("permission:read"))
+    request: Request,
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(requires_read_permission("permission:read"))
 ):
-    """Get all permissions (requires permission:read permission)"""
+    """Get all permissions (requires permission:read permission); conditional on If-None-Match"""
+    etag = compute_etag(db, request, [PERMISSIONS])
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
     permissions = db.query(Permission).all()
-    return [
-        PermissionResponse(
-            id=perm.id,
-            name=perm.name,
-            description=perm.description,
-            created_at=perm.created_at
-        )
-        for perm in permissions
-    ]
+    return cacheable(json_response(List[PermissionResponse], [permission_response(perm) for perm in permissions]), etag)
 
 @app.post("/api/permissions", response_model=PermissionResponse)
 async def create_permission(
@@ -718,12 +738,7 @@ async def create_permission(
     db.commit()
     db.refresh(db_permission)
     
-    return PermissionResponse(
-        id=db_permission.id,
-        name=db_permission.name,
-        description=db_permission.description,
-        created_at=db_permission.created_at
-    )
+    return permission_response(db_permission)
 
 # Person endpoints (keeping existing functionality)
 @app.post("/api/persons", response_model=PersonResponse)
@@ -733,16 +748,8 @@ async def create_person(
     current_user: User = Depends(requires_permission("person:create"))
 ):
     """Create a new person with manual password (requires person:create permission)"""
-    # Check if person already exists
-    existing_person = db.query(Person).filter(Person.username == person_data.username).first()
-    if existing_person:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
-        )
-    
     # Create new person
-    hashed_password = get_password_hash(person_data.password)
+    hashed_password = await hash_password_async(person_data.password)
     db_person = Person(
         username=person_data.username,
         email=person_data.email,
@@ -751,17 +758,20 @@ async def create_person(
     )
     
     db.add(db_person)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        column = unique_violation(e, ("username", "email"))
+        if column is None:
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{column.capitalize()} already registered"
+        )
     db.refresh(db_person)
     
-    return PersonResponse(
-        id=str(db_person.id),
-        username=db_person.username,
-        email=db_person.email,
-        role=db_person.role.value,
-        is_active=db_person.is_active,
-        created_at=db_person.created_at
-    )
+    return person_response(db_person)
 
 @app.post("/api/persons/auto-password", response_model=PersonCreateResponse)
 async def create_person_with_auto_password(
@@ -770,21 +780,6 @@ async def create_person_with_auto_password(
     current_user: User = Depends(requires_permission("person:create"))
 ):
     """Create a new person with auto-generated secure password (requires person:create permission)"""
-    # Check if person already exists
-    existing_person = db.query(Person).filter(Person.username == person_data.username).first()
-    if existing_person:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Username already registered"
-        )
-    
-    existing_email = db.query(Person).filter(Person.email == person_data.email).first()
-    if existing_email:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Email already registered"
-        )
-    
     # Generate secure password with audit logging
     password_data = password_security_manager.create_user_password(
         username=person_data.username,
@@ -802,65 +797,75 @@ async def create_person_with_auto_password(
     )
     
     db.add(db_person)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError as e:
+        db.rollback()
+        column = unique_violation(e, ("username", "email"))
+        if column is None:
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{column.capitalize()} already registered"
+        )
     db.refresh(db_person)
     
     return PersonCreateResponse(
         message=f"Person {person_data.username} created successfully with auto-generated password",
-        person=PersonResponse(
-            id=str(db_person.id),
-            username=db_person.username,
-            email=db_person.email,
-            role=db_person.role.value,
-            is_active=db_person.is_active,
-            created_at=db_person.created_at
-        ),
+        person=person_response(db_person),
         generated_password=password_data['plain_password']  # Only returned once for security
     )
 
-@app.get("/api/persons", response_model=List[PersonResponse])
+@app.get("/api/persons", response_model=List[PersonSparseResponse])
 async def get_persons(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(requires_permission("person:read"))
+    selection: FieldSelection = Depends(person_selection),
+    db: Session = Depends(get_read_db),
+    current_user: User = Depends(requires_read_permission("person:read"))
 ):
-    """Get all persons (requires person:read permission)"""
-    persons = db.query(Person).offset(skip).limit(limit).all()
-    return [
-        PersonResponse(
-            id=str(person.id),
-            username=person.username,
-            email=person.email,
-            role=person.role.value,
-            is_active=person.is_active,
-            created_at=person.created_at
-        )
-        for person in persons
-    ]
-
-@app.get("/api/persons/{person_id}", response_model=PersonResponse)
+    """
+    Get all persons (requires person:read permission); ?fields= selects what
+    is returned; conditional on If-None-Match
+    """
+    etag = compute_etag(db, request, [PERSONS])
+    unchanged = not_modified(request, etag)
+    if unchanged:
+        return unchanged
+    persons = query_persons(db, selection, skip=skip, limit=limit)
+    return cacheable(json_response(List[PersonSparseResponse], persons, exclude_unset=True), etag)
+
+@app.get("/api/persons/{person_id}", response_model=PersonSparseResponse)
 async def get_person(
     person_id: str,
+    selection: FieldSelection = Depends(person_selection),
     db: Session = Depends(get_db),
     current_user: User = Depends(requires_permission("person:read"))
 ):
-    """Get specific person (requires person:read permission)"""
-    person = db.query(Person).filter(Person.id == person_id).first()
-    if person is None:
+    """Get specific person (requires person:read permission); ?fields= selects what is returned"""
+    persons = query_persons(db, selection, person_id=person_id, limit=1)
+    if not persons:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Person not found"
         )
     
-    return PersonResponse(
-        id=str(person.id),
-        username=person.username,
-        email=person.email,
-        role=person.role.value,
-        is_active=person.is_active,
-        created_at=person.created_at
-    )
+    return json_response(PersonSparseResponse, persons[0], exclude_unset=True)
+
+def get_person_or_404(db: Session, person_id: str) -> Person:
+    """The person with this id; 404 if there is none or the id is not a UUID"""
+    try:
+        # The Uuid column binds UUID objects, not strings
+        person = db.query(Person).filter(Person.id == uuid.UUID(person_id)).first()
+    except ValueError:
+        person = None
+    if person is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Person not found"
+        )
+    return person
 
 @app.put("/api/persons/{person_id}", response_model=PersonResponse)
 async def update_person(
@@ -870,12 +875,7 @@ async def update_person(
     current_user: User = Depends(requires_permission("person:update"))
 ):
     """Update person (requires person:update permission)"""
-    person = db.query(Person).filter(Person.id == person_id).first()
-    if person is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Person not found"
-        )
+    person = get_person_or_404(db, person_id)
     
     # Update fields if provided
     if person_data.username is not None:
@@ -890,14 +890,7 @@ async def update_person(
     db.commit()
     db.refresh(person)
     
-    return PersonResponse(
-        id=str(person.id),
-        username=person.username,
-        email=person.email,
-        role=person.role.value,
-        is_active=person.is_active,
-        created_at=person.created_at
-    )
+    return person_response(person)
 
 @app.delete("/api/persons/{person_id}")
 async def delete_person(
@@ -906,12 +899,7 @@ async def delete_person(
     current_user: User = Depends(requires_permission("person:delete"))
 ):
     """Delete person (requires person:delete permission)"""
-    person = db.query(Person).filter(Person.id == person_id).first()
-    if person is None:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Person not found"
-        )
+    person = get_person_or_404(db, person_id)
     
     db.delete(person)
     db.commit()
@@ -961,6 +949,22 @@ async def get_analytics(current_user: User = Depends(requires_any_role(["SuperUs
         }
     }
 
+startup_report.import_seconds = round(time.perf_counter() - _import_started, 4)
+
+def init_worker():
+    """
+    Per-process setup of a worker forked from the preloaded app (serve.py):
+    drop database connections and Redis clients inherited from the master.
+    Sentry and telemetry start in the worker's lifespan.
+    """
+    import cache_config
+
+    for worker_engine in _engines():
+        # close=False: the sockets belong to the master's pool
+        worker_engine.dispose(close=False)
+    cache_config._sync_client = None
+
 if __name__ == "__main__":
+    # Single process for local runs; production uses `python serve.py`
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
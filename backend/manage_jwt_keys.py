@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Manage the JWT signing key directory (see jwt_keys.py)
+
+    python manage_jwt_keys.py init --dir /run/secrets/jwt
+    python manage_jwt_keys.py rotate --dir /run/secrets/jwt --publish-ahead 3600
+    python manage_jwt_keys.py list --dir /run/secrets/jwt
+    python manage_jwt_keys.py prune --dir /run/secrets/jwt
+
+`rotate` adds a new key that is published in the JWKS immediately but only
+starts signing after --publish-ahead seconds (at least JWKS_CACHE_TTL, so
+every verifier has it cached by then). `prune` removes keys that were
+superseded longer ago than the refresh token lifetime. Run rotate and prune
+on a schedule (e.g. a daily cron job) against the shared key directory.
+"""
+
+import argparse
+import json
+import os
+import secrets
+import time
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from config import settings
+from jwt_keys import MANIFEST_FILE
+
+def read_manifest(keys_dir: str) -> Dict[str, List[Dict]]:
+    path = os.path.join(keys_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"keys": []}
+    with open(path) as f:
+        return json.load(f)
+
+def write_manifest(keys_dir: str, manifest: Dict[str, List[Dict]]):
+    # Write-then-rename so workers never read a partial manifest
+    path = os.path.join(keys_dir, MANIFEST_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+def add_key(keys_dir: str, activate_at: float) -> str:
+    """Generate an RSA key pair and add it to the manifest"""
+    os.makedirs(keys_dir, exist_ok=True)
+    kid = secrets.token_hex(8)
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.PKCS8,
+        encryption_algorithm=serialization.NoEncryption()
+    )
+    key_path = os.path.join(keys_dir, f"{kid}.pem")
+    fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(pem)
+
+    manifest = read_manifest(keys_dir)
+    manifest["keys"].append({"kid": kid, "activate_at": int(activate_at)})
+    write_manifest(keys_dir, manifest)
+    return kid
+
+def prune(keys_dir: str, now: float) -> List[str]:
+    """Remove keys superseded for longer than the refresh token lifetime"""
+    max_token_lifetime = settings.refresh_token_expire_days * 86400
+    manifest = read_manifest(keys_dir)
+    keys = sorted(manifest["keys"], key=lambda entry: entry["activate_at"])
+    removed = []
+    kept = []
+    for entry, successor in zip(keys, keys[1:] + [None]):
+        if successor is not None and successor["activate_at"] + max_token_lifetime < now:
+            removed.append(entry["kid"])
+        else:
+            kept.append(entry)
+    manifest["keys"] = kept
+    write_manifest(keys_dir, manifest)
+    for kid in removed:
+        os.remove(os.path.join(keys_dir, f"{kid}.pem"))
+    return removed
+
+def _format_time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage JWT signing keys")
+    parser.add_argument("command", choices=["init", "rotate", "list", "prune"])
+    parser.add_argument("--dir", default=settings.jwt_keys_dir, help="Key directory (default JWT_KEYS_DIR)")
+    parser.add_argument("--publish-ahead", type=int, default=max(3600, 2 * settings.jwks_cache_ttl),
+                        help="Seconds a new key is published before it signs tokens")
+    args = parser.parse_args()
+    if not args.dir:
+        raise SystemExit("No key directory: pass --dir or set JWT_KEYS_DIR")
+
+    now = time.time()
+    if args.command == "init":
+        if read_manifest(args.dir)["keys"]:
+            raise SystemExit(f"{args.dir} already has keys; use rotate")
+        print(f"Created signing key {add_key(args.dir, now)} (active now)")
+    elif args.command == "rotate":
+        if args.publish_ahead < settings.jwks_cache_ttl:
+            raise SystemExit(f"--publish-ahead must be at least JWKS_CACHE_TTL ({settings.jwks_cache_ttl}s)")
+        kid = add_key(args.dir, now + args.publish_ahead)
+        print(f"Published key {kid}; signs tokens from {_format_time(now + args.publish_ahead)}")
+    elif args.command == "prune":
+        removed = prune(args.dir, now)
+        print(f"Removed {len(removed)} retired keys: {', '.join(removed) or '-'}")
+    else:
+        keys = sorted(read_manifest(args.dir)["keys"], key=lambda entry: entry["activate_at"])
+        active = [entry for entry in keys if entry["activate_at"] <= now]
+        current = active[-1]["kid"] if active else None
+        for entry in keys:
+            state = "active" if entry["kid"] == current else ("next" if entry["activate_at"] > now else "previous")
+            print(f"{entry['kid']}  {state:8}  activates {_format_time(entry['activate_at'])}")
+
+if __name__ == "__main__":
+    main()
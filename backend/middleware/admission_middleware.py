@@ -0,0 +1,39 @@
+import logging
+import time
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Callable
+from admission_control import AdmissionRejected, admission_controller, classify
+
+logger = logging.getLogger(__name__)
+
+class AdmissionControlMiddleware(BaseHTTPMiddleware):
+    """Per-priority concurrency limits; excess load is shed with 503 + Retry-After"""
+    
+    async def dispatch(self, request: Request, call_next: Callable):
+        priority = classify(request.method, request.url.path)
+        limiter = admission_controller.limiter_for(priority)
+        if limiter is None:
+            return await call_next(request)
+        
+        try:
+            await limiter.acquire()
+        except AdmissionRejected as e:
+            logger.debug(f"Shed {request.method} {request.url.path}: {e.reason}")
+            return JSONResponse(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                content={"detail": "Server busy, retry later"},
+                headers={"Retry-After": str(e.retry_after)}
+            )
+        
+        start = time.monotonic()
+        # Only latency and deadline 504s say this server is over capacity; a
+        # 503 from an unavailable dependency (Redis) or an unhandled error does not
+        overloaded = False
+        try:
+            response = await call_next(request)
+            overloaded = response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+            return response
+        finally:
+            limiter.release(time.monotonic() - start, overloaded)
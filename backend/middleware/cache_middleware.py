@@ -8,12 +8,22 @@ from fastapi_cache.decorator import cache
 import redis.asyncio as redis
 import logging
 from datetime import timedelta
+from circuit_breaker import CircuitOpenError
+from cache_config import cache_config, redis_breaker
 
 logger = logging.getLogger(__name__)
 
 class CacheMiddleware:
-    def __init__(self, redis_client: redis.Redis, cache_ttl: int = 3600):
-        self.redis_client = redis_client
+    """
+    Response cache helpers backed by Redis.
+    
+    Degraded mode: calls go through the shared Redis circuit breaker. While it
+    is open, reads return a miss and writes/invalidations are skipped without
+    touching the network, so handlers fall through to the database.
+    """
+    
+    def __init__(self, redis_client: Optional[redis.Redis] = None, cache_ttl: int = 3600):
+        self.redis_client = redis_client or cache_config.redis_client
         self.cache_ttl = cache_ttl
     
     async def init_cache(self):
@@ -39,33 +49,46 @@ class CacheMiddleware:
     
     async def get_cached_response(self, key: str) -> Optional[Any]:
         """Get cached response from Redis"""
+        if self.redis_client is None:
+            return None
         try:
-            cached_data = await self.redis_client.get(key)
+            cached_data = await redis_breaker.call(self.redis_client.get, key)
             if cached_data:
                 return json.loads(cached_data)
+        except CircuitOpenError:
+            logger.debug("Redis circuit open - cache bypassed")
         except Exception as e:
             logger.error(f"Error retrieving cached response: {e}")
         return None
     
     async def set_cached_response(self, key: str, response_data: Any, ttl: Optional[int] = None):
         """Cache response in Redis"""
+        if self.redis_client is None:
+            return
         try:
             ttl = ttl or self.cache_ttl
-            await self.redis_client.setex(
+            await redis_breaker.call(
+                self.redis_client.setex,
                 key,
                 ttl,
                 json.dumps(response_data, default=str)
             )
+        except CircuitOpenError:
+            logger.debug("Redis circuit open - cache write skipped")
         except Exception as e:
             logger.error(f"Error caching response: {e}")
     
     async def invalidate_cache_pattern(self, pattern: str):
         """Invalidate cache entries matching pattern"""
+        if self.redis_client is None:
+            return
         try:
-            keys = await self.redis_client.keys(pattern)
+            keys = await redis_breaker.call(self.redis_client.keys, pattern)
             if keys:
-                await self.redis_client.delete(*keys)
+                await redis_breaker.call(self.redis_client.delete, *keys)
                 logger.info(f"Invalidated {len(keys)} cache entries")
+        except CircuitOpenError:
+            logger.warning(f"Redis circuit open - cache invalidation skipped for {pattern}")
         except Exception as e:
             logger.error(f"Error invalidating cache: {e}")
 
@@ -77,10 +100,10 @@ def cache_endpoint(expire: int = 3600, key_builder=None):
 # Cache invalidation helpers
 async def invalidate_user_cache(user_id: int):
     """Invalidate all cache entries for a specific user"""
-    cache = CacheMiddleware(None)  # Will use existing Redis client
+    cache = CacheMiddleware()  # Will use existing Redis client
     await cache.invalidate_cache_pattern(f"saas-cache:*user:{user_id}*")
 
 async def invalidate_api_cache(endpoint: str):
     """Invalidate cache for specific API endpoint"""
-    cache = CacheMiddleware(None)
+    cache = CacheMiddleware()
     await cache.invalidate_cache_pattern(f"saas-cache:*{endpoint}*")
@@ -0,0 +1,40 @@
+import time
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Callable
+from config import settings
+from db_routing import replica_router, client_key, begin_request, end_request, PIN_COOKIE
+
+class DBRoutingMiddleware(BaseHTTPMiddleware):
+    """Pins clients to the primary database right after their own writes"""
+    
+    async def dispatch(self, request: Request, call_next: Callable):
+        if not replica_router.replicas:
+            return await call_next(request)
+        
+        key = client_key(request.cookies, request.headers)
+        pinned = replica_router.is_pinned(key) or self._cookie_pinned(request)
+        token = begin_request(pinned, key)
+        try:
+            response = await call_next(request)
+        finally:
+            state = end_request(token)
+        
+        if state["wrote"]:
+            until = replica_router.pin(key)
+            response.set_cookie(
+                key=PIN_COOKIE,
+                value=str(int(until) + 1),
+                max_age=int(replica_router.pin_seconds) + 1,
+                httponly=True,
+                secure=settings.environment == "production",
+                samesite="lax"
+            )
+        return response
+    
+    def _cookie_pinned(self, request: Request) -> bool:
+        """Pin set by another worker (cookie holds the expiry timestamp)"""
+        try:
+            return float(request.cookies.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
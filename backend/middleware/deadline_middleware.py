@@ -0,0 +1,34 @@
+import logging
+from fastapi import Request, status
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+from typing import Callable
+import deadlines
+
+logger = logging.getLogger(__name__)
+
+def deadline_exceeded_response(request: Request, exc: deadlines.DeadlineExceeded) -> JSONResponse:
+    """504 for a request that ran out of time waiting on a dependency"""
+    deadlines.deadline_exceeded_total.labels(dependency=exc.dependency).inc()
+    logger.warning(f"Request deadline exceeded waiting on {exc.dependency}", extra={
+        "request_id": getattr(request.state, "request_id", None),
+        "method": request.method,
+        "endpoint": str(request.url.path)
+    })
+    return JSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={"detail": "Request deadline exceeded"}
+    )
+
+class DeadlineMiddleware(BaseHTTPMiddleware):
+    """Gives each request a time budget that dependencies draw down (see deadlines.py)"""
+    
+    async def dispatch(self, request: Request, call_next: Callable):
+        token = deadlines.start(deadlines.budget_for(request.url.path))
+        try:
+            return await call_next(request)
+        except deadlines.DeadlineExceeded as exc:
+            # Raised in middleware; endpoint errors go through the exception handler
+            return deadline_exceeded_response(request, exc)
+        finally:
+            deadlines.reset(token)
@@ -1,22 +1,32 @@
 import logging
-from datetime import datetime
 from fastapi import Request, HTTPException, status
+from fastapi.responses import JSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from typing import Callable
-from jose import JWTError, jwt
-from config import settings
+from jose import JWTError
+from token_revocation import token_revocation
+from jwt_utils import jwt_manager
+from upstream_auth import trusted_principal
 
 logger = logging.getLogger(__name__)
 
 class JWTValidationMiddleware(BaseHTTPMiddleware):
     """Middleware to validate JWT tokens on each request"""
     
-    # Routes that don't require authentication
+    # Routes that don't require authentication (prefix match). Logout and
+    # refresh must work with an expired access token; refresh checks the
+    # refresh token itself
     EXEMPT_PATHS = {
         "/health",
-        "/api/",
+        "/.well-known/",
         "/api/v1/auth/login",
         "/api/v1/auth/register",
+        "/api/v1/auth/logout",
+        "/api/v1/auth/refresh",
+        "/api/auth/login",
+        "/api/auth/register",
+        "/api/auth/logout",
+        "/api/auth/refresh",
         "/api/v1/csrf/token",
         "/docs",
         "/redoc",
@@ -25,8 +35,6 @@ class JWTValidationMiddleware(BaseHTTPMiddleware):
     
     # Routes that require authentication
     PROTECTED_PATHS = {
-        "/api/v1/auth/logout", # Example
-        "/api/v1/auth/refresh", # Example
         "/api/v1/me",
         "/api/v1/users",
         "/api/v1/secure-files"
@@ -36,21 +44,33 @@ class JWTValidationMiddleware(BaseHTTPMiddleware):
         path = request.url.path
         method = request.method
         
+        # Principal already verified at the edge (signed auth service headers)
+        principal = await trusted_principal(request)
+        if principal:
+            request.state.jwt_payload = principal
+            request.state.username = principal["sub"]
+            return await call_next(request)
+        
         # Skip validation for exempt paths and GET requests to public endpoints
         if self._is_exempt_path(path) or (method == "GET" and not self._requires_auth(path)):
             return await call_next(request)
         
+        # API key requests are authenticated by the auth dependencies
+        if self._has_api_key(request):
+            return await call_next(request)
+        
         # Validate JWT for protected paths
         if self._requires_auth(path) or method in ["POST", "PUT", "DELETE", "PATCH"]:
             try:
-                self._validate_jwt_token(request)
+                await self._validate_jwt_token(request)
             except HTTPException as e:
                 logger.warning(f"JWT validation failed for {method} {path}", extra={
                     "ip_address": request.client.host if request.client else "unknown",
                     "user_agent": request.headers.get("user-agent", ""),
                     "error": str(e.detail)
                 })
-                raise e
+                # Raised here it would bypass the exception handlers (500)
+                return JSONResponse(status_code=e.status_code, content={"detail": e.detail}, headers=e.headers)
         
         return await call_next(request)
     
@@ -58,11 +78,16 @@ class JWTValidationMiddleware(BaseHTTPMiddleware):
         """Check if path is exempt from JWT validation"""
         return any(path.startswith(exempt) for exempt in self.EXEMPT_PATHS)
     
+    def _has_api_key(self, request: Request) -> bool:
+        """Check if the request carries a service-account API key"""
+        auth_header = request.headers.get("Authorization", "")
+        return auth_header.startswith("ApiKey ") or "x-api-key" in request.headers
+    
     def _requires_auth(self, path: str) -> bool:
         """Check if path requires authentication"""
         return any(path.startswith(protected) for protected in self.PROTECTED_PATHS)
     
-    def _validate_jwt_token(self, request: Request):
+    async def _validate_jwt_token(self, request: Request):
         """Validate JWT token from cookie or header"""
         token = self._extract_token(request)
         
@@ -73,53 +98,18 @@ class JWTValidationMiddleware(BaseHTTPMiddleware):
             )
         
         try:
-            # Decode and validate JWT with all claims
-            payload = jwt.decode(
-                token,
-                settings.secret_key,
-                algorithms=[settings.algorithm],
-                options={
-                    "verify_exp": True,
-                    "verify_nbf": True,
-                    "verify_iat": True,
-                    "verify_signature": True
-                }
-            )
-            
-            # Validate required claims
-            username = payload.get("sub")
-            token_type = payload.get("type")
-            exp = payload.get("exp")
-            iat = payload.get("iat")
-            nbf = payload.get("nbf")
-            jti = payload.get("jti")
-            
-            if not all([username, token_type, exp, iat, nbf, jti]):
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid token claims"
-                )
-            
-            # Validate token type
-            if token_type != "access":
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Invalid token type"
-                )
-            
-            # Additional expiration validation
-            current_time = datetime.utcnow().timestamp()
-            if current_time >= exp:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Token has expired"
-                )
+            # Signature, audience / issuer and claims; revocation is checked
+            # below without blocking the event loop
+            payload = jwt_manager.validate_token(token, "access", check_revocation=False)
+            username = payload["sub"]
+            jti = payload["jti"]
+            exp = payload["exp"]
             
-            # Validate not-before claim
-            if current_time < nbf:
+            # Reject revoked tokens (in-memory denylist; Redis only to confirm rare Bloom hits)
+            if await token_revocation.is_revoked_async(jti, exp):
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Token not yet valid"
+                    detail="Token has been revoked"
                 )
             
             # Store validated claims in request state
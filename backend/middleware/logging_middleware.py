@@ -4,6 +4,7 @@ import logging
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
 from typing import Callable
+from monitoring.slow_queries import bind_request, unbind_request
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +34,9 @@ class LoggingMiddleware(BaseHTTPMiddleware):
             "user_agent": request.headers.get("user-agent", ""),
         })
         
+        # Tag slow statements with this request
+        slow_query_token = bind_request(request.scope, request_id)
+        
         try:
             # Process request
             response = await call_next(request)
@@ -69,4 +73,6 @@ class LoggingMiddleware(BaseHTTPMiddleware):
                 "error": str(e),
             }, exc_info=True)
             
-            raise
\ No newline at end of file
+            raise
+        finally:
+            unbind_request(slow_query_token)
\ No newline at end of file
@@ -1,27 +1,50 @@
 import json
+import time
 import redis.asyncio as redis
-from typing import Optional, Dict, Any
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
 from datetime import timedelta
 import logging
 from fastapi import Request, Response, HTTPException
 from jose import jwt, JWTError
 from config import settings
+from cache_config import redis_breaker, redis_client_options
+from circuit_breaker import CircuitOpenError
 
 logger = logging.getLogger(__name__)
 
+class SessionStoreUnavailable(Exception):
+    """Raised when Redis is unavailable and the session is not cached locally"""
+
+    def __init__(self, retry_after: float = 0):
+        super().__init__("Session store unavailable")
+        self.retry_after = retry_after
+
 class RedisSessionManager:
-    def __init__(self):
+    """
+    Redis-backed sessions.
+    
+    Degraded mode: Redis calls go through the shared circuit breaker. Sessions
+    read successfully are remembered per worker for session_local_cache_ttl
+    seconds; while Redis is failing those are served from the local cache and
+    last-activity updates are dropped. Sessions not cached locally raise
+    SessionStoreUnavailable instead of being treated as invalid.
+    """
+    
+    def __init__(self, local_cache_ttl: int = None, local_cache_size: int = 10000):
         self.redis_client = None
         self.session_ttl = 86400  # 24 hours
+        self.local_cache_ttl = local_cache_ttl if local_cache_ttl is not None else settings.session_local_cache_ttl
+        self.local_cache_size = local_cache_size
+        self._local_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
     
     async def init_redis(self):
         """Initialize Redis connection"""
         self.redis_client = redis.Redis(
             host=settings.redis_host,
             port=settings.redis_port,
-            password=settings.redis_password,
             db=1,  # Use separate DB for sessions
-            decode_responses=True
+            **redis_client_options()
         )
         logger.info("Redis session manager initialized")
     
@@ -35,11 +58,13 @@ class RedisSessionManager:
                 "last_activity": str(self._get_timestamp())
             })
             
-            await self.redis_client.setex(
+            await redis_breaker.call(
+                self.redis_client.setex,
                 session_id,
                 self.session_ttl,
                 json.dumps(session_data)
             )
+            self._remember(session_id, session_data)
             
             logger.info(f"Session created for user {user_id}")
             return session_id
@@ -48,39 +73,53 @@ class RedisSessionManager:
             raise
     
     async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
-        """Get session data from Redis"""
+        """Get session data from Redis, falling back to the local cache"""
         try:
-            session_data = await self.redis_client.get(session_id)
-            if session_data:
-                data = json.loads(session_data)
-                # Update last activity
-                data["last_activity"] = str(self._get_timestamp())
-                await self.redis_client.setex(
-                    session_id,
-                    self.session_ttl,
-                    json.dumps(data)
-                )
-                return data
-            return None
+            session_data = await redis_breaker.call(self.redis_client.get, session_id)
+        except CircuitOpenError as e:
+            return self._degraded_lookup(session_id, e.retry_after)
         except Exception as e:
             logger.error(f"Error retrieving session: {e}")
+            return self._degraded_lookup(session_id, redis_breaker.retry_after())
+        
+        if not session_data:
+            self._local_cache.pop(session_id, None)
             return None
+        
+        data = json.loads(session_data)
+        # Update last activity (best effort)
+        data["last_activity"] = str(self._get_timestamp())
+        try:
+            await redis_breaker.call(
+                self.redis_client.setex,
+                session_id,
+                self.session_ttl,
+                json.dumps(data)
+            )
+        except Exception as e:
+            logger.debug(f"Skipped session activity update: {e}")
+        self._remember(session_id, data)
+        return data
     
     async def delete_session(self, session_id: str):
         """Delete session from Redis"""
+        self._local_cache.pop(session_id, None)
         try:
-            await self.redis_client.delete(session_id)
+            await redis_breaker.call(self.redis_client.delete, session_id)
             logger.info(f"Session {session_id} deleted")
         except Exception as e:
             logger.error(f"Error deleting session: {e}")
     
     async def delete_all_user_sessions(self, user_id: int):
         """Delete all sessions for a user"""
+        prefix = f"session:{user_id}:"
+        for session_id in [key for key in self._local_cache if key.startswith(prefix)]:
+            del self._local_cache[session_id]
         try:
             pattern = f"session:{user_id}:*"
-            keys = await self.redis_client.keys(pattern)
+            keys = await redis_breaker.call(self.redis_client.keys, pattern)
             if keys:
-                await self.redis_client.delete(*keys)
+                await redis_breaker.call(self.redis_client.delete, *keys)
                 logger.info(f"Deleted {len(keys)} sessions for user {user_id}")
         except Exception as e:
             logger.error(f"Error deleting user sessions: {e}")
@@ -89,12 +128,29 @@ class RedisSessionManager:
         """Get count of active sessions for user"""
         try:
             pattern = f"session:{user_id}:*"
-            keys = await self.redis_client.keys(pattern)
+            keys = await redis_breaker.call(self.redis_client.keys, pattern)
             return len(keys)
         except Exception as e:
             logger.error(f"Error counting active sessions: {e}")
             return 0
     
+    def _remember(self, session_id: str, data: Dict[str, Any]):
+        """Keep a short-lived local copy of a session"""
+        if self.local_cache_ttl <= 0:
+            return
+        self._local_cache[session_id] = (time.monotonic() + self.local_cache_ttl, data)
+        self._local_cache.move_to_end(session_id)
+        while len(self._local_cache) > self.local_cache_size:
+            self._local_cache.popitem(last=False)
+    
+    def _degraded_lookup(self, session_id: str, retry_after: float) -> Dict[str, Any]:
+        """Serve a session from the local cache while Redis is unavailable"""
+        entry = self._local_cache.get(session_id)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        self._local_cache.pop(session_id, None)
+        raise SessionStoreUnavailable(retry_after)
+    
     def _generate_session_id(self) -> str:
         """Generate unique session ID"""
         import uuid
@@ -126,7 +182,14 @@ async def session_middleware(request: Request, call_next):
         return response
     
     # Validate session
-    session_data = await session_manager.get_session(session_token)
+    try:
+        session_data = await session_manager.get_session(session_token)
+    except SessionStoreUnavailable as e:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": "Session store temporarily unavailable"},
+            headers={"Retry-After": str(max(1, int(e.retry_after)))}
+        )
     if not session_data:
         return JSONResponse(
             status_code=401,
@@ -0,0 +1,33 @@
+-- Entity counters for dashboard stats (see backend/entity_stats.py)
+-- Counters are maintained by ORM events and reconciled periodically;
+-- the INSERT below seeds them from the current data.
+
+CREATE TABLE IF NOT EXISTS entity_counts (
+    entity VARCHAR NOT NULL,
+    role VARCHAR NOT NULL,
+    is_active BOOLEAN NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    PRIMARY KEY (entity, role, is_active)
+);
+
+INSERT INTO entity_counts (entity, role, is_active, count)
+SELECT 'users', COALESCE(role_id::text, ''), COALESCE(is_active, true), COUNT(*)
+FROM users
+GROUP BY 2, 3
+ON CONFLICT (entity, role, is_active) DO UPDATE SET count = EXCLUDED.count;
+
+-- person.role stores the enum name; entity_stats keys persons by the enum value
+INSERT INTO entity_counts (entity, role, is_active, count)
+SELECT 'person',
+       CASE role::text
+           WHEN 'SUPER_USER' THEN 'SuperUser'
+           WHEN 'OPERATOR' THEN 'Operator'
+           WHEN 'USER' THEN 'User'
+           ELSE role::text
+       END,
+       COALESCE(is_active, true),
+       COUNT(*)
+FROM person
+GROUP BY 2, 3
+ON CONFLICT (entity, role, is_active) DO UPDATE SET count = EXCLUDED.count;
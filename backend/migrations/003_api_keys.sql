@@ -0,0 +1,17 @@
+-- Service-account API keys (see backend/api_keys.py)
+-- key_id is the public prefix of the key; only an HMAC-SHA256 of the secret is stored.
+
+CREATE TABLE IF NOT EXISTS api_keys (
+    id SERIAL PRIMARY KEY,
+    key_id VARCHAR(16) NOT NULL UNIQUE,
+    secret_hash VARCHAR(64) NOT NULL,
+    name VARCHAR NOT NULL,
+    user_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    created_by VARCHAR,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT now(),
+    expires_at TIMESTAMP WITH TIME ZONE,
+    revoked_at TIMESTAMP WITH TIME ZONE,
+    last_used_at TIMESTAMP WITH TIME ZONE
+);
+
+CREATE INDEX IF NOT EXISTS ix_api_keys_user_id ON api_keys (user_id);
@@ -0,0 +1,30 @@
+-- Time-ordered UUIDv7 keys for person (see backend/uuid_utils.py)
+-- The application now generates v7 ids. Existing v4 ids stay as they are:
+-- both are plain uuid values, so lookups, foreign references and tokens that
+-- carry old ids keep working, and new rows append at the right edge of the
+-- primary-key index. No rows are rewritten.
+--
+-- The server-side default below covers rows inserted outside the ORM
+-- (psql, bulk loads). On PostgreSQL 18+ the built-in uuidv7() can be used
+-- instead of this function.
+
+CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid AS $$
+    -- Overlay the 48-bit millisecond timestamp on a random v4 uuid and turn
+    -- version 4 (0100) into version 7 (0111); the variant bits are kept
+    SELECT encode(
+        set_bit(
+            set_bit(
+                overlay(uuid_send(gen_random_uuid())
+                        PLACING substring(int8send(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint) FROM 3)
+                        FROM 1 FOR 6),
+                52, 1),
+            53, 1),
+        'hex')::uuid;
+$$ LANGUAGE sql VOLATILE;
+
+ALTER TABLE person ALTER COLUMN id SET DEFAULT uuid_generate_v7();
+
+-- Optional, after a large backlog of v4 inserts: rebuild the bloated
+-- indexes once so the freed space is reclaimed (PostgreSQL 12+).
+-- REINDEX INDEX CONCURRENTLY person_pkey;
+-- REINDEX INDEX CONCURRENTLY ix_person_id;
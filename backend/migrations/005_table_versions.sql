@@ -0,0 +1,14 @@
+-- Table version counters for ETags (see backend/etags.py)
+-- Bumped by an ORM flush hook in the same transaction as each write;
+-- bulk updates and raw SQL (including later data migrations) must bump
+-- the matching row themselves, as the last statement here does.
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    table_name VARCHAR PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT now()
+);
+
+INSERT INTO table_versions (table_name, version)
+VALUES ('users', 1), ('person', 1), ('roles', 1), ('permissions', 1)
+ON CONFLICT (table_name) DO UPDATE SET version = table_versions.version + 1, updated_at = now();
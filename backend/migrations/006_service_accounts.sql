@@ -0,0 +1,5 @@
+-- Service accounts (see backend/api_keys.py)
+-- Only users flagged here can be given API keys, and a key stops working
+-- as soon as its user is unflagged or deactivated.
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS is_service_account BOOLEAN NOT NULL DEFAULT false;
@@ -1,10 +1,9 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Table, Enum, Index
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Table, Enum, Index, Uuid
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
-from sqlalchemy.dialects.postgresql import UUID
-import uuid
+from sqlalchemy.sql import false, func
 import enum
 from database import Base
+from uuid_utils import uuid7
 
 # Association table for many-to-many relationship between roles and permissions
 role_permissions = Table(
@@ -24,11 +23,13 @@ class PersonRole(enum.Enum):
 class Person(Base):
     __tablename__ = "person"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
+    # Native uuid on PostgreSQL, CHAR(32) elsewhere (SQLite); time-ordered v7 keys
+    id = Column(Uuid(as_uuid=True), primary_key=True, default=uuid7, index=True)
     username = Column(String, unique=True, index=True, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
-    role = Column(Enum(PersonRole), nullable=False, index=True)
+    # Native enum on PostgreSQL; VARCHAR with a CHECK constraint on SQLite
+    role = Column(Enum(PersonRole, create_constraint=True), nullable=False, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     is_active = Column(Boolean, default=True, index=True)
     
@@ -45,6 +46,7 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean, default=True, index=True)
+    is_service_account = Column(Boolean, default=False, server_default=false(), nullable=False)  # may hold API keys
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -80,4 +82,39 @@ class Permission(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     
     # Relationships
-    roles = relationship("Role", secondary=role_permissions, back_populates="permissions") 
\ No newline at end of file
+    roles = relationship("Role", secondary=role_permissions, back_populates="permissions")
+
+class ApiKey(Base):
+    """Service-account API key; only an HMAC of the secret is stored"""
+    __tablename__ = "api_keys"
+
+    id = Column(Integer, primary_key=True)
+    key_id = Column(String(16), unique=True, nullable=False)  # public prefix, indexed by the unique constraint
+    secret_hash = Column(String(64), nullable=False)  # hex HMAC-SHA256 of the secret
+    name = Column(String, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_by = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True))
+    revoked_at = Column(DateTime(timezone=True))
+    last_used_at = Column(DateTime(timezone=True))
+
+    user = relationship("User")
+
+class EntityCount(Base):
+    """Row counts per entity, role and active state, maintained by entity_stats"""
+    __tablename__ = "entity_counts"
+
+    entity = Column(String, primary_key=True)
+    role = Column(String, primary_key=True)  # role id (users) or role value (person); "" when unset
+    is_active = Column(Boolean, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class TableVersion(Base):
+    """Change counter per table, bumped by etags.py in every flush that writes the table"""
+    __tablename__ = "table_versions"
+
+    table_name = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -1,9 +1,8 @@
 """
 Enhanced health check system for FastAPI backend
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, HTTPException
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
 from sqlalchemy import text
 from typing import Dict, Any, Optional
 import redis
@@ -11,9 +10,11 @@ import logging
 import time
 from datetime import datetime
 
-from database import get_db
+from database import engine
 from config import settings
 from cache_config import get_redis_client
+from monitoring.health_sampler import HealthSampler
+from warmup import warm_up
 
 logger = logging.getLogger(__name__)
 
@@ -26,49 +27,22 @@ class HealthChecker:
         self.checks = {}
         self.start_time = time.time()
     
-    async def check_database(self, db: Session) -> Dict[str, Any]:
-        """Check database connectivity and performance"""
-        try:
-            start_time = time.time()
-            db.execute(text("SELECT 1"))
-            db.execute(text("SELECT COUNT(*) FROM users"))
-            response_time = (time.time() - start_time) * 1000
-            
-            return {
-                "status": "healthy",
-                "response_time_ms": round(response_time, 2),
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        except Exception as e:
-            logger.error(f"Database health check failed: {e}")
-            return {
-                "status": "unhealthy",
-                "error": str(e),
-                "timestamp": datetime.utcnow().isoformat()
-            }
+    def ping_database(self):
+        """Cheap liveness query on a pooled connection (run by the sampler)"""
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
     
-    async def check_redis(self) -> Dict[str, Any]:
-        """Check Redis connectivity and performance"""
-        try:
-            redis_client = get_redis_client()
-            start_time = time.time()
-            redis_client.ping()
-            redis_client.set("health_check", "ok", ex=10)
-            value = redis_client.get("health_check")
-            response_time = (time.time() - start_time) * 1000
-            
-            return {
-                "status": "healthy",
-                "response_time_ms": round(response_time, 2),
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        except Exception as e:
-            logger.error(f"Redis health check failed: {e}")
-            return {
-                "status": "unhealthy",
-                "error": str(e),
-                "timestamp": datetime.utcnow().isoformat()
-            }
+    def ping_redis(self):
+        """Redis round trip without writing keys (run by the sampler)"""
+        get_redis_client().ping()
+    
+    def check_database(self) -> Dict[str, Any]:
+        """Cached database health from the background sampler"""
+        return health_sampler.snapshot(["database"])["database"]
+    
+    def check_redis(self) -> Dict[str, Any]:
+        """Cached Redis health from the background sampler"""
+        return health_sampler.snapshot(["redis"])["redis"]
     
     async def check_external_services(self) -> Dict[str, Any]:
         """Check external service dependencies"""
@@ -104,6 +78,13 @@ class HealthChecker:
 
 health_checker = HealthChecker()
 
+# Dependencies are sampled in the background; probes read the cached state
+health_sampler = HealthSampler()
+health_sampler.register("database", health_checker.ping_database)
+health_sampler.register("redis", health_checker.ping_redis)
+
+CRITICAL_DEPENDENCIES = ["database", "redis"]
+
 @router.get("/liveness")
 async def liveness_probe():
     """Kubernetes liveness probe - basic app health"""
@@ -120,28 +101,36 @@ async def liveness_probe():
     )
 
 @router.get("/readiness")
-async def readiness_probe(db: Session = Depends(get_db)):
-    """Kubernetes readiness probe - dependency health"""
+async def readiness_probe():
+    """
+    Kubernetes readiness probe - dependency health from the last samples;
+    not ready until this worker's warm-up has finished (see warmup.py)
+    """
     try:
         # Check critical dependencies
-        db_health = await health_checker.check_database(db)
-        redis_health = await health_checker.check_redis()
+        db_health = health_checker.check_database()
+        redis_health = health_checker.check_redis()
         
         all_healthy = (
             db_health["status"] == "healthy" and
             redis_health["status"] == "healthy"
         )
         
-        status_code = 200 if all_healthy else 503
+        if not warm_up.ready:
+            status = "warming_up"
+        else:
+            status = "ready" if all_healthy else "not_ready"
+        status_code = 200 if status == "ready" else 503
         
         return JSONResponse(
             status_code=status_code,
             content={
-                "status": "ready" if all_healthy else "not_ready",
+                "status": status,
                 "timestamp": datetime.utcnow().isoformat(),
                 "checks": {
                     "database": db_health,
-                    "redis": redis_health
+                    "redis": redis_health,
+                    "warmup": warm_up.public_state()
                 }
             }
         )
@@ -157,12 +146,12 @@ async def readiness_probe(db: Session = Depends(get_db)):
         )
 
 @router.get("/startup")
-async def startup_probe(db: Session = Depends(get_db)):
+async def startup_probe():
     """Kubernetes startup probe - initial health check"""
     try:
         # Comprehensive startup checks
-        db_health = await health_checker.check_database(db)
-        redis_health = await health_checker.check_redis()
+        db_health = health_checker.check_database()
+        redis_health = health_checker.check_redis()
         external_health = await health_checker.check_external_services()
         
         all_healthy = (
@@ -196,12 +185,12 @@ async def startup_probe(db: Session = Depends(get_db)):
         )
 
 @router.get("/detailed")
-async def detailed_health_check(db: Session = Depends(get_db)):
+async def detailed_health_check():
     """Comprehensive health check with all dependencies"""
     try:
-        # Run all health checks
-        db_health = await health_checker.check_database(db)
-        redis_health = await health_checker.check_redis()
+        # Read cached dependency samples
+        db_health = health_checker.check_database()
+        redis_health = health_checker.check_redis()
         external_health = await health_checker.check_external_services()
         business_health = await health_checker.check_business_logic()
         
@@ -218,6 +207,11 @@ async def detailed_health_check(db: Session = Depends(get_db)):
                 "version": settings.app_version,
                 "environment": settings.environment,
                 "uptime_seconds": round(time.time() - health_checker.start_time, 2),
+                "sampler": {
+                    "running": health_sampler.running,
+                    "interval_seconds": health_sampler.interval,
+                    "max_staleness_seconds": health_sampler.max_staleness
+                },
                 "checks": {
                     "database": db_health,
                     "redis": redis_health,
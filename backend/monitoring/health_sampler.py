@@ -0,0 +1,156 @@
+"""
+Background health sampler
+
+Dependencies are checked on a fixed schedule by a background task instead of
+on every probe request. Each check runs in a worker thread with a timeout; the
+last result and a bounded latency history are kept per dependency, so probes
+answer from memory in O(1). A result older than the staleness bound is
+reported as unhealthy, which also covers a stuck or dead sampler task.
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+class DependencyState:
+    """Last sample and latency history for one dependency"""
+
+    def __init__(self, name: str, history_size: int):
+        self.name = name
+        self.status = "unknown"
+        self.error: Optional[str] = None
+        self.latency_ms: Optional[float] = None
+        self.checked_at: Optional[float] = None  # time.monotonic() of the last sample
+        self.checked_at_wall: Optional[datetime] = None
+        self.consecutive_failures = 0
+        self.latencies: Deque[float] = deque(maxlen=history_size)
+
+    def record(self, healthy: bool, latency_ms: float, error: Optional[str] = None):
+        self.status = "healthy" if healthy else "unhealthy"
+        self.error = error
+        self.latency_ms = round(latency_ms, 2)
+        self.checked_at = time.monotonic()
+        self.checked_at_wall = datetime.utcnow()
+        self.consecutive_failures = 0 if healthy else self.consecutive_failures + 1
+        self.latencies.append(latency_ms)
+
+    def to_dict(self, max_staleness: float) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"status": self.status}
+        if self.checked_at is None:
+            result["error"] = "not sampled yet"
+            return result
+
+        age = time.monotonic() - self.checked_at
+        if age > max_staleness:
+            result["status"] = "unhealthy"
+            result["error"] = f"last sample is stale ({age:.1f}s old)"
+        elif self.error:
+            result["error"] = self.error
+
+        ordered = sorted(self.latencies)
+        result.update({
+            "response_time_ms": self.latency_ms,
+            "sample_age_seconds": round(age, 2),
+            "consecutive_failures": self.consecutive_failures,
+            "latency_ms": {
+                "p50": round(ordered[len(ordered) // 2], 2),
+                "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 2),
+                "max": round(ordered[-1], 2),
+                "samples": len(ordered)
+            },
+            "timestamp": self.checked_at_wall.isoformat()
+        })
+        return result
+
+class HealthSampler:
+    """Periodically samples registered dependency checks in the background"""
+
+    def __init__(
+        self,
+        interval: float = None,
+        timeout: float = None,
+        max_staleness: float = None,
+        history_size: int = 60
+    ):
+        self.interval = interval if interval is not None else settings.health_sample_interval
+        self.timeout = timeout if timeout is not None else settings.health_check_timeout
+        self.max_staleness = max_staleness if max_staleness is not None else settings.health_max_staleness
+        self.history_size = history_size
+        self._checks: Dict[str, Callable[[], None]] = {}
+        self._states: Dict[str, DependencyState] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def register(self, name: str, check: Callable[[], None]):
+        """Register a blocking check that raises on failure"""
+        self._checks[name] = check
+        self._states[name] = DependencyState(name, self.history_size)
+
+    async def sample(self, name: str):
+        """Run one check with a timeout and record the result"""
+        state = self._states[name]
+        # A check stuck past its timeout keeps its thread; don't pile up more
+        inflight = self._inflight.get(name)
+        if inflight is not None and not inflight.done():
+            state.record(False, self.timeout * 1000, "previous check still running")
+            return
+
+        start = time.perf_counter()
+        future = asyncio.get_running_loop().run_in_executor(None, self._checks[name])
+        self._inflight[name] = future
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.timeout)
+            state.record(True, (time.perf_counter() - start) * 1000)
+        except asyncio.TimeoutError:
+            state.record(False, (time.perf_counter() - start) * 1000, f"check timed out after {self.timeout}s")
+            logger.warning(f"Health check for {name} timed out")
+        except Exception as e:
+            state.record(False, (time.perf_counter() - start) * 1000, str(e))
+            logger.warning(f"Health check for {name} failed: {e}")
+
+    async def sample_all(self):
+        """Sample every registered dependency concurrently"""
+        await asyncio.gather(*(self.sample(name) for name in self._checks))
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sample_all()
+            except Exception as e:
+                logger.error(f"Health sampler iteration failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def start(self):
+        """Start the background sampling task"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"Health sampler started (interval {self.interval}s)")
+
+    async def stop(self):
+        """Stop the background sampling task"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def snapshot(self, names: List[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Return the cached state of the given (default: all) dependencies"""
+        names = names or list(self._states)
+        return {name: self._states[name].to_dict(self.max_staleness) for name in names}
+
+    def is_healthy(self, names: List[str] = None) -> bool:
+        """True if all given dependencies have a fresh healthy sample"""
+        return all(check["status"] == "healthy" for check in self.snapshot(names).values())
@@ -0,0 +1,110 @@
+"""
+Connection pool telemetry
+
+InstrumentedQueuePool is a QueuePool that times every checkout (the wait
+for a free connection, including opening a new one) and counts checkouts
+that hit pool_timeout. Pool occupancy is exported as Prometheus gauges and
+a per-worker snapshot is available from pool_state().
+"""
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List
+
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+logger = logging.getLogger(__name__)
+
+pool_checked_out = Gauge(
+    "db_pool_checked_out",
+    "Connections currently checked out of the pool",
+    ["pool"]
+)
+pool_overflow = Gauge(
+    "db_pool_overflow",
+    "Connections open beyond pool_size (negative while the pool is not full)",
+    ["pool"]
+)
+pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection",
+    ["pool"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+pool_checkout_timeouts = Counter(
+    "db_pool_checkout_timeouts_total",
+    "Checkouts that failed after waiting pool_timeout",
+    ["pool"]
+)
+
+_pools: Dict[str, "InstrumentedQueuePool"] = {}
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool with checkout wait / timeout metrics.
+    The metric label is pool_label (default "primary"), passed through
+    create_engine like any other pool argument.
+    """
+
+    def __init__(self, creator, pool_label: str = "primary", **kwargs):
+        super().__init__(creator, **kwargs)
+        self.pool_name = pool_label
+        self._pool_kwargs = kwargs
+        self.checkout_timeouts = 0
+        self.recent_waits: Deque[float] = deque(maxlen=1000)
+        _pools[self.pool_name] = self
+        event.listen(self, "checkin", self._on_checkin)
+
+    def recreate(self) -> "InstrumentedQueuePool":
+        # QueuePool.recreate() rebuilds the pool from its own argument list,
+        # which would drop pool_label
+        self.logger.info("Pool recreating")
+        return self.__class__(self._creator, pool_label=self.pool_name,
+                              **dict(self._pool_kwargs, _dispatch=self.dispatch))
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except PoolTimeoutError:
+            self.checkout_timeouts += 1
+            pool_checkout_timeouts.labels(pool=self.pool_name).inc()
+            logger.warning(f"Connection pool {self.pool_name} exhausted: {self.status()}")
+            raise
+        wait = time.perf_counter() - start
+        self.recent_waits.append(wait)
+        pool_checkout_wait.labels(pool=self.pool_name).observe(wait)
+        self._update_gauges()
+        return connection
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self._update_gauges()
+
+    def _update_gauges(self):
+        pool_checked_out.labels(pool=self.pool_name).set(self.checkedout())
+        pool_overflow.labels(pool=self.pool_name).set(self.overflow())
+
+    def state(self) -> Dict[str, Any]:
+        waits = sorted(self.recent_waits)
+        return {
+            "pool": self.pool_name,
+            "size": self.size(),
+            "max_overflow": self._max_overflow,
+            "timeout": self._timeout,
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": self.overflow(),
+            "checkout_timeouts": self.checkout_timeouts,
+            "recent_checkouts": len(waits),
+            "wait_p50_ms": round(waits[len(waits) // 2] * 1000, 3) if waits else 0.0,
+            "wait_p99_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.99))] * 1000, 3) if waits else 0.0
+        }
+
+def pool_state() -> Dict[str, Any]:
+    """Pool occupancy for this worker process"""
+    pools: List[Dict[str, Any]] = [pool.state() for pool in _pools.values()]
+    return {"pid": os.getpid(), "pools": pools}
@@ -0,0 +1,286 @@
+"""
+Slow-query log
+
+SlowQueryLog hooks an engine's cursor events, times every statement and
+records those slower than slow_query_threshold_ms (sampled by
+slow_query_sample_rate) into a bounded ring buffer and the structured log.
+Each entry carries a literal-free fingerprint of the SQL, the parameters
+with their values redacted, and the route / request id of the HTTP request
+that ran it.
+
+For a new fingerprint the plan is captured in the background on a separate
+connection: EXPLAIN (ANALYZE, BUFFERS) for plain SELECTs on PostgreSQL,
+EXPLAIN for writes and locking reads (never executed twice), EXPLAIN QUERY
+PLAN on SQLite. A fingerprint is explained at most once per
+slow_query_explain_interval, and plans are dropped rather than queued when
+the explainer falls behind.
+"""
+import contextvars
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from prometheus_client import Counter
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+slow_queries_total = Counter(
+    "db_slow_queries_total",
+    "Statements slower than slow_query_threshold_ms",
+    ["database"]
+)
+
+# Request the current statement runs for, set by LoggingMiddleware
+_request: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "slow_query_request", default=None
+)
+
+_START_KEY = "slow_query_start"
+_MAX_PENDING_EXPLAINS = 4
+
+_BIND_PARAMS = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<![:\w]):\w+|\?")
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+def bind_request(scope: Dict[str, Any], request_id: Optional[str]):
+    return _request.set({"scope": scope, "request_id": request_id})
+
+def unbind_request(token):
+    _request.reset(token)
+
+def normalize_statement(statement: str) -> str:
+    """SQL with literals and bind parameters replaced by ? and IN lists collapsed"""
+    normalized = _BIND_PARAMS.sub("?", statement)
+    normalized = _STRINGS.sub("?", normalized)
+    normalized = _NUMBERS.sub("?", normalized)
+    normalized = _LISTS.sub("(?+)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+def fingerprint(statement: str) -> str:
+    return hashlib.sha1(normalize_statement(statement).encode()).hexdigest()[:16]
+
+def _redact_value(value: Any) -> Any:
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, (str, bytes)):
+        return f"<{type(value).__name__}:{len(value)}>"
+    return f"<{type(value).__name__}>"
+
+def redact_parameters(parameters: Any) -> Any:
+    """Parameter shape and types only; values never leave the process"""
+    if isinstance(parameters, dict):
+        return {key: _redact_value(value) for key, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            redacted = [redact_parameters(item) for item in parameters[:3]]
+            if len(parameters) > 3:
+                redacted.append(f"... {len(parameters) - 3} more")
+            return redacted
+        return [_redact_value(value) for value in parameters]
+    return _redact_value(parameters)
+
+def _request_context() -> Dict[str, Optional[str]]:
+    current = _request.get()
+    if current is None:
+        return {"route": None, "method": None, "request_id": None}
+    scope = current["scope"]
+    route = scope.get("route")
+    return {
+        "route": getattr(route, "path", None) or scope.get("path"),
+        "method": scope.get("method"),
+        "request_id": current["request_id"]
+    }
+
+def _database_name(engine: Engine) -> str:
+    return getattr(engine.pool, "pool_name", None) or engine.url.get_backend_name()
+
+class SlowQueryLog:
+    """Statement timing hook with a ring buffer of slow statements"""
+
+    def __init__(self, threshold_ms: float = None, sample_rate: float = None, buffer_size: int = None,
+                 explain: bool = None, explain_interval: float = None, explain_timeout_ms: int = None):
+        self.threshold_ms = threshold_ms if threshold_ms is not None else settings.slow_query_threshold_ms
+        self.sample_rate = sample_rate if sample_rate is not None else settings.slow_query_sample_rate
+        self.explain = explain if explain is not None else settings.slow_query_explain
+        self.explain_interval = explain_interval if explain_interval is not None else settings.slow_query_explain_interval
+        self.explain_timeout_ms = explain_timeout_ms if explain_timeout_ms is not None else settings.slow_query_explain_timeout_ms
+        self.entries: Deque[Dict[str, Any]] = deque(maxlen=buffer_size or settings.slow_query_buffer_size)
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._explained: Dict[str, float] = {}
+        self._pending = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._side_engines: Dict[int, Engine] = {}
+
+    # Engine hooks
+
+    def attach(self, engine: Engine):
+        event.listen(engine, "before_cursor_execute", self._before_execute)
+        event.listen(engine, "after_cursor_execute", self._after_execute)
+        event.listen(engine, "handle_error", self._on_error)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get(_START_KEY)
+        if not starts:
+            return
+        duration_ms = (time.perf_counter() - starts.pop()) * 1000
+        if duration_ms < self.threshold_ms:
+            return
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+        self.record(conn.engine, statement, parameters, executemany, duration_ms, cursor.rowcount)
+
+    def _on_error(self, exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get(_START_KEY):
+            connection.info[_START_KEY].pop()
+
+    # Recording
+
+    def record(self, engine: Engine, statement: str, parameters: Any, executemany: bool, duration_ms: float, rows: int = -1) -> Dict[str, Any]:
+        database = _database_name(engine)
+        entry = {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "duration_ms": round(duration_ms, 2),
+            "fingerprint": fingerprint(statement),
+            "statement": normalize_statement(statement)[:2000],
+            "parameters": redact_parameters(parameters),
+            "executemany": executemany,
+            "rows": rows,
+            "database": database,
+            **_request_context(),
+            "plan": None
+        }
+        with self._lock:
+            entry["id"] = self._next_id
+            self._next_id += 1
+            self.entries.append(entry)
+        slow_queries_total.labels(database=database).inc()
+        logger.warning(
+            f"Slow query {entry['fingerprint']} took {entry['duration_ms']}ms on {database}",
+            extra={"request_id": entry["request_id"], "endpoint": entry["route"], "method": entry["method"],
+                   "duration": entry["duration_ms"], "slow_query": entry}
+        )
+        if self.explain and not executemany and self._claim_explain(entry["fingerprint"]):
+            self._schedule_explain(engine, statement, parameters, entry)
+        return entry
+
+    def _claim_explain(self, key: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained.get(key, -self.explain_interval) < self.explain_interval:
+                return False
+            if self._pending >= _MAX_PENDING_EXPLAINS:
+                return False
+            self._explained[key] = now
+            self._pending += 1
+            if len(self._explained) > 10000:
+                self._explained = {k: t for k, t in self._explained.items() if now - t < self.explain_interval}
+        return True
+
+    # Plan capture
+
+    def _schedule_explain(self, engine: Engine, statement: str, parameters: Any, entry: Dict[str, Any]):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+        self._executor.submit(self._explain, engine, statement, parameters, entry)
+
+    def _side_engine(self, engine: Engine) -> Engine:
+        side = self._side_engines.get(id(engine))
+        if side is None:
+            connect_args = {"check_same_thread": False} if engine.dialect.name == "sqlite" else {}
+            side = create_engine(engine.url, poolclass=NullPool, connect_args=connect_args)
+            self._side_engines[id(engine)] = side
+        return side
+
+    def explain_prefix(self, dialect: str, statement: str) -> str:
+        if dialect == "sqlite":
+            return "EXPLAIN QUERY PLAN "
+        head = statement.lstrip().upper()
+        plain_read = head.startswith("SELECT") and not re.search(r"\bFOR\s+(UPDATE|SHARE|NO KEY UPDATE|KEY SHARE)\b", head)
+        return "EXPLAIN (ANALYZE, BUFFERS) " if plain_read else "EXPLAIN "
+
+    def _explain(self, engine: Engine, statement: str, parameters: Any, entry: Dict[str, Any]):
+        dialect = engine.dialect.name
+        try:
+            with self._side_engine(engine).connect() as connection:
+                if dialect == "postgresql":
+                    connection.exec_driver_sql(f"SET statement_timeout = {int(self.explain_timeout_ms)}")
+                result = connection.exec_driver_sql(self.explain_prefix(dialect, statement) + statement, parameters)
+                rows = result.fetchall()
+                connection.rollback()
+            entry["plan"] = "\n".join(str(row[-1]) for row in rows)
+            logger.info(f"Plan for slow query {entry['fingerprint']}", extra={
+                "request_id": entry["request_id"], "slow_query": {"fingerprint": entry["fingerprint"], "plan": entry["plan"]}
+            })
+        except Exception as e:
+            entry["plan_error"] = str(e)
+            logger.warning(f"Could not explain slow query {entry['fingerprint']}: {e}")
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    # Reporting
+
+    def recent(self, limit: int = 50, key: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Newest entries first, optionally for one fingerprint"""
+        with self._lock:
+            entries = list(self.entries)
+        if key:
+            entries = [entry for entry in entries if entry["fingerprint"] == key]
+        return entries[::-1][:limit]
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Buffered entries grouped by fingerprint, slowest total first"""
+        groups: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            entries = list(self.entries)
+        for entry in entries:
+            group = groups.setdefault(entry["fingerprint"], {
+                "fingerprint": entry["fingerprint"],
+                "statement": entry["statement"],
+                "count": 0,
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+                "routes": set()
+            })
+            group["count"] += 1
+            group["total_ms"] += entry["duration_ms"]
+            group["max_ms"] = max(group["max_ms"], entry["duration_ms"])
+            if entry["route"]:
+                group["routes"].add(f"{entry['method']} {entry['route']}")
+        summary = []
+        for group in groups.values():
+            group["mean_ms"] = round(group["total_ms"] / group["count"], 2)
+            group["total_ms"] = round(group["total_ms"], 2)
+            group["routes"] = sorted(group["routes"])
+            summary.append(group)
+        return sorted(summary, key=lambda group: group["total_ms"], reverse=True)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        for side in self._side_engines.values():
+            side.dispose()
+        self._side_engines.clear()
+
+# Global instance
+slow_query_log = SlowQueryLog()
@@ -2,12 +2,40 @@
 Password generation utilities for secure user creation
 """
 
+import asyncio
 import secrets
 import string
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
-from typing import Tuple
+from typing import Callable, Optional, Tuple, TypeVar
+from config import settings
+import deadlines
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+T = TypeVar("T")
+
+def build_password_context(time_cost: int, memory_cost: int, parallelism: int) -> CryptContext:
+    """
+    Build the password hashing context.
+    
+    New hashes use argon2id with the given cost parameters. bcrypt stays
+    verifiable for legacy hashes and is marked deprecated, as is any argon2
+    hash with different parameters, so both get rehashed on next login.
+    """
+    return CryptContext(
+        schemes=["argon2", "bcrypt"],
+        deprecated="auto",
+        argon2__type="ID",
+        argon2__time_cost=time_cost,
+        argon2__memory_cost=memory_cost,
+        argon2__parallelism=parallelism
+    )
+
+# Shared by auth.py and everything that creates passwords
+pwd_context = build_password_context(
+    time_cost=settings.password_argon2_time_cost,
+    memory_cost=settings.password_argon2_memory_cost,
+    parallelism=settings.password_argon2_parallelism
+)
 
 def generate_strong_password(length: int = 12) -> str:
     """
@@ -48,13 +76,13 @@ def generate_strong_password(length: int = 12) -> str:
 
 def hash_password(password: str) -> str:
     """
-    Hash password using bcrypt.
+    Hash password using argon2id.
     
     Args:
         password: Plain text password
         
     Returns:
-        Bcrypt hashed password
+        Argon2id hashed password
     """
     return pwd_context.hash(password)
 
@@ -78,9 +106,47 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     
     Args:
         plain_password: Plain text password
-        hashed_password: Bcrypt hashed password
+        hashed_password: Argon2id or legacy bcrypt hashed password
         
     Returns:
         True if password matches, False otherwise
     """
-    return pwd_context.verify(plain_password, hashed_password)
\ No newline at end of file
+    return pwd_context.verify(plain_password, hashed_password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password and return a replacement hash if the stored one is outdated.
+    
+    Args:
+        plain_password: Plain text password
+        hashed_password: Stored hash (argon2id or legacy bcrypt)
+        
+    Returns:
+        Tuple of (matches, new_hash); new_hash is None unless the stored hash
+        uses bcrypt or stale argon2 parameters and the password matched
+    """
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+# Hashing runs on a small thread pool so request handlers don't block the
+# event loop; waits for it are bounded by the request deadline
+_hashing_pool: Optional[ThreadPoolExecutor] = None
+
+async def _run_hashing(func: Callable[..., T], *args) -> T:
+    global _hashing_pool
+    if _hashing_pool is None:
+        _hashing_pool = ThreadPoolExecutor(max_workers=settings.password_hash_workers, thread_name_prefix="password-hash")
+    future = _hashing_pool.submit(func, *args)
+    try:
+        return await deadlines.bounded(asyncio.wrap_future(future), "password_hash")
+    except deadlines.DeadlineExceeded:
+        # Still queued: drop it rather than hash for a request that has given up
+        future.cancel()
+        raise
+
+async def hash_password_async(password: str) -> str:
+    """hash_password on the hashing pool"""
+    return await _run_hashing(hash_password, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """verify_and_update_password on the hashing pool"""
+    return await _run_hashing(verify_and_update_password, plain_password, hashed_password)
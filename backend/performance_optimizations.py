@@ -7,19 +7,10 @@ import time
 from contextlib import asynccontextmanager
 
 # 1. Database Connection Pool Optimization
-from sqlalchemy.pool import QueuePool
-from sqlalchemy import create_engine
-
 def create_optimized_engine(database_url: str):
-    return create_engine(
-        database_url,
-        poolclass=QueuePool,
-        pool_size=20,
-        max_overflow=30,
-        pool_pre_ping=True,
-        pool_recycle=3600,
-        echo=False  # Disable in production
-    )
+    """Pooled engine configured from settings (see database.create_pooled_engine)"""
+    from database import create_pooled_engine
+    return create_pooled_engine(database_url)
 
 # 2. Response Caching Decorator
 def cache_response(expire_time: int = 300):
@@ -39,8 +30,9 @@ class OptimizedQueries:
     
     @staticmethod
     async def get_user_count(db):
-        """Cached user count"""
-        return db.query(User).count()
+        """User count from the maintained entity counters (no table scan)"""
+        from entity_stats import entity_stats, USERS
+        return entity_stats.get_counts(db)[USERS]["total"]
 
 # 4. Background Task Processing
 class BackgroundTasks:
@@ -0,0 +1,190 @@
+"""
+Refresh-token rotation
+
+Every refresh rotates the token: the presented refresh token is revoked and a
+new access/refresh pair is issued in the same token family. Concurrent
+refreshes of one token (several tabs reloading at once) are single-flighted
+per worker, and the resulting pair is kept for a short grace window (locally
+and in Redis, so other workers hand out the same pair). Only the first caller
+touches the database.
+
+Presenting a rotated token after the grace window means it was copied: the
+whole family is revoked and the caller has to log in again. Like access-token
+revocation checks, this fails closed: when Redis cannot say whether the
+family was revoked (by another worker), no new pair is issued.
+"""
+import asyncio
+import json
+import logging
+import time
+import uuid
+from typing import Any, Dict, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from auth import create_access_token, create_refresh_token
+import deadlines
+from cache_config import redis_breaker
+from config import settings
+from jwt_utils import jwt_manager
+from models import User
+from serialization import user_response
+from token_revocation import get_async_client, token_revocation
+
+logger = logging.getLogger(__name__)
+
+ROTATED_KEY = "refresh:rotated:{jti}"
+REVOKED_FAMILY_KEY = "refresh:family:revoked:{family}"
+
+class RefreshTokenReuseError(Exception):
+    """A rotated refresh token was presented after the grace window"""
+
+    def __init__(self, username: str, family: str):
+        self.username = username
+        self.family = family
+        super().__init__(f"Refresh token reuse detected for {username}")
+
+class RefreshFamilyUnavailable(Exception):
+    """Whether the token family was revoked could not be checked"""
+
+    def __init__(self, family: str):
+        self.family = family
+        super().__init__(f"Could not check refresh token family {family}")
+
+def new_token_family() -> str:
+    return uuid.uuid4().hex
+
+class RefreshTokenRotator:
+    """Single-flight refresh rotation with a reuse grace window"""
+
+    def __init__(self, grace_seconds: int = None):
+        self.grace_seconds = grace_seconds if grace_seconds is not None else settings.refresh_reuse_grace_seconds
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._rotated: Dict[str, Tuple[Dict[str, Any], float]] = {}  # jti -> (result, grace expiry)
+        self._revoked_families: Set[str] = set()
+
+    async def rotate(self, refresh_token: str, db: Session) -> Optional[Dict[str, Any]]:
+        """
+        Rotate a refresh token.
+
+        Returns:
+            Dict with access_token, refresh_token and user, or None if the user
+            is missing or inactive
+
+        Raises:
+            JWTError: the token is invalid or expired
+            RefreshTokenReuseError: the token was already rotated (theft)
+            RefreshFamilyUnavailable: Redis could not be asked whether the
+                token's family was revoked
+        """
+        # Revocation is checked below, after the grace window lookup
+        payload = jwt_manager.validate_token(refresh_token, "refresh", check_revocation=False)
+        jti = payload["jti"]
+
+        inflight = self._inflight.get(jti)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[jti] = future
+        try:
+            result = await self._rotate(payload, db)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so waiter-less failures don't log "never retrieved"
+            future.exception()
+            raise
+        finally:
+            del self._inflight[jti]
+
+    async def _rotate(self, payload: Dict[str, Any], db: Session) -> Optional[Dict[str, Any]]:
+        jti = payload["jti"]
+        username = payload["sub"]
+        # Tokens issued before families existed start their own
+        family = payload.get("fam") or jti
+
+        if await self._family_revoked(family):
+            raise RefreshTokenReuseError(username, family)
+
+        recent = await self._recent_rotation(jti)
+        if recent is not None:
+            return recent
+
+        if await token_revocation.is_revoked_async(jti, payload["exp"]):
+            await self.revoke_family(family)
+            raise RefreshTokenReuseError(username, family)
+
+        user = db.query(User).filter(User.username == username).first()
+        if not user or not user.is_active:
+            return None
+
+        result = {
+            "access_token": create_access_token(data={"sub": user.username}),
+            "refresh_token": create_refresh_token(data={"sub": user.username, "fam": family}),
+            # JSON-ready: shared through Redis and sent as is (see the endpoint)
+            "user": user_response(user).model_dump(mode="json")
+        }
+
+        # Another worker may have rotated the same token meanwhile; use its pair
+        result = await self._publish_rotation(jti, result)
+        self._rotated[jti] = (result, time.monotonic() + self.grace_seconds)
+        await token_revocation.revoke(jti, payload["exp"])
+        return result
+
+    async def _recent_rotation(self, jti: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        self._rotated = {key: entry for key, entry in self._rotated.items() if entry[1] > now}
+        entry = self._rotated.get(jti)
+        if entry is not None:
+            return entry[0]
+        try:
+            stored = await redis_breaker.call(get_async_client().get, ROTATED_KEY.format(jti=jti))
+        except Exception as e:
+            logger.warning(f"Could not read refresh rotation state: {e}")
+            return None
+        return json.loads(stored) if stored else None
+
+    async def _publish_rotation(self, jti: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        key = ROTATED_KEY.format(jti=jti)
+        client = get_async_client()
+        try:
+            created = await redis_breaker.call(client.set, key, json.dumps(result), nx=True, ex=max(1, self.grace_seconds))
+            if not created:
+                stored = await redis_breaker.call(client.get, key)
+                if stored:
+                    return json.loads(stored)
+        except Exception as e:
+            logger.warning(f"Could not share refresh rotation state: {e}")
+        return result
+
+    async def _family_revoked(self, family: str) -> bool:
+        if family in self._revoked_families:
+            return True
+        try:
+            revoked = await redis_breaker.call(get_async_client().exists, REVOKED_FAMILY_KEY.format(family=family))
+        except deadlines.DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.warning(f"Could not check refresh token family {family}, refusing to rotate: {e}")
+            raise RefreshFamilyUnavailable(family) from e
+        if revoked:
+            self._revoked_families.add(family)
+        return bool(revoked)
+
+    async def revoke_family(self, family: str):
+        """Revoke every refresh token descended from the same login"""
+        self._revoked_families.add(family)
+        try:
+            await redis_breaker.call(
+                get_async_client().set,
+                REVOKED_FAMILY_KEY.format(family=family),
+                "1",
+                ex=settings.refresh_token_expire_days * 86400
+            )
+        except Exception as e:
+            logger.error(f"Failed to share revocation of refresh token family {family}: {e}")
+
+# Global instance
+refresh_rotator = RefreshTokenRotator()
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, validator, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 from enum import Enum
 from input_sanitizer import (
@@ -55,6 +55,15 @@ class PersonResponse(PersonBase):
     class Config:
         from_attributes = True
 
+class PersonSparseResponse(BaseModel):
+    """PersonResponse limited by ?fields= (see fieldsets.py); unselected fields are omitted"""
+    username: Optional[str] = None
+    email: Optional[str] = None
+    role: Optional[PersonRole] = None
+    id: str
+    is_active: Optional[bool] = None
+    created_at: Optional[datetime] = None
+
 class PersonCreateResponse(BaseModel):
     message: str
     person: PersonResponse
@@ -122,6 +131,16 @@ class UserResponse(UserBase):
     class Config:
         from_attributes = True
 
+class UserSparseResponse(BaseModel):
+    """UserResponse limited by ?fields= / ?expand= (see fieldsets.py); unselected fields are omitted"""
+    username: Optional[str] = None
+    email: Optional[str] = None
+    id: int
+    role: Optional[str] = None
+    permissions: Optional[List[str]] = None
+    is_active: Optional[bool] = None
+    created_at: Optional[datetime] = None
+
 class UserCreateResponse(BaseModel):
     message: str
     user: UserResponse
@@ -132,6 +151,7 @@ class UserUpdate(BaseModel):
     email: Optional[str] = None
     role_id: Optional[int] = None
     is_active: Optional[bool] = None
+    is_service_account: Optional[bool] = None
 
     @validator('username')
     def username_must_be_valid(cls, v):
@@ -284,6 +304,47 @@ class TokenData(BaseModel):
     username: Optional[str] = None
     permissions: List[str] = []
 
+# API key schemas
+class ApiKeyCreate(BaseModel):
+    name: str
+    user_id: int  # service-account user the key authenticates as
+    expires_in_days: Optional[int] = Field(None, gt=0)
+
+    @validator('name')
+    def name_must_be_valid(cls, v):
+        return sanitize_string_validator(100)(cls, v)
+
+class ApiKeyResponse(BaseModel):
+    key_id: str
+    name: str
+    user_id: int
+    created_by: Optional[str] = None
+    created_at: Optional[datetime] = None
+    expires_at: Optional[datetime] = None
+    revoked_at: Optional[datetime] = None
+    last_used_at: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+class ApiKeyCreateResponse(BaseModel):
+    message: str
+    api_key: str  # Only shown once for security
+    key: ApiKeyResponse
+
+# Stats schemas
+class EntityStatsResponse(BaseModel):
+    total: int
+    active: Optional[int] = None  # breakdowns are omitted for planner estimates
+    inactive: Optional[int] = None
+    by_role: Optional[Dict[str, int]] = None
+
+class StatsResponse(BaseModel):
+    users: EntityStatsResponse
+    persons: EntityStatsResponse
+    estimated: bool = False
+    generated_at: datetime
+
 # Response schemas
 class MessageResponse(BaseModel):
     message: str
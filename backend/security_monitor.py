@@ -49,6 +49,19 @@ class SecurityMonitor:
         if ip_address in self.ip_reputation:
             self.ip_reputation[ip_address] = max(0, self.ip_reputation[ip_address] - 1)
     
+    def log_refresh_token_reuse(self, ip_address: str, username: str):
+        """Log reuse of an already rotated refresh token (likely theft)"""
+        event = SecurityEvent(
+            timestamp=datetime.utcnow(),
+            event_type="refresh_token_reuse",
+            ip_address=ip_address,
+            username=username
+        )
+        self.events.append(event)
+        self.ip_reputation[ip_address] += 1
+        
+        logger.warning(f"Refresh token reuse: {username} from {ip_address}, token family revoked")
+    
     def log_rate_limit_exceeded(self, ip_address: str, endpoint: str):
         """Log rate limit violation"""
         event = SecurityEvent(
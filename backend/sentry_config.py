@@ -1,10 +1,13 @@
-import sentry_sdk
-from sentry_sdk.integrations.fastapi import FastApiIntegration
-from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
-from sentry_sdk.integrations.logging import LoggingIntegration
 from config import settings
 import logging
 
+def _sentry():
+    """sentry_sdk when Sentry is configured, else None; the SDK is not imported without a DSN"""
+    if not getattr(settings, 'sentry_dsn', None):
+        return None
+    import sentry_sdk
+    return sentry_sdk
+
 def init_sentry():
     """Initialize Sentry for error tracking"""
     
@@ -14,6 +17,11 @@ def init_sentry():
         logging.warning("Sentry DSN not configured - error tracking disabled")
         return
     
+    import sentry_sdk
+    from sentry_sdk.integrations.fastapi import FastApiIntegration
+    from sentry_sdk.integrations.sqlalchemy import SqlalchemyIntegration
+    from sentry_sdk.integrations.logging import LoggingIntegration
+    
     # Configure integrations
     integrations = [
         FastApiIntegration(auto_enabling_integrations=False),
@@ -63,6 +71,9 @@ def filter_sensitive_data(event, hint):
 
 def capture_auth_error(error, user_id=None, username=None):
     """Capture authentication-related errors with context"""
+    sentry_sdk = _sentry()
+    if sentry_sdk is None:
+        return
     with sentry_sdk.configure_scope() as scope:
         scope.set_tag("error_type", "authentication")
         if user_id:
@@ -73,6 +84,9 @@ def capture_auth_error(error, user_id=None, username=None):
 
 def capture_api_error(error, endpoint=None, method=None, user_id=None):
     """Capture API-related errors with context"""
+    sentry_sdk = _sentry()
+    if sentry_sdk is None:
+        return
     with sentry_sdk.configure_scope() as scope:
         scope.set_tag("error_type", "api")
         if endpoint:
@@ -85,10 +99,32 @@ def capture_api_error(error, endpoint=None, method=None, user_id=None):
 
 def capture_database_error(error, query=None, table=None):
     """Capture database-related errors with context"""
+    sentry_sdk = _sentry()
+    if sentry_sdk is None:
+        return
     with sentry_sdk.configure_scope() as scope:
         scope.set_tag("error_type", "database")
         if table:
             scope.set_tag("table", table)
         if query:
             scope.set_context("database", {"query": str(query)[:500]})
-        sentry_sdk.capture_exception(error)
\ No newline at end of file
+        sentry_sdk.capture_exception(error)
+
+def capture_failed_login(username, ip_address=None):
+    """Report a failed login attempt as a warning"""
+    sentry_sdk = _sentry()
+    if sentry_sdk is None:
+        return
+    with sentry_sdk.configure_scope() as scope:
+        scope.set_tag("event_type", "failed_login")
+        scope.set_context("login_attempt", {
+            "username": username,
+            "ip_address": ip_address
+        })
+        sentry_sdk.capture_message("Failed login attempt", level="warning")
+
+def set_user_context(user_id, username, role=None):
+    """Attach the authenticated user to subsequent Sentry events"""
+    sentry_sdk = _sentry()
+    if sentry_sdk is not None:
+        sentry_sdk.set_user({"id": user_id, "username": username, "role": role})
\ No newline at end of file
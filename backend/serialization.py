@@ -0,0 +1,78 @@
+"""
+Response serialization
+
+With a response_model, FastAPI dumps whatever the handler returns to a dict,
+validates it against the model again (running the input sanitizers on
+output) and serializes the result, so a handler that builds UserResponse(...)
+itself validates every row twice. The helpers here build response models
+from ORM rows with model_construct - the rows only ever stored validated
+input - and the read endpoints return json_response(...), which serializes
+them once to bytes through a cached TypeAdapter (pydantic-core's JSON
+encoder). FastAPI passes a returned Response through untouched; the route
+keeps its response_model, so the OpenAPI schema is unchanged.
+
+Everything else goes through the normal FastAPI path and is rendered with
+ORJSONResponse, the app's default response class.
+"""
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+from auth import get_user_permissions
+from models import Permission, Person, Role, User
+from schemas import PermissionResponse, PersonResponse, PersonRole, RoleResponse, UserResponse
+
+@lru_cache(maxsize=None)
+def type_adapter(type_: Any) -> TypeAdapter:
+    """Adapter for a response type, e.g. List[UserResponse]; building one compiles its serializer"""
+    return TypeAdapter(type_)
+
+def json_response(type_: Any, content: Any, status_code: int = 200, headers: Optional[Dict[str, str]] = None,
+                  exclude_unset: bool = False) -> Response:
+    """`content` serialized once as `type_`, as FastAPI would with response_model=type_"""
+    return Response(
+        content=type_adapter(type_).dump_json(content, by_alias=True, exclude_unset=exclude_unset),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json"
+    )
+
+def user_response(user: User) -> UserResponse:
+    return UserResponse.model_construct(
+        id=user.id,
+        username=user.username,
+        email=user.email,
+        role=user.role.name if user.role else None,
+        permissions=get_user_permissions(user),
+        is_active=user.is_active,
+        created_at=user.created_at
+    )
+
+def person_response(person: Person) -> PersonResponse:
+    return PersonResponse.model_construct(
+        id=str(person.id),
+        username=person.username,
+        email=person.email,
+        role=PersonRole(person.role.value),
+        is_active=person.is_active,
+        created_at=person.created_at
+    )
+
+def role_response(role: Role) -> RoleResponse:
+    return RoleResponse.model_construct(
+        id=role.id,
+        name=role.name,
+        description=role.description,
+        permissions=[perm.name for perm in role.permissions],
+        created_at=role.created_at
+    )
+
+def permission_response(permission: Permission) -> PermissionResponse:
+    return PermissionResponse.model_construct(
+        id=permission.id,
+        name=permission.name,
+        description=permission.description,
+        created_at=permission.created_at
+    )
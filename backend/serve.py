@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Production server launcher
+
+Runs the app under a gunicorn master with uvicorn workers (uvloop event loop,
+httptools HTTP parser):
+
+    python serve.py                 # workers sized from CPU and memory
+    SERVER_WORKERS=8 python serve.py
+    python serve.py --print-config  # show the computed settings and exit
+
+The app is imported once in the master (preload) and the heap is moved to
+the permanent GC generation with gc.freeze() before forking, so collections
+in the workers do not touch, and un-share, the inherited pages. Workers are
+recycled after server_max_requests requests (plus jitter) and get
+server_graceful_timeout seconds to finish in-flight requests. Database and
+Redis connections inherited from the master are dropped in each worker after
+the fork (main.init_worker); Sentry and telemetry start in the worker's
+lifespan.
+
+Worker count: one per available CPU (cgroup quota or affinity), capped by
+(memory limit - server_memory_reserve_mb) / server_worker_memory_mb and by
+server_max_workers. Async workers do not need the 2 * cores + 1 of sync
+workers; blocking work already runs in thread pools.
+"""
+import argparse
+import gc
+import math
+import os
+from typing import Any, Dict, Optional
+
+from config import settings
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+# cgroup v1 reports "no limit" as a huge page-aligned number
+_UNLIMITED_MEMORY = 1 << 60
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def cpu_limit(cgroup_root: str = CGROUP_ROOT) -> float:
+    """CPUs this process may use: the cgroup quota if set, else the affinity mask"""
+    try:
+        available = float(len(os.sched_getaffinity(0)))
+    except AttributeError:
+        available = float(os.cpu_count() or 1)
+
+    quota = None
+    cpu_max = _read(os.path.join(cgroup_root, "cpu.max"))  # v2: "<quota|max> <period>"
+    if cpu_max:
+        limit, _, period = cpu_max.partition(" ")
+        if limit != "max" and period:
+            quota = int(limit) / int(period)
+    else:
+        limit = _read(os.path.join(cgroup_root, "cpu", "cpu.cfs_quota_us"))
+        period = _read(os.path.join(cgroup_root, "cpu", "cpu.cfs_period_us"))
+        if limit and period and int(limit) > 0:
+            quota = int(limit) / int(period)
+    return min(available, quota) if quota else available
+
+def memory_limit(cgroup_root: str = CGROUP_ROOT, meminfo: str = "/proc/meminfo") -> Optional[int]:
+    """Bytes of memory this process may use: the cgroup limit or MemTotal"""
+    limits = []
+    for path in (os.path.join(cgroup_root, "memory.max"), os.path.join(cgroup_root, "memory", "memory.limit_in_bytes")):
+        value = _read(path)
+        if value and value.isdigit() and int(value) < _UNLIMITED_MEMORY:
+            limits.append(int(value))
+            break
+    for line in (_read(meminfo) or "").splitlines():
+        if line.startswith("MemTotal:"):
+            limits.append(int(line.split()[1]) * 1024)
+    return min(limits) if limits else None
+
+def worker_count(cpus: float, memory_bytes: Optional[int], worker_memory_mb: int = None,
+                 reserve_mb: int = None, max_workers: int = None) -> int:
+    """Workers for the given CPU and memory limits (at least one)"""
+    worker_memory_mb = worker_memory_mb if worker_memory_mb is not None else settings.server_worker_memory_mb
+    reserve_mb = reserve_mb if reserve_mb is not None else settings.server_memory_reserve_mb
+    max_workers = max_workers if max_workers is not None else settings.server_max_workers
+
+    workers = max(1, math.ceil(cpus))
+    if memory_bytes is not None and worker_memory_mb > 0:
+        memory_mb = memory_bytes // (1024 * 1024)
+        workers = min(workers, (memory_mb - reserve_mb) // worker_memory_mb)
+    return max(1, min(workers, max_workers))
+
+def server_options(workers: Optional[int] = None) -> Dict[str, Any]:
+    """gunicorn settings from config.py"""
+    if workers is None:
+        workers = settings.server_workers or worker_count(cpu_limit(), memory_limit())
+    return {
+        "bind": f"{settings.server_host}:{settings.server_port}",
+        "workers": workers,
+        "worker_class": "serve.UvloopWorker",
+        "preload_app": True,
+        "max_requests": settings.server_max_requests,
+        "max_requests_jitter": settings.server_max_requests_jitter if settings.server_max_requests else 0,
+        "graceful_timeout": settings.server_graceful_timeout,
+        "keepalive": settings.server_keepalive,
+        "backlog": settings.server_backlog,
+        "forwarded_allow_ips": settings.server_forwarded_allow_ips,
+        "when_ready": when_ready,
+        "pre_fork": pre_fork,
+        "post_fork": post_fork
+    }
+
+# gunicorn hooks
+
+def when_ready(server):
+    server.log.info(f"Preloaded app; starting {server.num_workers} workers")
+
+def pre_fork(server, worker):
+    # Objects created in the master since the last fork (first: the whole
+    # preloaded app) go to the permanent generation; the workers' collectors
+    # then never write to those pages
+    gc.collect()
+    gc.freeze()
+
+def post_fork(server, worker):
+    import main
+    main.init_worker()
+
+try:
+    from gunicorn.app.base import BaseApplication
+    from uvicorn_worker import UvicornWorker
+except ImportError:
+    # Launcher dependencies are only needed to serve; the sizing helpers above
+    # stay importable without them
+    BaseApplication = UvicornWorker = None
+
+if UvicornWorker is None:
+    UvloopWorker = ProductionServer = None
+else:
+    class UvloopWorker(UvicornWorker):
+        """uvicorn worker that requires uvloop and httptools instead of falling back to asyncio / h11"""
+        CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
+
+    class ProductionServer(BaseApplication):
+        def __init__(self, options: Dict[str, Any]):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            import main
+            return main.app
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API with preforked uvicorn workers")
+    parser.add_argument("--workers", type=int, help="Override the computed worker count")
+    parser.add_argument("--print-config", action="store_true", help="Print the launch settings and exit")
+    args = parser.parse_args()
+
+    options = server_options(args.workers)
+    if args.print_config:
+        memory = memory_limit()
+        print(f"cpus {cpu_limit():g}, memory {memory // (1024 * 1024) if memory else 'unknown'} MiB")
+        for key, value in options.items():
+            if not callable(value):
+                print(f"{key} = {value}")
+        return
+    if ProductionServer is None:
+        raise SystemExit("serve.py needs gunicorn and uvicorn-worker (pip install -r requirements.txt)")
+
+    # main.py skips Sentry / telemetry at import; post_fork starts them per worker
+    os.environ["APP_PRELOADED"] = "1"
+    ProductionServer(options).run()
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,7 @@ from slowapi.errors import RateLimitExceeded
 from fastapi import Request, HTTPException
 from starlette.responses import JSONResponse
 import logging
+from config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -18,9 +19,18 @@ def get_client_id(request: Request) -> str:
     return get_remote_address(request)
 
 # Create limiter instance
+# With a shared storage (Redis) configured, slowapi falls back to per-worker
+# in-memory counters while the storage is unreachable and switches back once
+# it recovers. Socket timeouts keep a stalled Redis from blocking requests.
 limiter = Limiter(
     key_func=get_client_id,
-    default_limits=["100/minute", "1000/hour"]
+    default_limits=["100/minute", "1000/hour"],
+    storage_uri=settings.rate_limit_storage_uri,
+    storage_options={
+        "socket_timeout": settings.redis_socket_timeout,
+        "socket_connect_timeout": settings.redis_connect_timeout
+    } if settings.rate_limit_storage_uri else {},
+    in_memory_fallback_enabled=bool(settings.rate_limit_storage_uri)
 )
 
 def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceeded):
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Startup timing and the cold-start budget
+
+Importing main only builds the app. Logging, Sentry, OpenTelemetry, the
+schema check and the background tasks start in the app's lifespan, each as a
+step timed into startup_report (served at /api/v1/system/startup). Optional
+subsystems are skipped without importing their SDKs: Sentry without
+sentry_dsn, OpenTelemetry with telemetry_enabled off; an optional step that
+fails is logged and the app starts without it.
+
+    python startup.py           # per-module import times and per-step init times
+    python startup.py --check   # exit 1 when a cold `uvicorn main:app` takes longer
+                                # than startup_budget_seconds to answer /health
+
+Import times come from a fresh interpreter under `python -X importtime`, so
+they include everything main pulls in, not just the app's own modules.
+"""
+import argparse
+import asyncio
+import http.client
+import logging
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# "import time:       self [us] |  cumulative | imported package"
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)\s*$")
+
+class StartupReport:
+    """Durations of the lifespan's startup steps in this process"""
+
+    def __init__(self):
+        self.import_seconds: Optional[float] = None
+        self.startup_seconds: Optional[float] = None
+        self.steps: List[Dict[str, Any]] = []
+        self._started: Optional[float] = None
+
+    def begin(self):
+        self.steps = []
+        self.startup_seconds = None
+        self._started = time.perf_counter()
+
+    def finish(self):
+        self.startup_seconds = round(time.perf_counter() - self._started, 4)
+        slowest = sorted((step for step in self.steps if step["status"] != "skipped"),
+                         key=lambda step: step["seconds"], reverse=True)[:3]
+        logger.info(f"Startup took {self.startup_seconds:.3f}s (import {self.import_seconds or 0:.3f}s); slowest: "
+                    + ", ".join(f"{step['name']} {step['seconds']:.3f}s" for step in slowest))
+
+    @contextmanager
+    def step(self, name: str, optional: bool = False):
+        """Time one subsystem; an optional one that fails is logged and skipped"""
+        entry = {"name": name, "status": "ok", "seconds": 0.0}
+        self.steps.append(entry)
+        start = time.perf_counter()
+        try:
+            yield entry
+        except Exception as e:
+            entry["status"] = "failed"
+            entry["error"] = str(e)
+            if not optional:
+                raise
+            logger.warning(f"Optional subsystem {name} failed to start: {e}")
+        finally:
+            entry["seconds"] = round(time.perf_counter() - start, 4)
+
+    def skip(self, name: str, reason: str):
+        self.steps.append({"name": name, "status": "skipped", "seconds": 0.0, "reason": reason})
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "import_seconds": self.import_seconds,
+            "startup_seconds": self.startup_seconds,
+            "steps": list(self.steps)
+        }
+
+def parse_importtime(output: str) -> List[Dict[str, Any]]:
+    """Entries of `python -X importtime` output, in the order printed"""
+    entries = []
+    for line in output.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append({
+                "module": module,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                "depth": len(indent) // 2
+            })
+    return entries
+
+def module_tree(entries: List[Dict[str, Any]], module: str) -> List[Dict[str, Any]]:
+    """`module` and what it imported; the output is post-order, children first"""
+    for end, entry in enumerate(entries):
+        if entry["module"] == module and entry["depth"] == 0:
+            start = end
+            while start > 0 and entries[start - 1]["depth"] > 0:
+                start -= 1
+            return entries[start:end + 1]
+    return []
+
+def package_totals(entries: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Self import time per top-level package, in microseconds"""
+    totals: Dict[str, int] = {}
+    for entry in entries:
+        package = entry["module"].split(".")[0]
+        totals[package] = totals.get(package, 0) + entry["self_us"]
+    return dict(sorted(totals.items(), key=lambda item: item[1], reverse=True))
+
+def import_times(module: str = "main") -> List[Dict[str, Any]]:
+    """Per-module import times of a fresh interpreter importing `module`"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    # Drop what the interpreter itself imported at startup (site, encodings)
+    return module_tree(parse_importtime(result.stderr), module)
+
+async def _run_lifespan() -> StartupReport:
+    import main
+    async with main.app.router.lifespan_context(main.app):
+        pass
+    # main's instance: run as a script this module is __main__, not startup
+    return main.startup_report
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_cold_start(port: Optional[int] = None, timeout: float = 60.0, path: str = "/health") -> float:
+    """
+    Seconds from launching a fresh `uvicorn main:app` to its first 200 on
+    `path`; without port, on a free one
+    """
+    if port is None:
+        port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"server exited with code {server.returncode} before answering")
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            try:
+                # SecurityMiddleware blocks clients without a user agent
+                connection.request("GET", path, headers={"User-Agent": "startup-check/1.0"})
+                if connection.getresponse().status == 200:
+                    return time.perf_counter() - start
+            except OSError:
+                pass
+            finally:
+                connection.close()
+            time.sleep(0.05)
+        raise TimeoutError(f"no response on {path} within {timeout:.0f}s")
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+def print_report(top: int):
+    entries = import_times()
+    main_entry = next((entry for entry in entries if entry["module"] == "main"), None)
+    if main_entry:
+        print(f"import main: {main_entry['cumulative_us'] / 1000:.0f}ms")
+    print("\nSlowest modules (cumulative, incl. their imports):")
+    for entry in sorted(entries, key=lambda entry: entry["cumulative_us"], reverse=True)[:top]:
+        print(f"  {entry['cumulative_us'] / 1000:8.1f}ms  {entry['module']}")
+    print("\nSelf time by package:")
+    for package, total in list(package_totals(entries).items())[:top]:
+        print(f"  {total / 1000:8.1f}ms  {package}")
+
+    report = asyncio.run(_run_lifespan())
+    print(f"\nLifespan startup: {report.startup_seconds * 1000:.0f}ms")
+    for step in report.steps:
+        detail = step.get("reason") or step.get("error") or ""
+        print(f"  {step['seconds'] * 1000:8.1f}ms  {step['name']:<20} {step['status']}  {detail}".rstrip())
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup timing report and cold-start budget check")
+    parser.add_argument("--check", action="store_true", help="Measure cold start to first response against the budget")
+    parser.add_argument("--budget", type=float, default=None, help="Seconds (default: startup_budget_seconds)")
+    parser.add_argument("--port", type=int, default=None, help="Default: a free port")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    if not args.check:
+        print_report(args.top)
+        return
+    budget = args.budget if args.budget is not None else settings.startup_budget_seconds
+    elapsed = measure_cold_start(args.port, timeout=max(budget * 3, 30.0))
+    print(f"Cold start to first response: {elapsed:.2f}s (budget {budget:.2f}s)")
+    if elapsed > budget:
+        sys.exit(1)
+
+# Global instance
+startup_report = StartupReport()
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,5 @@
-from opentelemetry import trace, metrics
-from opentelemetry.sdk.trace import TracerProvider
-from opentelemetry.sdk.metrics import MeterProvider
-from opentelemetry.sdk.resources import Resource
-from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
-from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
-from opentelemetry.instrumentation.requests import RequestsInstrumentor
-from opentelemetry.exporter.prometheus import PrometheusMetricReader
-from prometheus_client import start_http_server
 from config import settings
+from typing import List, Optional
 import logging
 
 logger = logging.getLogger(__name__)
@@ -20,8 +12,49 @@ auth_attempts_counter = None
 active_users_gauge = None
 database_operations_counter = None
 
-def init_telemetry():
-    """Initialize OpenTelemetry instrumentation"""
+class TracingMiddleware:
+    """
+    Place for OpenTelemetry's ASGI middleware in the app's middleware stack.
+
+    Starlette refuses new middleware once the app has started, and the
+    lifespan (where init_telemetry runs) only starts after that. So the app
+    registers this at import time, without importing the SDK, and
+    init_telemetry fills it in; until then requests pass straight through.
+    """
+
+    instances: List["TracingMiddleware"] = []
+
+    def __init__(self, app):
+        self.app = app
+        self.traced = None
+        TracingMiddleware.instances.append(self)
+
+    async def __call__(self, scope, receive, send):
+        await (self.traced or self.app)(scope, receive, send)
+
+def init_telemetry(app=None, engines=None, metrics_port: Optional[int] = 8001):
+    """
+    Initialize OpenTelemetry instrumentation.
+
+    Called from the app's lifespan, so the SDK is imported only when
+    telemetry is enabled and the engines to instrument already exist. With
+    app, requests are traced through its TracingMiddleware; without app /
+    engines the FastAPI / SQLAlchemy classes are patched instead. Pass
+    metrics_port=None when several workers run (serve.py): only one process
+    can bind the port, and /metrics is served by the app itself.
+    """
+    from opentelemetry import trace, metrics
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.metrics import MeterProvider
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.instrumentation.asgi import OpenTelemetryMiddleware
+    from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor, _get_default_span_details
+    from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+    from opentelemetry.instrumentation.requests import RequestsInstrumentor
+    from opentelemetry.exporter.prometheus import PrometheusMetricReader
+    from opentelemetry.util.http import get_excluded_urls
+    from prometheus_client import start_http_server
+
     global meter, request_counter, request_duration, auth_attempts_counter, active_users_gauge, database_operations_counter
     
     # Create resource
@@ -76,16 +109,30 @@ def init_telemetry():
     )
     
     # Auto-instrument FastAPI
-    FastAPIInstrumentor.instrument()
+    if app is not None:
+        # What FastAPIInstrumentor.instrument_app would add, in the slot the
+        # app reserved for it
+        for slot in TracingMiddleware.instances:
+            slot.traced = OpenTelemetryMiddleware(
+                slot.app,
+                excluded_urls=get_excluded_urls("FASTAPI"),
+                default_span_details=_get_default_span_details
+            )
+    else:
+        FastAPIInstrumentor().instrument()
     
     # Auto-instrument SQLAlchemy
-    SQLAlchemyInstrumentor.instrument()
+    if engines:
+        SQLAlchemyInstrumentor().instrument(engines=list(engines))
+    else:
+        SQLAlchemyInstrumentor().instrument()
     
     # Auto-instrument requests
-    RequestsInstrumentor.instrument()
+    RequestsInstrumentor().instrument()
     
     # Start Prometheus metrics server
-    start_http_server(8001)
+    if metrics_port is not None:
+        start_http_server(metrics_port)
     
     logger.info(f"OpenTelemetry initialized for {settings.environment}")
 
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+import middleware.admission_middleware as admission_middleware
+from admission_control import (
+    AUTH, CRITICAL, READ, WRITE, AdaptiveLimiter, AdmissionController, AdmissionRejected, classify
+)
+
+def test_classify():
+    assert classify("GET", "/health/readiness") == CRITICAL
+    assert classify("GET", "/metrics") == CRITICAL
+    assert classify("GET", "/.well-known/jwks.json") == CRITICAL
+    assert classify("POST", "/api/v1/auth/login") == AUTH
+    assert classify("POST", "/api/auth/register/") == AUTH
+    assert classify("POST", "/api/v1/auth/refresh") == WRITE
+    assert classify("DELETE", "/api/users/3") == WRITE
+    assert classify("GET", "/api/v1/users/") == READ
+
+def test_queue_hands_slots_over_in_order():
+    async def run():
+        limiter = AdaptiveLimiter("test-queue", initial_limit=1, latency_target=1.0, max_queue=1, queue_timeout=1.0)
+        await limiter.acquire()
+        waiting = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.state()["queued"] == 1
+
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await limiter.acquire()
+        assert excinfo.value.reason == "queue_full"
+        assert excinfo.value.retry_after >= 1
+
+        limiter.release(0.01)
+        await waiting
+        assert limiter.in_flight == 1 and limiter.state()["queued"] == 0
+
+    asyncio.run(run())
+
+def test_queue_wait_times_out():
+    async def run():
+        limiter = AdaptiveLimiter("test-timeout", initial_limit=1, latency_target=1.0, max_queue=5, queue_timeout=0.01)
+        await limiter.acquire()
+        with pytest.raises(AdmissionRejected) as excinfo:
+            await limiter.acquire()
+        assert excinfo.value.reason == "timeout"
+        assert limiter.state()["queued"] == 0
+
+    asyncio.run(run())
+
+def test_aimd_adjusts_the_limit():
+    now = [0.0]
+    limiter = AdaptiveLimiter("test-aimd", initial_limit=10, latency_target=0.1, min_limit=2, max_limit=20,
+                              backoff=0.5, decrease_cooldown=1.0, clock=lambda: now[0])
+
+    # Slow responses halve the limit, once per cooldown
+    limiter.in_flight = 2
+    limiter.release(0.5)
+    limiter.release(0.5)
+    assert limiter.state()["limit"] == 5
+    now[0] = 2.0
+    limiter.in_flight = 1
+    limiter.release(0.5, overloaded=True)
+    assert limiter.state()["limit"] == 2
+
+    # Fast responses grow it back while it is the bottleneck
+    for _ in range(20):
+        limiter.in_flight = int(limiter.limit)
+        limiter.release(0.01)
+    assert limiter.state()["limit"] > 2
+
+    # ... but not while there is spare capacity
+    before = limiter.limit
+    limiter.in_flight = 1
+    limiter.release(0.01)
+    assert limiter.limit == before
+
+def test_middleware_sheds_with_retry_after(monkeypatch):
+    limiter = AdaptiveLimiter("test-middleware", initial_limit=1, latency_target=1.0, max_queue=0)
+    monkeypatch.setattr(admission_middleware, "admission_controller", AdmissionController({READ: limiter}))
+
+    app = FastAPI()
+    app.add_middleware(admission_middleware.AdmissionControlMiddleware)
+
+    @app.get("/items")
+    async def items():
+        return []
+
+    @app.get("/health/liveness")
+    async def liveness():
+        return {"status": "ok"}
+
+    client = TestClient(app)
+    assert client.get("/items").status_code == 200
+    assert limiter.in_flight == 0
+
+    limiter.in_flight = int(limiter.limit)
+    response = client.get("/items")
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert client.get("/health/liveness").status_code == 200
+
+def test_only_deadline_504s_count_as_overload(monkeypatch):
+    limiter = AdaptiveLimiter("test-overload", initial_limit=10, latency_target=1.0, backoff=0.5, decrease_cooldown=0)
+    monkeypatch.setattr(admission_middleware, "admission_controller", AdmissionController({READ: limiter}))
+
+    app = FastAPI()
+    app.add_middleware(admission_middleware.AdmissionControlMiddleware)
+
+    @app.get("/session")
+    async def session():
+        # e.g. the session store is down; says nothing about our capacity
+        raise HTTPException(status_code=503, detail="Session store unavailable")
+
+    @app.get("/broken")
+    async def broken():
+        raise RuntimeError("bug")
+
+    @app.get("/slow")
+    async def slow():
+        raise HTTPException(status_code=504, detail="Request deadline exceeded")
+
+    client = TestClient(app, raise_server_exceptions=False)
+    assert client.get("/session").status_code == 503
+    assert client.get("/broken").status_code == 500
+    assert limiter.limit == 10
+    assert limiter.in_flight == 0
+
+    assert client.get("/slow").status_code == 504
+    assert limiter.limit == 5
@@ -0,0 +1,117 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+import api_keys
+import auth
+from api_keys import ApiKeyManager, ApiKeyUsageRecorder, hash_api_key_secret, parse_api_key
+from db_routing import get_read_db
+from main import app
+from middleware.jwt_middleware import JWTValidationMiddleware
+from models import ApiKey, User
+
+@pytest.fixture
+def service_user(db_session):
+    user = User(username="nightly_job", email="jobs@example.com", hashed_password="x", is_active=True,
+                is_service_account=True)
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+@pytest.fixture
+def manager():
+    return ApiKeyManager(cache_ttl=60)
+
+def test_create_key_stores_only_the_hmac(db_session, service_user, manager):
+    full_key, record = manager.create_key(db_session, service_user, name="nightly", created_by="admin")
+
+    key_id, secret = parse_api_key(full_key)
+    assert full_key.startswith("sk_")
+    assert record.key_id == key_id
+    assert record.user_id == service_user.id
+    assert record.secret_hash == hash_api_key_secret(secret)
+    assert secret not in record.secret_hash
+
+def test_keys_are_only_created_for_service_accounts(db_session, test_user, manager):
+    with pytest.raises(ValueError):
+        manager.create_key(db_session, test_user, name="nightly", created_by="admin")
+    assert db_session.query(ApiKey).count() == 0
+
+def test_secret_is_verified_with_hmac(db_session, service_user, manager):
+    full_key, _ = manager.create_key(db_session, service_user, name="nightly", created_by="admin")
+
+    assert manager.authenticate(full_key, db_session).id == service_user.id
+    # Served from the cache now; a wrong secret for the same key id still fails
+    assert manager.authenticate(full_key[:-1] + ("A" if full_key[-1] != "A" else "B"), db_session) is None
+    assert manager.authenticate("sk_unknown_secret", db_session) is None
+    assert manager.authenticate("not-a-key", db_session) is None
+
+def test_revocation_invalidates_the_cached_key(db_session, service_user, manager):
+    full_key, record = manager.create_key(db_session, service_user, name="nightly", created_by="admin")
+    assert manager.authenticate(full_key, db_session) is not None
+    assert record.key_id in manager._verified
+
+    assert manager.revoke_key(db_session, record.key_id)
+    assert record.key_id not in manager._verified
+    assert manager.authenticate(full_key, db_session) is None
+    assert not manager.revoke_key(db_session, "missing")
+
+def test_owner_must_stay_an_active_service_account(db_session, service_user, manager):
+    full_key, _ = manager.create_key(db_session, service_user, name="nightly", created_by="admin")
+    assert manager.authenticate(full_key, db_session) is not None
+
+    service_user.is_service_account = False
+    db_session.commit()
+    assert manager.authenticate(full_key, db_session) is None
+
+    service_user.is_service_account = True
+    service_user.is_active = False
+    db_session.commit()
+    assert manager.authenticate(full_key, db_session) is None
+
+def test_last_used_is_written_in_one_batch(db_session, service_user, manager, monkeypatch):
+    monkeypatch.setattr(api_keys, "SessionLocal", sessionmaker(bind=db_session.get_bind()))
+    keys = [manager.create_key(db_session, service_user, name=f"job {i}", created_by="admin")[1] for i in range(3)]
+    recorder = ApiKeyUsageRecorder(flush_interval=60)
+
+    recorder.touch(keys[0].key_id)
+    recorder.touch(keys[1].key_id)
+    recorder.touch(keys[0].key_id)
+    assert recorder.flush() == 2
+    assert recorder.flush() == 0
+
+    db_session.expire_all()
+    used = {key.key_id: key.last_used_at for key in db_session.query(ApiKey)}
+    assert used[keys[0].key_id] is not None
+    assert used[keys[1].key_id] is not None
+    assert used[keys[2].key_id] is None
+
+def test_jwt_middleware_lets_api_key_requests_through():
+    jobs = FastAPI()
+    jobs.add_middleware(JWTValidationMiddleware)
+
+    @jobs.post("/jobs")
+    def run_job():
+        return {"ok": True}
+
+    client = TestClient(jobs)
+    # The auth dependencies, not the middleware, check the key
+    assert client.post("/jobs", headers={"X-API-Key": "sk_abc_secret"}).json() == {"ok": True}
+    assert client.post("/jobs", headers={"Authorization": "ApiKey sk_abc_secret"}).status_code == 200
+    assert client.post("/jobs").status_code == 401
+
+def test_api_key_authenticates_a_request(client, db_session, service_user, manager, monkeypatch):
+    monkeypatch.setattr(auth, "api_key_manager", manager)
+    full_key, _ = manager.create_key(db_session, service_user, name="nightly", created_by="admin")
+    app.dependency_overrides[get_read_db] = lambda: db_session
+    try:
+        headers = {"User-Agent": "pytest", "X-API-Key": full_key}
+        response = client.get("/api/v1/me/", headers=headers)
+        assert response.status_code == 200
+        assert response.json()["username"] == "nightly_job"
+
+        headers["X-API-Key"] = full_key + "x"
+        assert client.get("/api/v1/me/", headers=headers).status_code == 401
+    finally:
+        app.dependency_overrides.pop(get_read_db, None)
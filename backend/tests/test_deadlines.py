@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import deadlines
+from circuit_breaker import CircuitBreaker
+from middleware.deadline_middleware import DeadlineMiddleware, deadline_exceeded_response
+from password_utils import hash_password_async
+
+def test_budget_uses_longest_matching_prefix():
+    overrides = {"/api/v1/": 10.0, "/api/v1/auth/": 5.0}
+    assert deadlines.budget_for("/api/v1/auth/login", overrides, 15.0) == 5.0
+    assert deadlines.budget_for("/api/v1/users/", overrides, 15.0) == 10.0
+    assert deadlines.budget_for("/health/liveness", overrides, 15.0) == 15.0
+
+def test_legacy_auth_routes_get_the_auth_deadline():
+    assert deadlines.budget_for("/api/auth/login") == deadlines.budget_for("/api/v1/auth/login") == 5.0
+
+def test_statement_timeout_follows_the_deadline():
+    assert deadlines.statement_timeout_ms(30000) is None
+
+    token = deadlines.start(0.2)
+    try:
+        assert 0 < deadlines.statement_timeout_ms(30000) <= 200
+        assert deadlines.statement_timeout_ms(100) is None
+    finally:
+        deadlines.reset(token)
+
+    token = deadlines.start(0.001)
+    try:
+        asyncio.run(asyncio.sleep(0.005))
+        with pytest.raises(deadlines.DeadlineExceeded):
+            deadlines.statement_timeout_ms(30000)
+    finally:
+        deadlines.reset(token)
+
+def test_breaker_does_not_blame_redis_for_the_deadline():
+    breaker = CircuitBreaker("test-deadline", minimum_calls=1, failure_rate_threshold=0.1, call_timeout=5.0)
+
+    async def slow_call():
+        await asyncio.sleep(1)
+
+    async def run():
+        token = deadlines.start(0.05)
+        try:
+            await breaker.call(slow_call)
+        finally:
+            deadlines.reset(token)
+
+    with pytest.raises(deadlines.DeadlineExceeded) as excinfo:
+        asyncio.run(run())
+    assert excinfo.value.dependency == "test-deadline"
+    assert breaker.state.value == "closed"
+    assert not breaker._calls
+
+def test_hashing_wait_is_bounded():
+    async def run():
+        token = deadlines.start(0.0001)
+        try:
+            await asyncio.sleep(0.001)
+            await hash_password_async("secret-password")
+        finally:
+            deadlines.reset(token)
+
+    with pytest.raises(deadlines.DeadlineExceeded):
+        asyncio.run(run())
+    assert asyncio.run(hash_password_async("secret-password")).startswith("$argon2id$")
+
+def test_middleware_returns_504(monkeypatch):
+    app = FastAPI()
+    app.add_exception_handler(deadlines.DeadlineExceeded, deadline_exceeded_response)
+    app.add_middleware(DeadlineMiddleware)
+
+    @app.get("/slow")
+    async def slow():
+        await deadlines.bounded(asyncio.sleep(5), "test")
+        return {"ok": True}
+
+    @app.get("/fast")
+    async def fast():
+        return {"remaining": deadlines.remaining()}
+
+    before = deadlines.deadline_exceeded_total.labels(dependency="test")._value.get()
+    client = TestClient(app)
+    monkeypatch.setitem(deadlines.settings.request_deadline_overrides, "/slow", 0.05)
+    response = client.get("/slow")
+    assert response.status_code == 504
+    assert response.json() == {"detail": "Request deadline exceeded"}
+    assert deadlines.deadline_exceeded_total.labels(dependency="test")._value.get() == before + 1
+
+    assert client.get("/fast").json()["remaining"] > 0
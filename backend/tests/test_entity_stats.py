@@ -0,0 +1,72 @@
+from entity_stats import PERSONS, USERS, EntityStats, _adjust
+from models import EntityCount, Person, PersonRole, Role, User
+
+def counters(db_session):
+    db_session.expire_all()
+    return {(row.entity, row.role, row.is_active): row.count for row in db_session.query(EntityCount)}
+
+def test_writes_adjust_the_matching_counters(db_session):
+    role = Role(name="viewer")
+    db_session.add(role)
+    db_session.commit()
+    users = [User(username=f"user{i}", email=f"user{i}@example.com", hashed_password="x", role_id=role.id)
+             for i in range(3)]
+    db_session.add_all(users)
+    db_session.add(Person(username="op1", email="op1@example.com", hashed_password="x", role=PersonRole.OPERATOR))
+    db_session.commit()
+    assert counters(db_session) == {
+        (USERS, str(role.id), True): 3,
+        (PERSONS, "Operator", True): 1
+    }
+
+    users[0].is_active = False
+    users[1].role_id = None
+    db_session.delete(users[2])
+    db_session.commit()
+    assert counters(db_session) == {
+        (USERS, str(role.id), True): 0,
+        (USERS, str(role.id), False): 1,
+        (USERS, "", True): 1,
+        (PERSONS, "Operator", True): 1
+    }
+
+def test_adjust_is_an_upsert(db_session):
+    connection = db_session.connection()
+    # A decrement for a counter that was never written is kept, so the
+    # matching increment balances it instead of leaving 1 behind
+    _adjust(connection, USERS, 7, True, -1)
+    _adjust(connection, USERS, 7, True, 1)
+    _adjust(connection, USERS, 7, True, 1)
+    _adjust(connection, USERS, 7, None, 1)
+    db_session.commit()
+    assert counters(db_session) == {(USERS, "7", True): 2}
+
+def test_totals_skip_empty_counters_and_name_roles(db_session):
+    admin = Role(name="admin")
+    db_session.add(admin)
+    db_session.commit()
+    db_session.add_all([
+        User(username="alice", email="alice@example.com", hashed_password="x", role_id=admin.id),
+        User(username="bob", email="bob@example.com", hashed_password="x", role_id=admin.id, is_active=False),
+        User(username="carol", email="carol@example.com", hashed_password="x")
+    ])
+    db_session.commit()
+    _adjust(db_session.connection(), USERS, 99, True, -1)
+    db_session.commit()
+
+    counts = EntityStats(cache_ttl=0).get_counts(db_session)
+    assert counts[USERS] == {"total": 3, "active": 2, "inactive": 1, "by_role": {"admin": 2, "none": 1}}
+    assert counts[PERSONS] == {"total": 0, "active": 0, "inactive": 0, "by_role": {}}
+
+def test_reconcile_corrects_drift(db_session):
+    db_session.add(User(username="alice", email="alice@example.com", hashed_password="x"))
+    db_session.commit()
+    # Bulk updates bypass the ORM events
+    db_session.query(User).update({User.is_active: False})
+    db_session.commit()
+
+    stats = EntityStats(cache_ttl=60)
+    assert stats.get_counts(db_session)[USERS]["active"] == 1
+    assert stats.reconcile(db_session) == 2
+    assert stats.get_counts(db_session)[USERS] == {"total": 1, "active": 0, "inactive": 1, "by_role": {"none": 1}}
+    assert stats.reconcile(db_session) == 0
@@ -0,0 +1,65 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from auth import create_access_token
+from db_routing import get_read_db
+from etags import ROLES, USERS, versions
+from main import app
+from models import Permission, Role, User
+
+@pytest.fixture
+def admin_client(client: TestClient, db_session) -> TestClient:
+    role = Role(name="admin", permissions=[Permission(name="role:read"), Permission(name="user:read")])
+    db_session.add(User(username="etag_admin", email="etag@example.com", hashed_password="x", role=role, is_active=True))
+    db_session.commit()
+    app.dependency_overrides[get_read_db] = lambda: db_session
+    client.headers.update({
+        # SecurityMiddleware blocks clients without a user agent
+        "User-Agent": "pytest",
+        "Authorization": f"Bearer {create_access_token({'sub': 'etag_admin'})}"
+    })
+    try:
+        yield client
+    finally:
+        app.dependency_overrides.pop(get_read_db, None)
+
+def version_of(db_session, table):
+    return dict((name, version) for name, version, _ in versions(db_session, [table]))[table]
+
+def test_flushes_bump_only_the_written_tables(db_session):
+    db_session.add(Role(name="viewer"))
+    db_session.commit()
+    roles, users = version_of(db_session, ROLES), version_of(db_session, USERS)
+    assert roles >= 1
+
+    role = db_session.query(Role).filter(Role.name == "viewer").one()
+    role.description = "Read only"
+    db_session.commit()
+    assert version_of(db_session, ROLES) == roles + 1
+    assert version_of(db_session, USERS) == users
+
+def test_unchanged_list_is_answered_with_304(admin_client, db_session):
+    first = admin_client.get("/api/roles")
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+    assert {"Authorization", "Cookie", "X-API-Key"} <= {name.strip() for name in first.headers["vary"].split(",")}
+
+    revalidated = admin_client.get("/api/roles", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+
+    role = db_session.query(Role).filter(Role.name == "admin").one()
+    role.permissions.append(Permission(name="role:create"))
+    db_session.commit()
+    changed = admin_client.get("/api/roles", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert "role:create" in changed.json()[0]["permissions"]
+
+def test_etag_depends_on_the_query_string(admin_client):
+    full = admin_client.get("/api/v1/users/")
+    sparse = admin_client.get("/api/v1/users/?fields=username")
+    assert full.headers["etag"] != sparse.headers["etag"]
+    assert admin_client.get("/api/v1/users/?fields=username", headers={"If-None-Match": f'W/{sparse.headers["etag"]}'}).status_code == 304
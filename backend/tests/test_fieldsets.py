@@ -0,0 +1,105 @@
+import json
+from typing import List
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import event
+
+from fieldsets import PERSON_FIELDS, USER_EXPANSIONS, USER_FIELDS, parse_selection, query_persons, query_users
+from models import Permission, Person, PersonRole, Role, User
+from schemas import PersonSparseResponse, UserResponse, UserSparseResponse
+from serialization import json_response, user_response
+
+@pytest.fixture
+def users(db_session):
+    read, create = Permission(name="user:read"), Permission(name="user:create")
+    admin = Role(name="admin", permissions=[read, create])
+    db_session.add_all([
+        User(username="alice", email="alice@example.com", hashed_password="x", role=admin, is_active=True),
+        User(username="bob", email="bob@example.com", hashed_password="x", role=Role(name="viewer", permissions=[read]),
+             is_active=True),
+        User(username="carol", email="carol@example.com", hashed_password="x", is_active=False)
+    ])
+    db_session.commit()
+    return db_session.query(User).order_by(User.id).all()
+
+@pytest.fixture
+def statements(db_session):
+    executed = []
+    record = lambda *args: executed.append(args[2])
+    event.listen(db_session.get_bind(), "before_cursor_execute", record)
+    yield executed
+    event.remove(db_session.get_bind(), "before_cursor_execute", record)
+
+def test_selection_defaults_and_validation():
+    everything = parse_selection(None, None, USER_FIELDS, USER_EXPANSIONS)
+    assert everything.columns == USER_FIELDS
+    assert everything.expansions == USER_EXPANSIONS
+
+    sparse = parse_selection("email,username", None, USER_FIELDS, USER_EXPANSIONS)
+    assert sparse.columns == ("id", "username", "email")
+    assert sparse.expansions == ()
+
+    assert parse_selection(None, "role", USER_FIELDS, USER_EXPANSIONS).columns == USER_FIELDS
+    with pytest.raises(HTTPException) as error:
+        parse_selection("username,password", None, USER_FIELDS, USER_EXPANSIONS)
+    assert error.value.status_code == 400
+
+def test_full_selection_matches_the_user_response(db_session, users):
+    selection = parse_selection(None, None, USER_FIELDS, USER_EXPANSIONS)
+    sparse = json_response(List[UserSparseResponse], query_users(db_session, selection), exclude_unset=True)
+    full = json_response(List[UserResponse], [user_response(user) for user in users])
+    assert json.loads(sparse.body) == json.loads(full.body)
+
+def test_sparse_selection_skips_roles_and_permissions(db_session, users, statements):
+    selection = parse_selection("username,email", None, USER_FIELDS, USER_EXPANSIONS)
+    body = json.loads(json_response(List[UserSparseResponse], query_users(db_session, selection), exclude_unset=True).body)
+
+    assert body[0] == {"username": "alice", "email": "alice@example.com", "id": users[0].id}
+    assert len(statements) == 1
+    assert "role" not in statements[0].lower().split("from")[0]
+
+def test_permissions_are_loaded_in_one_query_for_the_page(db_session, users, statements):
+    selection = parse_selection("username", "permissions", USER_FIELDS, USER_EXPANSIONS)
+    result = {user.username: user.permissions for user in query_users(db_session, selection)}
+
+    assert sorted(result["alice"]) == ["user:create", "user:read"]
+    assert result["bob"] == ["user:read"]
+    assert result["carol"] == []
+    assert len(statements) == 2
+
+def test_person_fields(db_session):
+    db_session.add(Person(username="op1", email="op1@example.com", hashed_password="x", role=PersonRole.OPERATOR))
+    db_session.commit()
+    selection = parse_selection("role", None, PERSON_FIELDS)
+    body = json.loads(json_response(List[PersonSparseResponse], query_persons(db_session, selection), exclude_unset=True).body)
+    assert set(body[0]) == {"id", "role"}
+    assert body[0]["role"] == "Operator"
+
+    person = query_persons(db_session, selection, person_id=body[0]["id"], limit=1)
+    assert [p.id for p in person] == [body[0]["id"]]
+    assert query_persons(db_session, selection, person_id="not-a-uuid") == []
+
+def test_person_endpoints_parse_the_id(client, db_session):
+    from auth import create_access_token
+
+    permissions = [Permission(name="person:update"), Permission(name="person:delete")]
+    db_session.add(User(username="alice", email="alice@example.com", hashed_password="x", is_active=True,
+                        role=Role(name="admin", permissions=permissions)))
+    person = Person(username="op1", email="op1@example.com", hashed_password="x", role=PersonRole.OPERATOR)
+    db_session.add(person)
+    db_session.commit()
+    person_id = str(person.id)
+    client.headers.update({
+        # SecurityMiddleware blocks clients without a user agent
+        "User-Agent": "pytest",
+        "Authorization": f"Bearer {create_access_token({'sub': 'alice'})}"
+    })
+
+    response = client.put(f"/api/persons/{person_id}", json={"username": "op2"})
+    assert response.status_code == 200
+    assert response.json()["username"] == "op2"
+    assert client.put("/api/persons/not-a-uuid", json={"username": "op3"}).status_code == 404
+    assert client.delete("/api/persons/not-a-uuid").status_code == 404
+    assert client.delete(f"/api/persons/{person_id}").status_code == 200
+    assert client.delete(f"/api/persons/{person_id}").status_code == 404
@@ -0,0 +1,83 @@
+import asyncio
+import json
+import time
+
+from monitoring import health_checks
+from monitoring.health_sampler import HealthSampler
+from warmup import WarmUp
+
+def make_sampler(**checks):
+    sampler = HealthSampler(interval=60, timeout=0.2, max_staleness=5)
+    for name, check in checks.items():
+        sampler.register(name, check)
+    return sampler
+
+def test_probes_read_the_cached_sample():
+    calls = []
+    sampler = make_sampler(database=lambda: calls.append(1))
+    asyncio.run(sampler.sample_all())
+
+    for _ in range(5):
+        database = sampler.snapshot()["database"]
+    assert len(calls) == 1
+    assert database["status"] == "healthy"
+    assert database["consecutive_failures"] == 0
+    assert database["latency_ms"]["samples"] == 1
+    assert sampler.is_healthy()
+
+def test_stale_samples_are_unhealthy():
+    sampler = make_sampler(database=lambda: None)
+    asyncio.run(sampler.sample_all())
+    # As if the sampler task had died 10s ago
+    sampler._states["database"].checked_at -= 10
+
+    database = sampler.snapshot()["database"]
+    assert database["status"] == "unhealthy"
+    assert "stale" in database["error"]
+    assert not sampler.is_healthy()
+
+def test_one_failing_check_does_not_affect_the_others():
+    def redis_down():
+        raise ConnectionError("Connection refused")
+
+    sampler = make_sampler(database=lambda: None, redis=redis_down)
+    asyncio.run(sampler.sample_all())
+    asyncio.run(sampler.sample_all())
+
+    snapshot = sampler.snapshot()
+    assert snapshot["database"]["status"] == "healthy"
+    assert snapshot["redis"]["status"] == "unhealthy"
+    assert snapshot["redis"]["error"] == "Connection refused"
+    assert snapshot["redis"]["consecutive_failures"] == 2
+    assert sampler.is_healthy(["database"])
+    assert not sampler.is_healthy()
+
+def test_hung_checks_time_out_without_piling_up():
+    sampler = make_sampler(database=lambda: time.sleep(0.5))
+
+    async def sample_twice():
+        await sampler.sample("database")
+        first = sampler.snapshot()["database"]
+        await sampler.sample("database")
+        return first, sampler.snapshot()["database"]
+
+    first, second = asyncio.run(sample_twice())
+    assert "timed out" in first["error"]
+    assert second["error"] == "previous check still running"
+
+def test_health_before_the_first_sample(monkeypatch):
+    sampler = make_sampler(database=lambda: None, redis=lambda: None)
+    monkeypatch.setattr(health_checks, "health_sampler", sampler)
+    monkeypatch.setattr(health_checks, "warm_up", WarmUp(enabled=False))
+    asyncio.run(health_checks.warm_up.start(None, []))
+
+    assert sampler.snapshot()["database"] == {"status": "unknown", "error": "not sampled yet"}
+    for probe in (health_checks.readiness_probe, health_checks.detailed_health_check):
+        response = asyncio.run(probe())
+        body = json.loads(response.body)
+        assert response.status_code == 503
+        assert body["checks"]["database"]["status"] == "unknown"
+        assert body["checks"]["redis"]["error"] == "not sampled yet"
+
+    asyncio.run(sampler.sample_all())
+    assert asyncio.run(health_checks.readiness_probe()).status_code == 200
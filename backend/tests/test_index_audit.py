@@ -0,0 +1,58 @@
+from db_optimizer import AuditReport, IndexInfo, find_redundant_indexes, render_migration, _scratch_definition
+
+def users_indexes():
+    return [
+        IndexInfo("users", "users_pkey", ("id",), is_unique=True, is_primary=True, constraint="users_pkey", scans=900),
+        IndexInfo("users", "ix_users_username", ("username",), is_unique=True, scans=500),
+        IndexInfo("users", "idx_users_username", ("username",), scans=3),
+        IndexInfo("users", "ix_users_username_active", ("username", "is_active"), scans=10),
+        IndexInfo("users", "ix_users_is_active", ("is_active",), scans=0),
+        IndexInfo("users", "ix_users_active_role", ("is_active", "role_id"), scans=40),
+        IndexInfo("users", "ix_users_created_at", ("created_at",), scans=5),
+        IndexInfo("users", "ix_users_created_date", ("created_at",), options=(3,), scans=1),
+        IndexInfo("users", "ix_users_by_role", ("role_id",), predicate="is_active = true", scans=0),
+        IndexInfo("users", "ix_users_role_id", ("role_id",), scans=7),
+        IndexInfo("users", "ix_users_broken", ("email",), is_valid=False)
+    ]
+
+def by_name(findings):
+    return {finding.index.name: finding for finding in findings}
+
+def test_duplicates_and_prefixes():
+    findings = by_name(find_redundant_indexes(users_indexes()))
+
+    assert findings["idx_users_username"].reason == "duplicate"
+    assert findings["idx_users_username"].covered_by.name == "ix_users_username"
+    # A DESC single-column index is the backward scan of the ASC one
+    assert findings["ix_users_created_date"].covered_by.name == "ix_users_created_at"
+    assert findings["ix_users_is_active"].reason == "prefix"
+    assert findings["ix_users_is_active"].covered_by.name == "ix_users_active_role"
+    assert findings["ix_users_broken"].reason == "invalid"
+
+    # Constraints, unique indexes, different predicates and different leading columns stay
+    for kept in ("users_pkey", "ix_users_username", "ix_users_username_active", "ix_users_active_role",
+                 "ix_users_created_at", "ix_users_by_role", "ix_users_role_id"):
+        assert kept not in findings
+
+def test_planned_and_unused_indexes():
+    findings = by_name(find_redundant_indexes(users_indexes(), used={"ix_users_is_active"}))
+    assert "ix_users_is_active" not in findings
+
+    findings = by_name(find_redundant_indexes(users_indexes(), min_scans=5))
+    assert findings["ix_users_by_role"].reason == "unused"
+    assert "ix_users_role_id" not in findings
+    assert "ix_users_username" not in findings
+
+def test_migration_drops_concurrently_with_rollback():
+    indexes = users_indexes()
+    indexes[2].definition = "CREATE INDEX idx_users_username ON public.users USING btree (username)"
+    report = AuditReport(indexes, [f for f in find_redundant_indexes(indexes) if f.index.name == "idx_users_username"])
+    migration = render_migration(report)
+    assert "DROP INDEX CONCURRENTLY IF EXISTS public.idx_users_username;" in migration
+    assert "-- CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_username ON public.users" in migration
+
+def test_scratch_definition():
+    statement = _scratch_definition(
+        "CREATE UNIQUE INDEX ix_users_email ON public.users USING btree (email)", "users", "_index_audit_users", "audit1"
+    )
+    assert statement == "CREATE UNIQUE INDEX ix_users_email_audit1 ON _index_audit_users USING btree (email)"
@@ -0,0 +1,65 @@
+import json
+import os
+import pytest
+from jose import jwt
+from jose.exceptions import JWTError
+
+import jwt_utils
+import manage_jwt_keys
+from jwt_keys import JWTKeyStore
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def key_store(tmp_path, monkeypatch):
+    keys_dir = str(tmp_path)
+    manage_jwt_keys.add_key(keys_dir, activate_at=1000)
+    store = JWTKeyStore(keys_dir, "RS256", reload_interval=0, clock=FakeClock(2000))
+    monkeypatch.setattr(jwt_utils, "jwt_key_store", store)
+    monkeypatch.setattr(jwt_utils.jwt_manager, "algorithm", "RS256")
+    return store
+
+def test_tokens_are_signed_with_kid_and_verify_against_jwks(key_store):
+    token = jwt_utils.jwt_manager.create_token({"sub": "alice"}, "access")
+    kid = jwt.get_unverified_header(token)["kid"]
+    assert kid == key_store.signing_key().kid
+
+    jwks = key_store.jwks()
+    assert [key["kid"] for key in jwks["keys"]] == [kid]
+    assert "d" not in jwks["keys"][0]
+
+    payload = jwt.decode(token, jwks["keys"][0], algorithms=["RS256"], audience="saas-client", issuer="saas-api")
+    assert payload["sub"] == "alice"
+    assert jwt_utils.jwt_manager.validate_token(token)["sub"] == "alice"
+
+def test_next_key_is_published_before_it_signs(key_store):
+    current = key_store.signing_key().kid
+    next_kid = manage_jwt_keys.add_key(key_store.keys_dir, activate_at=5000)
+
+    assert {key["kid"] for key in key_store.jwks()["keys"]} == {current, next_kid}
+    assert key_store.signing_key().kid == current
+
+    key_store._clock.now = 6000
+    assert key_store.signing_key().kid == next_kid
+
+def test_unknown_kid_is_rejected(key_store):
+    token = jwt_utils.jwt_manager.create_token({"sub": "alice"}, "access")
+    manifest_path = os.path.join(key_store.keys_dir, "keyset.json")
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    manifest["keys"] = []
+    manage_jwt_keys.write_manifest(key_store.keys_dir, manifest)
+    os.utime(manifest_path, (0, 0))
+
+    with pytest.raises(JWTError):
+        jwt_utils.jwt_manager.validate_token(token)
+
+def test_asymmetric_algorithm_requires_a_key_directory():
+    with pytest.raises(ValueError, match="JWT_KEYS_DIR"):
+        JWTKeyStore(None, "RS256")
+    assert not JWTKeyStore(None, "HS256").enabled
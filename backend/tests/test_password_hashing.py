@@ -0,0 +1,24 @@
+from passlib.context import CryptContext
+from password_utils import hash_password, verify_password, verify_and_update_password, build_password_context
+
+def test_new_hashes_use_argon2id():
+    hashed = hash_password("Str0ng!Passw0rd")
+    assert hashed.startswith("$argon2id$")
+    assert verify_password("Str0ng!Passw0rd", hashed)
+
+def test_legacy_bcrypt_hash_is_verified_and_upgraded():
+    legacy_hash = CryptContext(schemes=["bcrypt"]).hash("testpass123")
+
+    ok, new_hash = verify_and_update_password("testpass123", legacy_hash)
+    assert ok
+    assert new_hash.startswith("$argon2id$")
+
+    ok, new_hash = verify_and_update_password("wrong-password", legacy_hash)
+    assert not ok and new_hash is None
+
+def test_outdated_argon2_parameters_are_rehashed():
+    old_hash = build_password_context(time_cost=1, memory_cost=8192, parallelism=1).hash("testpass123")
+
+    ok, new_hash = verify_and_update_password("testpass123", old_hash)
+    assert ok
+    assert new_hash is not None and new_hash != old_hash
@@ -0,0 +1,48 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from monitoring.pool_metrics import InstrumentedQueuePool, pool_state
+
+def test_checkouts_and_timeouts_are_recorded(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.05,
+        pool_label="test_pool"
+    )
+    pool = engine.pool
+
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        assert pool.state()["checked_out"] == 1
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+
+    state = next(p for p in pool_state()["pools"] if p["pool"] == "test_pool")
+    assert state["checked_out"] == 0
+    assert state["checkout_timeouts"] == 1
+    assert state["recent_checkouts"] == 1
+    engine.dispose()
+
+def test_label_survives_recreate_and_leaves_logging_alone(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=2,
+        pool_timeout=3,
+        pool_label="test_recreate"
+    )
+    assert "test_recreate" not in engine.pool.logger.name
+
+    engine.dispose()
+    pool = engine.pool
+    assert pool.pool_name == "test_recreate"
+    assert (pool.size(), pool.timeout()) == (2, 3)
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT 1")).scalar() == 1
+    state = next(p for p in pool_state()["pools"] if p["pool"] == "test_recreate")
+    assert state["recent_checkouts"] == 1
+    engine.dispose()
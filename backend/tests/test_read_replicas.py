@@ -0,0 +1,113 @@
+import os
+import pytest
+from sqlalchemy import create_engine
+
+import db_routing
+from auth import create_access_token
+from database import get_db
+from db_routing import Replica, ReplicaRouter, begin_request, end_request
+from main import app
+from models import Permission, Role, User
+
+def make_router(tmp_path, count=2):
+    replicas = [
+        Replica(f"replica_{i}", create_engine(f"sqlite:///{tmp_path / f'replica_{i}.db'}"))
+        for i in range(count)
+    ]
+    return ReplicaRouter(replicas, max_lag=5.0, check_interval=1.0, pin_seconds=5.0)
+
+def test_round_robin_skips_unhealthy_replicas(tmp_path):
+    router = make_router(tmp_path, count=3)
+    for replica in router.replicas:
+        replica.healthy = True
+    assert [router.pick().name for _ in range(3)] == ["replica_0", "replica_1", "replica_2"]
+
+    router.replicas[1].healthy = False
+    assert {router.pick().name for _ in range(4)} == {"replica_0", "replica_2"}
+
+    for replica in router.replicas:
+        replica.healthy = False
+    assert router.pick() is None
+
+def test_reads_pinned_to_primary_after_own_write(tmp_path, monkeypatch):
+    router = make_router(tmp_path)
+    for replica in router.replicas:
+        replica.healthy = True
+
+    db = router.session()
+    assert db.info.get("replica") is not None
+    db.close()
+
+    router.pin("client-a")
+    assert router.is_pinned("client-a")
+    assert not router.is_pinned("client-b")
+
+    token = begin_request(pinned=True, key="client-a")
+    try:
+        db = router.session()
+        assert "replica" not in db.info
+        db.close()
+    finally:
+        end_request(token)
+
+def test_commit_with_writes_marks_request(tmp_path):
+    router = make_router(tmp_path, count=1)
+    engine = router.replicas[0].engine
+    from database import Base
+    from models import Role
+    Base.metadata.create_all(bind=engine)
+
+    token = begin_request(pinned=False, key="client-a")
+    try:
+        db = router.replicas[0].session_factory()
+        db.query(Role).all()
+        db.commit()
+        assert db_routing._request_state.get()["wrote"] is False
+
+        db.add(Role(name="Viewer", description="Read only"))
+        db.commit()
+        db.close()
+    finally:
+        state = end_request(token)
+    assert state["wrote"] is True
+
+PRIMARY_URL = os.getenv("TEST_PRIMARY_DATABASE_URL")
+REPLICA_URL = os.getenv("TEST_REPLICA_DATABASE_URL")
+
+@pytest.mark.skipif(not (PRIMARY_URL and REPLICA_URL), reason="needs two local Postgres instances (primary + streaming replica)")
+def test_lag_check_against_postgres():
+    router = ReplicaRouter(
+        [Replica("primary_as_replica", create_engine(PRIMARY_URL)), Replica("replica", create_engine(REPLICA_URL))],
+        max_lag=5.0
+    )
+    router.check_all()
+    for replica in router.replicas:
+        assert replica.healthy, replica.error
+        assert replica.lag is not None and replica.lag <= 5.0
+
+    router.max_lag = -1.0
+    router.check_all()
+    assert router.pick() is None
+
+def test_read_permission_checks_load_the_user_from_the_read_session(client, db_session):
+    db_session.add(User(username="reader", email="reader@example.com", hashed_password="x", is_active=True,
+                        role=Role(name="viewer", permissions=[Permission(name="user:read")])))
+    db_session.commit()
+    used = []
+
+    def primary():
+        used.append("primary")
+        yield db_session
+
+    def replica():
+        used.append("replica")
+        yield db_session
+
+    app.dependency_overrides[get_db] = primary
+    app.dependency_overrides[db_routing.get_read_db] = replica
+    headers = {"User-Agent": "pytest", "Authorization": f"Bearer {create_access_token({'sub': 'reader'})}"}
+    try:
+        assert client.get("/api/v1/users/", headers=headers).status_code == 200
+        assert used == ["replica"]
+    finally:
+        app.dependency_overrides.pop(db_routing.get_read_db, None)
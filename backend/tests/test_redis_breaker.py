@@ -0,0 +1,196 @@
+import asyncio
+import time
+import pytest
+import pytest_asyncio
+import redis.asyncio as redis
+from circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class FaultyRedisServer:
+    """
+    Minimal RESP server standing in for Redis.
+    mode: "ok" answers GET/SET/SETEX/DEL/PING, "stall" never answers,
+    "error" answers every command with an error, "drop" closes the connection.
+    """
+
+    def __init__(self):
+        self.mode = "ok"
+        self.data = {}
+        self.commands = 0
+        self.server = None
+        self.port = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _read_command(self, reader):
+        header = await reader.readline()
+        if not header:
+            return None
+        args = []
+        for _ in range(int(header[1:])):
+            length = int((await reader.readline())[1:])
+            args.append((await reader.readexactly(length + 2))[:-2].decode())
+        return args
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                args = await self._read_command(reader)
+                if args is None:
+                    break
+                self.commands += 1
+                if self.mode == "stall":
+                    await asyncio.sleep(3600)
+                if self.mode == "drop":
+                    break
+                writer.write(self._reply(args))
+                await writer.drain()
+        except (asyncio.CancelledError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def _reply(self, args) -> bytes:
+        if self.mode == "error":
+            return b"-ERR injected failure\r\n"
+        command = args[0].upper()
+        if command in ("PING",):
+            return b"+PONG\r\n"
+        if command == "SET":
+            self.data[args[1]] = args[2]
+            return b"+OK\r\n"
+        if command == "SETEX":
+            self.data[args[1]] = args[3]
+            return b"+OK\r\n"
+        if command == "GET":
+            value = self.data.get(args[1])
+            if value is None:
+                return b"$-1\r\n"
+            return f"${len(value.encode())}\r\n{value}\r\n".encode()
+        if command == "DEL":
+            removed = sum(1 for key in args[1:] if self.data.pop(key, None) is not None)
+            return f":{removed}\r\n".encode()
+        return b"+OK\r\n"
+
+@pytest_asyncio.fixture
+async def fault_server():
+    server = FaultyRedisServer()
+    await server.start()
+    yield server
+    await server.stop()
+
+def make_client(server: FaultyRedisServer) -> redis.Redis:
+    return redis.Redis(
+        host="127.0.0.1",
+        port=server.port,
+        socket_timeout=0.2,
+        socket_connect_timeout=0.2,
+        decode_responses=True
+    )
+
+async def failing_call():
+    raise ConnectionError("boom")
+
+async def ok_call():
+    return "ok"
+
+@pytest.mark.asyncio
+async def test_breaker_opens_on_failure_rate_and_probes_half_open():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", failure_rate_threshold=0.5, minimum_calls=4, open_seconds=10, clock=clock)
+
+    await breaker.call(ok_call)
+    await breaker.call(ok_call)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            await breaker.call(failing_call)
+    assert breaker.state == CircuitState.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(ok_call)
+
+    clock.now += 10
+    assert breaker.state == CircuitState.HALF_OPEN
+    assert await breaker.call(ok_call) == "ok"
+    assert breaker.state == CircuitState.CLOSED
+
+@pytest.mark.asyncio
+async def test_failed_probe_reopens_circuit():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", minimum_calls=1, open_seconds=5, clock=clock)
+
+    with pytest.raises(ConnectionError):
+        await breaker.call(failing_call)
+    clock.now += 5
+    with pytest.raises(ConnectionError):
+        await breaker.call(failing_call)
+    assert breaker.state == CircuitState.OPEN
+    assert breaker.retry_after() == 5
+
+@pytest.mark.asyncio
+async def test_stalled_server_trips_breaker_and_fails_fast(fault_server):
+    client = make_client(fault_server)
+    breaker = CircuitBreaker("redis-test", minimum_calls=3, call_timeout=0.1)
+    fault_server.mode = "stall"
+
+    for _ in range(3):
+        with pytest.raises(Exception):
+            await breaker.call(client.get, "key")
+    assert breaker.state == CircuitState.OPEN
+
+    commands_before = fault_server.commands
+    start = time.monotonic()
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(client.get, "key")
+    assert time.monotonic() - start < 0.05
+    assert fault_server.commands == commands_before
+
+@pytest.mark.asyncio
+async def test_sessions_served_locally_while_redis_down(fault_server, monkeypatch):
+    from middleware import session_middleware
+    from middleware.session_middleware import RedisSessionManager, SessionStoreUnavailable
+
+    monkeypatch.setattr(session_middleware, "redis_breaker", CircuitBreaker("sessions-test", minimum_calls=1, call_timeout=0.1))
+    manager = RedisSessionManager(local_cache_ttl=30)
+    manager.redis_client = make_client(fault_server)
+
+    session_id = await manager.create_session(1, {"username": "testuser"})
+    assert (await manager.get_session(session_id))["username"] == "testuser"
+
+    fault_server.mode = "drop"
+    assert (await manager.get_session(session_id))["username"] == "testuser"
+    with pytest.raises(SessionStoreUnavailable):
+        await manager.get_session("session:2:unknown")
+
+@pytest.mark.asyncio
+async def test_cache_bypassed_while_circuit_open(fault_server, monkeypatch):
+    from middleware import cache_middleware
+    from middleware.cache_middleware import CacheMiddleware
+
+    breaker = CircuitBreaker("cache-test", minimum_calls=1, call_timeout=0.1)
+    monkeypatch.setattr(cache_middleware, "redis_breaker", breaker)
+    cache = CacheMiddleware(make_client(fault_server))
+
+    await cache.set_cached_response("users", [{"id": 1}])
+    assert await cache.get_cached_response("users") == [{"id": 1}]
+
+    fault_server.mode = "error"
+    for _ in range(2):
+        assert await cache.get_cached_response("users") is None
+    assert breaker.state == CircuitState.OPEN
+
+    commands_before = fault_server.commands
+    assert await cache.get_cached_response("users") is None
+    assert fault_server.commands == commands_before
@@ -0,0 +1,124 @@
+import asyncio
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import refresh_rotation
+from auth import create_refresh_token
+from circuit_breaker import CircuitBreaker
+from database import Base
+from models import User
+from refresh_rotation import RefreshFamilyUnavailable, RefreshTokenReuseError, RefreshTokenRotator, new_token_family
+from token_revocation import token_revocation
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def exists(self, key):
+        return int(key in self.data)
+
+class CountingSession:
+    """Counts ORM queries made through the session"""
+
+    def __init__(self, session):
+        self.session = session
+        self.queries = 0
+
+    def query(self, *args):
+        self.queries += 1
+        return self.session.query(*args)
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.add(User(username="alice", email="alice@example.com", hashed_password="x", is_active=True))
+    session.commit()
+    yield CountingSession(session)
+    session.close()
+
+@pytest.fixture(autouse=True)
+def fake_redis(monkeypatch):
+    redis = FakeRedis()
+    monkeypatch.setattr(refresh_rotation, "get_async_client", lambda: redis)
+    # The shared breaker may be open after other tests hit a missing Redis
+    monkeypatch.setattr(refresh_rotation, "redis_breaker", CircuitBreaker("test-redis"))
+
+    async def revoke_locally(jti, exp):
+        token_revocation.add_local(jti, exp)
+
+    monkeypatch.setattr(token_revocation, "revoke", revoke_locally)
+    return redis
+
+def test_concurrent_refreshes_share_one_rotation(db):
+    rotator = RefreshTokenRotator(grace_seconds=20)
+    token = create_refresh_token(data={"sub": "alice", "fam": new_token_family()})
+
+    async def storm():
+        return await asyncio.gather(*(rotator.rotate(token, db) for _ in range(10)))
+
+    results = asyncio.run(storm())
+    assert db.queries == 1
+    assert len({result["refresh_token"] for result in results}) == 1
+    assert results[0]["refresh_token"] != token
+    assert results[0]["user"]["username"] == "alice"
+
+    # Late tab within the grace window gets the same pair
+    assert asyncio.run(rotator.rotate(token, db)) == results[0]
+    assert db.queries == 1
+
+def test_reuse_after_grace_window_revokes_family(db, fake_redis):
+    rotator = RefreshTokenRotator(grace_seconds=20)
+    token = create_refresh_token(data={"sub": "alice", "fam": new_token_family()})
+
+    rotated = asyncio.run(rotator.rotate(token, db))
+    # Grace window elapses
+    rotator._rotated.clear()
+    fake_redis.data.clear()
+
+    with pytest.raises(RefreshTokenReuseError):
+        asyncio.run(rotator.rotate(token, db))
+
+    # The legitimate holder's newer token belongs to the revoked family
+    with pytest.raises(RefreshTokenReuseError):
+        asyncio.run(rotator.rotate(rotated["refresh_token"], db))
+
+def test_family_check_fails_closed_when_redis_is_down(db, fake_redis):
+    rotator = RefreshTokenRotator(grace_seconds=20)
+    token = create_refresh_token(data={"sub": "alice", "fam": new_token_family()})
+
+    async def redis_down(key):
+        raise ConnectionError("Connection refused")
+
+    fake_redis.exists = redis_down
+    with pytest.raises(RefreshFamilyUnavailable):
+        asyncio.run(rotator.rotate(token, db))
+    assert db.queries == 0
+
+    # Not treated as reuse: the token still rotates once Redis is back
+    del fake_redis.exists
+    assert asyncio.run(rotator.rotate(token, db))["user"]["username"] == "alice"
+
+def test_refresh_endpoint_returns_the_rotated_pair(client, test_user):
+    token = create_refresh_token(data={"sub": "testuser", "fam": new_token_family()})
+    client.cookies.set("refresh_token", token)
+    response = client.post("/api/v1/auth/refresh", headers={"User-Agent": "pytest", "X-Requested-With": "XMLHttpRequest"})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["token_type"] == "bearer"
+    assert body["user"]["username"] == "testuser"
+    assert set(body) == {"access_token", "token_type", "user"}
+    cookies = response.headers.get_list("set-cookie")
+    assert any(cookie.startswith("refresh_token=") and token not in cookie for cookie in cookies)
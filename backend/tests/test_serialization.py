@@ -0,0 +1,41 @@
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+
+from models import Permission, Person, PersonRole, Role, User
+from schemas import PersonResponse, UserResponse
+from serialization import json_response, person_response, type_adapter, user_response
+
+CREATED_AT = datetime(2024, 1, 1, 12, 30, tzinfo=timezone.utc)
+
+def make_user(user_id: int) -> User:
+    role = Role(id=1, name="admin", permissions=[Permission(id=1, name="user:read"), Permission(id=2, name="user:create")])
+    return User(id=user_id, username=f"user{user_id}", email=f"user{user_id}@example.com", role=role,
+                is_active=True, created_at=CREATED_AT)
+
+def test_json_response_matches_the_validated_response_model():
+    users = [make_user(1), make_user(2)]
+    response = json_response(List[UserResponse], [user_response(user) for user in users])
+
+    expected = jsonable_encoder([
+        UserResponse(id=user.id, username=user.username, email=user.email, role="admin",
+                     permissions=["user:read", "user:create"], is_active=True, created_at=CREATED_AT)
+        for user in users
+    ])
+    assert response.media_type == "application/json"
+    assert json.loads(response.body) == expected
+
+def test_person_response_serializes_uuid_and_enum():
+    person_id = uuid.uuid4()
+    person = Person(id=person_id, username="operator1", email="op@example.com", role=PersonRole.OPERATOR,
+                    is_active=True, created_at=CREATED_AT)
+    body = json.loads(json_response(PersonResponse, person_response(person)).body)
+    assert body["id"] == str(person_id)
+    assert body["role"] == "Operator"
+    assert body["created_at"] == "2024-01-01T12:30:00Z"
+
+def test_type_adapters_are_cached():
+    assert type_adapter(List[UserResponse]) is type_adapter(List[UserResponse])
@@ -0,0 +1,52 @@
+from config import settings
+from serve import cpu_limit, memory_limit, server_options, worker_count
+
+MiB = 1024 * 1024
+
+def test_worker_count_bounded_by_cpu_memory_and_max():
+    assert worker_count(4, 8192 * MiB, worker_memory_mb=256, reserve_mb=256, max_workers=16) == 4
+    assert worker_count(2.5, None, worker_memory_mb=256, reserve_mb=256, max_workers=16) == 3
+    # 1 GiB container: (1024 - 256) / 256 = 3 workers even with 8 CPUs
+    assert worker_count(8, 1024 * MiB, worker_memory_mb=256, reserve_mb=256, max_workers=16) == 3
+    assert worker_count(64, None, worker_memory_mb=256, reserve_mb=256, max_workers=16) == 16
+    assert worker_count(4, 300 * MiB, worker_memory_mb=256, reserve_mb=256, max_workers=16) == 1
+
+def test_cgroup_v2_limits(tmp_path):
+    (tmp_path / "cpu.max").write_text("150000 100000\n")
+    (tmp_path / "memory.max").write_text(f"{512 * MiB}\n")
+    meminfo = tmp_path / "meminfo"
+    meminfo.write_text("MemTotal:       16384000 kB\nMemFree:         1000 kB\n")
+
+    assert cpu_limit(str(tmp_path)) <= 1.5
+    assert memory_limit(str(tmp_path), str(meminfo)) == 512 * MiB
+
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    (tmp_path / "memory.max").write_text("max\n")
+    assert cpu_limit(str(tmp_path)) >= 1
+    assert memory_limit(str(tmp_path), str(meminfo)) == 16384000 * 1024
+
+def test_cgroup_v1_limits(tmp_path):
+    (tmp_path / "cpu").mkdir()
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("-1\n")
+    (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+    (tmp_path / "memory").mkdir()
+    (tmp_path / "memory" / "memory.limit_in_bytes").write_text("9223372036854771712\n")
+
+    assert cpu_limit(str(tmp_path)) >= 1
+    assert memory_limit(str(tmp_path), str(tmp_path / "missing")) is None
+
+def test_server_options(monkeypatch):
+    monkeypatch.setattr(settings, "server_workers", 3)
+    options = server_options()
+    assert options["workers"] == 3
+    assert options["preload_app"] is True
+    assert options["max_requests"] == settings.server_max_requests
+    assert server_options(workers=5)["workers"] == 5
+
+    monkeypatch.setattr(settings, "server_max_requests", 0)
+    assert server_options()["max_requests_jitter"] == 0
+
+def test_only_configured_proxies_are_trusted(monkeypatch):
+    assert server_options()["forwarded_allow_ips"] == "127.0.0.1"
+    monkeypatch.setattr(settings, "server_forwarded_allow_ips", "10.0.0.2,10.0.0.3")
+    assert server_options()["forwarded_allow_ips"] == "10.0.0.2,10.0.0.3"
@@ -0,0 +1,91 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import event, select, text, update
+
+from config import settings
+from database import Base, RoutingSession, create_sqlite_engines
+from models import Role, User
+
+@pytest.fixture
+def engines(tmp_path):
+    read_engine, write_engine = create_sqlite_engines(f"sqlite:///{tmp_path / 'app.db'}")
+    Base.metadata.create_all(write_engine)
+    yield read_engine, write_engine
+    read_engine.dispose()
+    write_engine.dispose()
+
+@pytest.fixture
+def executed(engines):
+    """(engine, statement) for every statement run on either engine"""
+    statements = []
+    for name, engine in zip(("read", "write"), engines):
+        event.listen(engine, "before_cursor_execute",
+                     lambda conn, cursor, statement, *args, name=name: statements.append((name, statement)))
+    return statements
+
+@pytest.fixture
+def session(engines):
+    read_engine, write_engine = engines
+    session = RoutingSession(bind=read_engine, write_bind=write_engine, autoflush=False)
+    yield session
+    session.close()
+
+def engines_used(executed):
+    return [name for name, statement in executed if statement != "BEGIN IMMEDIATE"]
+
+def test_selects_go_to_the_readers(session, engines, executed):
+    read_engine, _ = engines
+    assert session.get_bind(clause=select(User)) is read_engine
+    session.query(User).all()
+    session.execute(select(Role.name)).all()
+    assert engines_used(executed) == ["read", "read"]
+
+def test_dml_and_textual_sql_go_to_the_writer(session, engines, executed):
+    read_engine, write_engine = engines
+    assert session.get_bind(clause=update(User).values(is_active=False)) is write_engine
+    assert session.get_bind(clause=text("UPDATE users SET is_active = 0")) is write_engine
+    assert session.get_bind(clause=select(User).with_for_update()) is write_engine
+    assert session.get_bind() is write_engine
+    session.rollback()
+
+    session.execute(text("UPDATE users SET is_active = 0"))
+    # The rest of the transaction stays on the writer
+    session.query(User).all()
+    session.commit()
+    assert engines_used(executed) == ["write", "write"]
+
+    executed.clear()
+    session.query(User).all()
+    assert engines_used(executed) == ["read"]
+
+def test_pending_changes_and_flushes_use_the_writer(session, executed):
+    session.add(Role(name="viewer"))
+    # Not flushed yet (autoflush is off), but the query must not miss it on a reader
+    session.query(Role).all()
+    assert engines_used(executed) == ["write"]
+
+    session.flush()
+    assert set(engines_used(executed)) == {"write"}
+    session.commit()
+
+    executed.clear()
+    assert [role.name for role in session.query(Role)] == ["viewer"]
+    assert engines_used(executed) == ["read"]
+
+def test_sqlite_engines(engines, tmp_path):
+    read_engine, write_engine = engines
+    assert read_engine.pool.size() == settings.sqlite_reader_pool_size
+    assert write_engine.pool.size() == 1
+    with read_engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+
+    # The writer takes the write lock when its transaction begins
+    with write_engine.begin() as connection:
+        connection.exec_driver_sql("SELECT 1")
+        other = sqlite3.connect(str(tmp_path / "app.db"), timeout=0)
+        try:
+            with pytest.raises(sqlite3.OperationalError, match="locked"):
+                other.execute("BEGIN IMMEDIATE")
+        finally:
+            other.close()
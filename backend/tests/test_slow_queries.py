@@ -0,0 +1,66 @@
+import time
+
+from sqlalchemy import create_engine, text
+
+from monitoring.slow_queries import SlowQueryLog, bind_request, fingerprint, normalize_statement, redact_parameters, unbind_request
+
+def test_fingerprint_ignores_literals_and_parameters():
+    a = "SELECT * FROM users WHERE username = %(username_1)s AND id IN (%(id_1_1)s, %(id_1_2)s) LIMIT 10"
+    b = "SELECT *  FROM users WHERE username = 'bob' AND id IN (1, 2, 3) LIMIT 5"
+    assert normalize_statement(a) == "SELECT * FROM users WHERE username = ? AND id IN (?+) LIMIT ?"
+    assert fingerprint(a) == fingerprint(b)
+    assert normalize_statement("SELECT created_at::date FROM person") == "SELECT created_at::date FROM person"
+
+def test_parameters_are_redacted():
+    assert redact_parameters({"username": "alice", "id": 7, "active": True, "role": None}) == {
+        "username": "<str:5>", "id": "<int>", "active": True, "role": None
+    }
+    assert redact_parameters(("secret",)) == ["<str:6>"]
+    assert redact_parameters([(1,), (2,), (3,), (4,)])[-1] == "... 1 more"
+
+def test_slow_statements_are_recorded_with_route_and_plan(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'slow.db'}")
+    log = SlowQueryLog(threshold_ms=0, sample_rate=1.0, buffer_size=3, explain=True, explain_interval=60, explain_timeout_ms=1000)
+    log.attach(engine)
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)"))
+
+    token = bind_request({"path": "/api/items/5", "method": "GET"}, "req-1")
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT * FROM items WHERE name = :name"), {"name": "secret"}).all()
+    finally:
+        unbind_request(token)
+
+    entry = log.recent(1)[0]
+    assert entry["statement"] == "SELECT * FROM items WHERE name = ?"
+    assert entry["parameters"] == ["<str:6>"]
+    assert entry["route"] == "/api/items/5" and entry["request_id"] == "req-1"
+
+    deadline = time.time() + 5
+    while entry["plan"] is None and "plan_error" not in entry and time.time() < deadline:
+        time.sleep(0.01)
+    assert "SCAN" in entry["plan"]
+
+    with engine.connect() as connection:
+        for _ in range(5):
+            connection.execute(text("SELECT count(*) FROM items")).scalar()
+    assert len(log.entries) == 3
+    assert log.summary()[0]["count"] >= 1
+    log.shutdown()
+    engine.dispose()
+
+def test_threshold_filters_fast_statements(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fast.db'}")
+    log = SlowQueryLog(threshold_ms=10000, sample_rate=1.0, buffer_size=10, explain=False, explain_interval=60, explain_timeout_ms=1000)
+    log.attach(engine)
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1")).scalar()
+    assert log.recent() == []
+    engine.dispose()
+
+def test_postgres_plans_never_execute_writes_twice():
+    log = SlowQueryLog(threshold_ms=0, sample_rate=1.0, buffer_size=1, explain=False, explain_interval=60, explain_timeout_ms=1000)
+    assert log.explain_prefix("postgresql", "SELECT * FROM users") == "EXPLAIN (ANALYZE, BUFFERS) "
+    assert log.explain_prefix("postgresql", "SELECT * FROM users FOR UPDATE") == "EXPLAIN "
+    assert log.explain_prefix("postgresql", "UPDATE users SET is_active = false") == "EXPLAIN "
@@ -0,0 +1,97 @@
+import os
+
+import pytest
+
+from config import settings
+from startup import StartupReport, measure_cold_start, module_tree, package_totals, parse_importtime
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 | site
+import time:       300 |        300 |     sqlalchemy.sql
+import time:       200 |        500 |   sqlalchemy
+import time:        50 |         50 |   config
+import time:       100 |        650 | main
+"""
+
+def test_parse_importtime_keeps_only_the_module_tree():
+    entries = parse_importtime(IMPORTTIME)
+    assert [entry["module"] for entry in entries] == ["site", "sqlalchemy.sql", "sqlalchemy", "config", "main"]
+    assert entries[1]["depth"] == 2
+
+    tree = module_tree(entries, "main")
+    assert [entry["module"] for entry in tree] == ["sqlalchemy.sql", "sqlalchemy", "config", "main"]
+    assert package_totals(tree) == {"sqlalchemy": 500, "main": 100, "config": 50}
+    assert module_tree(entries, "missing") == []
+
+def test_steps_are_timed_and_optional_failures_skipped():
+    report = StartupReport()
+    report.begin()
+    with report.step("logging"):
+        pass
+    with report.step("telemetry", optional=True):
+        raise RuntimeError("exporter unavailable")
+    report.skip("sentry", "sentry_dsn not set")
+    with pytest.raises(RuntimeError):
+        with report.step("token_revocation"):
+            raise RuntimeError("required")
+    report.finish()
+
+    steps = {step["name"]: step for step in report.summary()["steps"]}
+    assert steps["logging"]["status"] == "ok"
+    assert steps["telemetry"]["status"] == "failed"
+    assert steps["telemetry"]["error"] == "exporter unavailable"
+    assert steps["sentry"]["status"] == "skipped"
+    assert steps["token_revocation"]["status"] == "failed"
+    assert report.startup_seconds is not None
+
+@pytest.mark.skipif(not os.getenv("STARTUP_BUDGET_CHECK"),
+                    reason="starts a real server; set STARTUP_BUDGET_CHECK=1 to run")
+def test_cold_start_within_budget(tmp_path, monkeypatch):
+    # A fresh `uvicorn main:app` must answer /health within startup_budget_seconds
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'cold_start.db'}")
+    elapsed = measure_cold_start(timeout=max(settings.startup_budget_seconds * 3, 30.0))
+    assert elapsed <= settings.startup_budget_seconds, (
+        f"cold start took {elapsed:.2f}s, budget {settings.startup_budget_seconds:.2f}s; see `python startup.py`"
+    )
+
+def test_telemetry_traces_an_app_that_has_already_started(tmp_path):
+    from contextlib import asynccontextmanager
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from opentelemetry import trace
+    from opentelemetry.instrumentation.requests import RequestsInstrumentor
+    from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+    from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+    from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+    from sqlalchemy import create_engine
+
+    from telemetry import TracingMiddleware, init_telemetry
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'telemetry.db'}")
+    spans = InMemorySpanExporter()
+
+    @asynccontextmanager
+    async def lifespan(app):
+        # As in main: the middleware stack already exists when this runs
+        init_telemetry(app=app, engines=[engine], metrics_port=None)
+        trace.get_tracer_provider().add_span_processor(SimpleSpanProcessor(spans))
+        yield
+
+    app = FastAPI(lifespan=lifespan)
+    app.add_middleware(TracingMiddleware)
+
+    @app.get("/ping")
+    def ping():
+        return {"ok": True}
+
+    try:
+        with TestClient(app) as client:
+            assert client.get("/ping").status_code == 200
+        assert any(span.name == "GET /ping" for span in spans.get_finished_spans())
+    finally:
+        TracingMiddleware.instances.clear()
+        RequestsInstrumentor().uninstrument()
+        SQLAlchemyInstrumentor().uninstrument()
+        engine.dispose()
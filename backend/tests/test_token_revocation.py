@@ -0,0 +1,135 @@
+import asyncio
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from jose import jwt
+
+import token_revocation
+from auth import create_access_token
+from cache_config import redis_breaker
+from middleware import jwt_middleware
+from token_revocation import BloomFilter, TokenRevocationList
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+def make_list(clock):
+    return TokenRevocationList(
+        partition_seconds=3600, recent_window=60, bloom_capacity=1000, bloom_error_rate=0.001, clock=clock
+    )
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [f"access_{i}_user" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"other_{i}" in bloom for i in range(10000))
+    assert false_positives < 300
+
+def test_recent_revocations_are_checked_in_memory():
+    clock = FakeClock()
+    revocations = make_list(clock)
+    revocations._lookup = lambda jti: _unexpected_lookup(jti)
+
+    revocations.add_local("access_1_alice", clock.now + 1800)
+    assert revocations.is_revoked("access_1_alice", clock.now + 1800)
+    assert not revocations.is_revoked("access_2_alice", clock.now + 1800)
+
+def test_older_bloom_hits_are_confirmed_once():
+    clock = FakeClock()
+    revocations = make_list(clock)
+    lookups = []
+    revocations._lookup = lambda jti: lookups.append(jti) or True
+
+    exp = clock.now + 1800
+    revocations.add_local("access_1_alice", exp)
+    clock.now += 120
+    revocations.expire()
+
+    assert revocations.is_revoked("access_1_alice", exp)
+    assert revocations.is_revoked("access_1_alice", exp)
+    assert lookups == ["access_1_alice"]
+
+class FlakyRedis:
+    """Async client whose first zscore fails, as during a Redis blip"""
+
+    def __init__(self, failures=1):
+        self.failures = failures
+        self.calls = 0
+
+    async def zscore(self, key, member):
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("Connection reset by peer")
+        return None
+
+def test_redis_errors_fail_closed_without_caching(monkeypatch):
+    clock = FakeClock()
+    revocations = make_list(clock)
+    redis = FlakyRedis()
+    monkeypatch.setattr(token_revocation, "get_async_client", lambda: redis)
+    redis_breaker.reset()
+
+    exp = clock.now + 1800
+    revocations.add_local("access_1_alice", exp)
+    clock.now += 120
+    revocations.expire()
+    # A Bloom false positive for a token that was never revoked
+    revocations._partitions[int(exp // 3600)].add("access_2_alice")
+
+    assert asyncio.run(revocations.is_revoked_async("access_2_alice", exp))
+    assert "access_2_alice" not in revocations._confirmed
+    # Redis is back: the token is valid again and the answer is cached
+    assert not asyncio.run(revocations.is_revoked_async("access_2_alice", exp))
+    assert not asyncio.run(revocations.is_revoked_async("access_2_alice", exp))
+    assert redis.calls == 2
+
+def test_expired_tokens_leave_the_denylist():
+    clock = FakeClock()
+    revocations = make_list(clock)
+    exp = clock.now + 600
+    revocations.add_local("access_1_alice", exp)
+    revocations.add_local("refresh_1_alice", clock.now - 1)
+
+    clock.now = exp + 3600
+    revocations.expire()
+    assert not revocations._partitions
+    assert not revocations._recent
+
+def test_middleware_rejects_revoked_tokens_on_api_routes(monkeypatch):
+    revocations = make_list(time.time)
+    monkeypatch.setattr(jwt_middleware, "token_revocation", revocations)
+    app = FastAPI()
+    app.add_middleware(jwt_middleware.JWTValidationMiddleware)
+
+    @app.post("/api/items")
+    def create_item():
+        return {"ok": True}
+
+    @app.post("/api/v1/auth/logout")
+    def logout():
+        return {"ok": True}
+
+    token = create_access_token({"sub": "alice"})
+    claims = jwt.get_unverified_claims(token)
+    client = TestClient(app)
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.post("/api/items", headers=headers).status_code == 200
+    assert client.post("/api/items").status_code == 401
+
+    revocations.add_local(claims["jti"], claims["exp"])
+    response = client.post("/api/items", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "Token has been revoked"
+    # Public auth routes stay reachable
+    assert client.post("/api/v1/auth/logout", headers=headers).status_code == 200
+
+def _unexpected_lookup(jti):
+    raise AssertionError(f"unexpected Redis lookup for {jti}")
@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, unique_violation
+from models import User
+
+def make_session(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'unique.db'}")
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+def insert_duplicate(db, **fields):
+    user = dict(username="alice", email="alice@example.com", hashed_password="x")
+    user.update(fields)
+    db.add(User(**user))
+    with pytest.raises(IntegrityError) as excinfo:
+        db.commit()
+    db.rollback()
+    return excinfo.value
+
+def test_sqlite_violation_names_the_column(tmp_path):
+    db = make_session(tmp_path)
+    db.add(User(username="alice", email="alice@example.com", hashed_password="x"))
+    db.commit()
+
+    error = insert_duplicate(db, email="other@example.com")
+    assert unique_violation(error, ("username", "email")) == "username"
+
+    error = insert_duplicate(db, username="bob")
+    assert unique_violation(error, ("username", "email")) == "email"
+    db.close()
+
+class _Diag:
+    def __init__(self, constraint_name):
+        self.constraint_name = constraint_name
+
+class _PostgresError(Exception):
+    def __init__(self, message, constraint_name):
+        super().__init__(message)
+        self.diag = _Diag(constraint_name)
+
+def test_postgres_violation_names_the_column():
+    orig = _PostgresError(
+        'duplicate key value violates unique constraint "ix_users_email"\n'
+        'DETAIL:  Key (email)=(alice@example.com) already exists.',
+        "ix_users_email"
+    )
+    error = IntegrityError("INSERT INTO users ...", {}, orig)
+    assert unique_violation(error, ("username", "email")) == "email"
+
+def test_other_integrity_errors_are_not_translated():
+    orig = Exception('insert or update on table "users" violates foreign key constraint "users_role_id_fkey"')
+    error = IntegrityError("INSERT INTO users ...", {}, orig)
+    assert unique_violation(error, ("username", "email")) is None
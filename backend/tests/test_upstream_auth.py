@@ -0,0 +1,45 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import upstream_auth
+from upstream_auth import principal_signature, trusted_principal
+
+SECRET = "edge-secret"
+
+def make_request(headers):
+    return SimpleNamespace(headers=headers, client=SimpleNamespace(host="10.0.0.1"))
+
+def signed_headers(username="alice", jti="access_1_alice", exp=None, issued=None):
+    exp = exp or int(time.time()) + 600
+    issued = issued or int(time.time())
+    return {
+        "X-Auth-User": username,
+        "X-Auth-Jti": jti,
+        "X-Auth-Exp": str(exp),
+        "X-Auth-Issued": str(issued),
+        "X-Auth-Signature": principal_signature(SECRET, username, jti, exp, issued)
+    }
+
+def test_signed_principal_is_trusted(monkeypatch):
+    monkeypatch.setattr(upstream_auth.settings, "upstream_auth_secret", SECRET)
+    principal = asyncio.run(trusted_principal(make_request(signed_headers())))
+    assert principal["sub"] == "alice"
+    assert principal["jti"] == "access_1_alice"
+
+def test_forged_stale_or_disabled_headers_are_ignored(monkeypatch):
+    monkeypatch.setattr(upstream_auth.settings, "upstream_auth_secret", SECRET)
+    forged = {**signed_headers(), "X-Auth-User": "admin"}
+    assert asyncio.run(trusted_principal(make_request(forged))) is None
+
+    stale = signed_headers(issued=int(time.time()) - 3600)
+    assert asyncio.run(trusted_principal(make_request(stale))) is None
+
+    monkeypatch.setattr(upstream_auth.settings, "upstream_auth_secret", None)
+    assert asyncio.run(trusted_principal(make_request(signed_headers()))) is None
+
+def test_revoked_token_is_not_trusted(monkeypatch):
+    monkeypatch.setattr(upstream_auth.settings, "upstream_auth_secret", SECRET)
+    headers = signed_headers(jti="access_2_alice")
+    upstream_auth.token_revocation.add_local("access_2_alice", int(headers["X-Auth-Exp"]))
+    assert asyncio.run(trusted_principal(make_request(headers))) is None
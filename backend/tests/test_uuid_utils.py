@@ -0,0 +1,27 @@
+import time
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from uuid_utils import uuid7, uuid7_timestamp
+
+def test_uuid7_layout():
+    value = uuid7()
+    assert value.version == 7
+    assert value.variant == uuid.RFC_4122
+    assert abs(uuid7_timestamp(value) - datetime.now(timezone.utc)).total_seconds() < 5
+
+def test_uuid7_is_monotonic_within_a_millisecond():
+    values = [uuid7() for _ in range(20000)]
+    assert values == sorted(values)
+    assert len(set(values)) == len(values)
+
+def test_uuid7_survives_clock_step_back(monkeypatch):
+    first = uuid7()
+    monkeypatch.setattr(time, "time_ns", lambda: 0)
+    assert uuid7() > first
+
+def test_uuid7_timestamp_rejects_other_versions():
+    with pytest.raises(ValueError):
+        uuid7_timestamp(uuid.uuid4())
@@ -0,0 +1,96 @@
+import asyncio
+import enum
+import json
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from monitoring import health_checks
+from warmup import WarmUp, open_connections, sample_value, warm_serializers
+
+class Colour(enum.Enum):
+    RED = "red"
+
+class Child(BaseModel):
+    id: int
+    created_at: datetime
+
+class Parent(BaseModel):
+    name: str
+    colour: Colour
+    note: Optional[str] = None
+    children: List[Child]
+
+def test_sample_value_validates_against_nested_models():
+    sample = sample_value(Parent)
+    parent = Parent.model_validate(sample)
+    assert parent.note is None
+    assert parent.children[0].id == 1
+
+def test_serializers_step_covers_the_app_routes():
+    from main import app
+
+    result = warm_serializers(app)
+    assert result["response_models"] > 0
+    assert 0 < result["exercised"] <= result["response_models"]
+
+def test_open_connections_fills_the_pool_up_to_its_size(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'warm.db'}", poolclass=QueuePool, pool_size=3, max_overflow=5)
+    assert open_connections(engine, 5) == 3
+    assert engine.pool.checkedin() == 3
+    assert engine.pool.checkedout() == 0
+    engine.dispose()
+
+def test_failed_steps_are_recorded_and_the_worker_becomes_ready():
+    warm_up = WarmUp(timeout=5, enabled=True)
+
+    def broken():
+        raise RuntimeError("redis unavailable")
+
+    async def ok():
+        return {"paths": 1}
+
+    asyncio.run(warm_up.run([("redis", broken), ("openapi", ok)]))
+    steps = {step["name"]: step for step in warm_up.state()["steps"]}
+    assert warm_up.status == "done" and warm_up.ready
+    assert steps["redis"]["status"] == "failed"
+    assert steps["openapi"] == {"name": "openapi", "status": "ok", "seconds": steps["openapi"]["seconds"], "result": {"paths": 1}}
+
+def test_warm_up_is_bounded_by_the_timeout():
+    warm_up = WarmUp(timeout=0.1, enabled=True)
+    asyncio.run(warm_up.run([("database", lambda: time.sleep(0.5))]))
+    assert warm_up.status == "timed_out"
+    assert warm_up.ready
+
+def test_readiness_waits_for_warm_up(monkeypatch):
+    warm_up = WarmUp(timeout=5, enabled=True)
+    healthy = {"status": "healthy"}
+    monkeypatch.setattr(health_checks, "warm_up", warm_up)
+    monkeypatch.setattr(health_checks.health_checker, "check_database", lambda: healthy)
+    monkeypatch.setattr(health_checks.health_checker, "check_redis", lambda: healthy)
+
+    def broken():
+        raise RuntimeError("connection to 10.0.0.5:6379 refused")
+
+    async def probe_during_warm_up():
+        release = asyncio.Event()
+        await warm_up.start(None, [], steps=[("redis", broken), ("rbac", release.wait)])
+        await asyncio.sleep(0)
+        during = await health_checks.readiness_probe()
+        release.set()
+        await warm_up._task
+        after = await health_checks.readiness_probe()
+        return during, after
+
+    during, after = asyncio.run(probe_during_warm_up())
+    assert during.status_code == 503
+    assert json.loads(during.body)["status"] == "warming_up"
+    assert after.status_code == 200
+    warmup = json.loads(after.body)["checks"]["warmup"]
+    assert warmup["status"] == "done"
+    # Step details stay in the logs
+    assert warmup["steps"] == [{"name": "redis", "status": "failed"}, {"name": "rbac", "status": "ok"}]
@@ -0,0 +1,276 @@
+"""
+JWT revocation (jti denylist)
+
+Revocations are written to Redis: a sorted set of jti scored by the token's
+exp (for confirmation lookups and purging) and a log sorted by revocation
+time (for incremental catch-up), plus a pub/sub message for other workers.
+
+Each worker keeps the denylist in memory so checking a token costs no
+network hop on the common path:
+    - an exact set of recently revoked jtis, and
+    - Bloom filters partitioned by token expiry; a partition is dropped as a
+      whole once every token it covers has expired.
+A jti found in the exact set is revoked. A Bloom hit outside the recent
+window is confirmed against Redis (and the answer cached); a Bloom miss means
+the token was not revoked. If Redis cannot answer (an error, or the breaker
+is open) a Bloom hit is treated as revoked for that request only; nothing is
+cached, so the next request asks Redis again.
+
+Async callers (the JWT middleware, upstream auth, refresh rotation) use
+is_revoked_async, which confirms through the asyncio client; sync code,
+which runs in the threadpool, uses is_revoked and the sync client. Both go
+through redis_breaker.
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from typing import Dict, Optional, Tuple
+
+from config import settings
+import deadlines
+from cache_config import create_async_redis_client, get_redis_client, redis_breaker
+
+logger = logging.getLogger(__name__)
+
+REVOKED_BY_EXP_KEY = "jti:revoked:exp"
+REVOCATION_LOG_KEY = "jti:revoked:log"
+REVOCATION_CHANNEL = "jti:revocations"
+
+class BloomFilter:
+    """Fixed-size Bloom filter over string keys"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class TokenRevocationList:
+    """Per-worker in-memory jti denylist synchronised through Redis"""
+
+    def __init__(
+        self,
+        partition_seconds: int = None,
+        recent_window: int = None,
+        bloom_capacity: int = None,
+        bloom_error_rate: float = None,
+        clock=time.time
+    ):
+        self.partition_seconds = partition_seconds or settings.revocation_partition_seconds
+        self.recent_window = recent_window or settings.revocation_recent_window
+        self.bloom_capacity = bloom_capacity or settings.revocation_bloom_capacity
+        self.bloom_error_rate = bloom_error_rate or settings.revocation_bloom_error_rate
+        self._clock = clock
+        self._partitions: Dict[int, BloomFilter] = {}
+        self._recent: Dict[str, Tuple[float, float]] = {}  # jti -> (exp, added_at)
+        self._confirmed: Dict[str, Tuple[bool, float]] = {}  # jti -> (revoked, exp)
+        self._log_cursor = 0.0
+        self._tasks = []
+
+    # Local state
+
+    def add_local(self, jti: str, exp: float):
+        """Record a revocation in this worker's denylist"""
+        now = self._clock()
+        if exp <= now:
+            return
+        bucket = int(exp // self.partition_seconds)
+        partition = self._partitions.get(bucket)
+        if partition is None:
+            partition = self._partitions[bucket] = BloomFilter(self.bloom_capacity, self.bloom_error_rate)
+        partition.add(jti)
+        self._recent[jti] = (exp, now)
+        self._confirmed.pop(jti, None)
+
+    def _check_local(self, jti: str, exp: float) -> Optional[bool]:
+        """The answer from memory, or None when a Bloom hit must be confirmed in Redis"""
+        if jti in self._recent:
+            return True
+        partition = self._partitions.get(int(exp // self.partition_seconds))
+        if partition is None or jti not in partition:
+            return False
+        cached = self._confirmed.get(jti)
+        if cached is not None:
+            return cached[0]
+        return None
+
+    def is_revoked(self, jti: str, exp: float) -> bool:
+        """Check a token from sync code; in-memory except for rare Bloom hits on older entries"""
+        revoked = self._check_local(jti, exp)
+        if revoked is None:
+            revoked = self._settle(jti, exp, self._lookup(jti))
+        return revoked
+
+    async def is_revoked_async(self, jti: str, exp: float) -> bool:
+        """Check a token without blocking the event loop"""
+        revoked = self._check_local(jti, exp)
+        if revoked is None:
+            revoked = self._settle(jti, exp, await self._lookup_async(jti))
+        return revoked
+
+    def expire(self):
+        """Drop expired partitions and age entries out of the exact set"""
+        now = self._clock()
+        current_bucket = int(now // self.partition_seconds)
+        for bucket in [b for b in self._partitions if b < current_bucket]:
+            del self._partitions[bucket]
+        self._recent = {
+            jti: (exp, added_at) for jti, (exp, added_at) in self._recent.items()
+            if exp > now and now - added_at < self.recent_window
+        }
+        self._confirmed = {jti: entry for jti, entry in self._confirmed.items() if entry[1] > now}
+
+    def _settle(self, jti: str, exp: float, revoked: Optional[bool]) -> bool:
+        if revoked is None:
+            # Fail closed for this request, but don't remember it
+            return True
+        self._confirmed[jti] = (revoked, exp)
+        return revoked
+
+    def _lookup(self, jti: str) -> Optional[bool]:
+        """Whether Redis has the jti revoked; None if Redis could not answer"""
+        deadlines.check("redis")
+        if not redis_breaker.allow_request():
+            logger.warning(f"Redis circuit open, treating {jti} as revoked")
+            return None
+        try:
+            score = get_redis_client().zscore(REVOKED_BY_EXP_KEY, jti)
+        except Exception as e:
+            redis_breaker.record_failure()
+            logger.warning(f"Could not confirm revocation of {jti}, treating as revoked: {e}")
+            return None
+        redis_breaker.record_success()
+        return score is not None
+
+    async def _lookup_async(self, jti: str) -> Optional[bool]:
+        """Whether Redis has the jti revoked; None if Redis could not answer"""
+        try:
+            score = await redis_breaker.call(get_async_client().zscore, REVOKED_BY_EXP_KEY, jti)
+        except deadlines.DeadlineExceeded:
+            raise
+        except Exception as e:
+            logger.warning(f"Could not confirm revocation of {jti}, treating as revoked: {e}")
+            return None
+        return score is not None
+
+    # Shared state
+
+    async def revoke(self, jti: str, exp: float):
+        """Revoke a token until its expiry, locally and for all workers"""
+        self.add_local(jti, exp)
+        now = self._clock()
+        try:
+            client = get_async_client()
+            async with client.pipeline(transaction=True) as pipe:
+                pipe.zadd(REVOKED_BY_EXP_KEY, {jti: exp})
+                pipe.zadd(REVOCATION_LOG_KEY, {f"{jti}|{exp}": now})
+                pipe.publish(REVOCATION_CHANNEL, f"{jti}|{exp}")
+                await redis_breaker.call(pipe.execute)
+        except Exception as e:
+            logger.error(f"Failed to publish revocation of {jti}; other workers will not see it: {e}")
+
+    async def load(self):
+        """Load revocations for unexpired tokens (startup)"""
+        now = self._clock()
+        client = get_async_client()
+        entries = await redis_breaker.call(client.zrangebyscore, REVOKED_BY_EXP_KEY, now, "+inf", withscores=True)
+        for jti, exp in entries:
+            self.add_local(jti, exp)
+        self._log_cursor = now
+        logger.info(f"Loaded {len(entries)} token revocations")
+
+    async def catch_up(self):
+        """Apply revocations logged since the last sync (covers missed pub/sub messages)"""
+        client = get_async_client()
+        cursor = self._clock()
+        entries = await redis_breaker.call(client.zrangebyscore, REVOCATION_LOG_KEY, self._log_cursor, "+inf")
+        for entry in entries:
+            self._apply_message(entry)
+        # Overlap slightly so entries written during the read aren't skipped
+        self._log_cursor = cursor - 5
+
+    async def purge(self):
+        """Remove revocations of expired tokens from Redis"""
+        now = self._clock()
+        client = get_async_client()
+        await redis_breaker.call(client.zremrangebyscore, REVOKED_BY_EXP_KEY, "-inf", now)
+        max_lifetime = settings.refresh_token_expire_days * 86400
+        await redis_breaker.call(client.zremrangebyscore, REVOCATION_LOG_KEY, "-inf", now - max_lifetime)
+
+    def _apply_message(self, message: str):
+        jti, _, exp = message.rpartition("|")
+        try:
+            self.add_local(jti, float(exp))
+        except ValueError:
+            logger.warning(f"Ignoring malformed revocation message: {message}")
+
+    async def _listen(self):
+        while True:
+            try:
+                pubsub = create_async_redis_client().pubsub()
+                await pubsub.subscribe(REVOCATION_CHANNEL)
+                # Anything published while we were disconnected
+                await self.catch_up()
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._apply_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Revocation subscription lost, retrying: {e}")
+                await asyncio.sleep(5)
+
+    async def _maintain(self):
+        while True:
+            await asyncio.sleep(settings.revocation_sync_interval)
+            self.expire()
+            try:
+                await self.catch_up()
+                await self.purge()
+            except Exception as e:
+                logger.warning(f"Revocation sync failed: {e}")
+
+    async def start(self):
+        """Load the denylist and start pub/sub sync"""
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error(f"Could not load token revocations: {e}")
+        self._tasks = [asyncio.create_task(self._listen()), asyncio.create_task(self._maintain())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+_async_client = None
+
+def get_async_client():
+    """Shared asyncio Redis client for revocation writes and sync"""
+    global _async_client
+    if _async_client is None:
+        _async_client = create_async_redis_client()
+    return _async_client
+
+# Global instance
+token_revocation = TokenRevocationList()
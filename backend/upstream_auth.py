@@ -0,0 +1,59 @@
+"""
+Trusted principal headers from the edge
+
+When nginx authenticates requests through the auth service (auth_request),
+the verified principal arrives in X-Auth-* headers signed with
+UPSTREAM_AUTH_SECRET. A valid signature lets the backend skip decoding the
+JWT; the jti is still checked against the in-memory revocation denylist.
+Headers with a bad signature, a stale timestamp or an expired token are
+ignored and the request falls back to normal JWT validation.
+"""
+import hashlib
+import hmac
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from fastapi import Request
+
+from config import settings
+from token_revocation import token_revocation
+
+logger = logging.getLogger(__name__)
+
+def principal_signature(secret: str, username: str, jti: str, exp: int, issued: int) -> str:
+    """HMAC over the principal fields; must match services/auth/verification.py"""
+    message = f"{username}|{jti}|{exp}|{issued}".encode()
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+async def trusted_principal(request: Request) -> Optional[Dict[str, Any]]:
+    """Claims from valid signed upstream headers, else None"""
+    secret = settings.upstream_auth_secret
+    signature = request.headers.get("X-Auth-Signature")
+    if not secret or not signature:
+        return None
+
+    username = request.headers.get("X-Auth-User")
+    jti = request.headers.get("X-Auth-Jti")
+    try:
+        exp = int(request.headers.get("X-Auth-Exp", ""))
+        issued = int(request.headers.get("X-Auth-Issued", ""))
+    except ValueError:
+        return None
+    if not username or not jti:
+        return None
+
+    expected = principal_signature(secret, username, jti, exp, issued)
+    if not hmac.compare_digest(signature, expected):
+        logger.warning("Ignoring upstream auth headers with an invalid signature", extra={
+            "ip_address": request.client.host if request.client else "unknown"
+        })
+        return None
+
+    now = time.time()
+    if now >= exp or abs(now - issued) > settings.upstream_auth_max_age:
+        return None
+    if await token_revocation.is_revoked_async(jti, exp):
+        return None
+
+    return {"sub": username, "jti": jti, "exp": exp, "type": "access", "upstream": True}
@@ -0,0 +1,274 @@
+"""
+Warm-up before readiness
+
+A fresh worker would otherwise pay for its cold state on its first requests:
+empty connection pools, unconfigured mappers and uncompiled statements,
+response models that have never validated anything and an OpenAPI schema
+that is built on the first /openapi.json. The lifespan starts a warm-up in
+the background that does this work up front, one timed step at a time:
+
+    database     opens warmup_db_connections pooled connections per engine
+    rbac         configures the mappers and loads roles, permissions and a
+                 user the way an authenticated request does
+    serializers  validates and serializes a sample of every route's response model
+    openapi      renders the schema FastAPI caches for /openapi.json
+    redis        opens warmup_redis_connections connections of the shared pool
+                 and pings the asyncio client
+
+/health/readiness reports not-ready until the warm-up has finished. It is
+bounded by warmup_timeout_seconds: a step that fails, or a warm-up that runs
+out of time, is logged and the worker becomes ready anyway, since every step
+only front-loads work the first requests would otherwise do.
+"""
+import asyncio
+import datetime as dt
+import enum
+import inspect
+import logging
+import time
+import uuid
+from decimal import Decimal
+from typing import Annotated, Any, Callable, Dict, List, Literal, Optional, Tuple, Union, get_args, get_origin
+
+from pydantic import BaseModel
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import configure_mappers, selectinload
+from sqlalchemy.pool import QueuePool
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    from types import UnionType
+except ImportError:  # Python < 3.10
+    UnionType = Union
+
+Step = Tuple[str, Callable[[], Any]]
+
+# Steps
+
+def open_connections(engine: Engine, count: int) -> int:
+    """Hold `count` connections at once so the pool keeps them open, then return them"""
+    pool = engine.pool
+    if isinstance(pool, QueuePool):
+        count = min(count, pool.size())
+    else:
+        # Single-connection or non-retaining pools: one connect is all that sticks
+        count = min(count, 1)
+    connections = []
+    try:
+        for _ in range(count):
+            # Raw DBAPI connection: no transaction, so no BEGIN IMMEDIATE or SET LOCAL hooks
+            connection = engine.raw_connection()
+            connections.append(connection)
+            cursor = connection.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+    finally:
+        for connection in connections:
+            connection.close()
+    return len(connections)
+
+def warm_database(engines: List[Engine], count: int) -> Dict[str, int]:
+    opened = [open_connections(engine, count) for engine in engines]
+    return {"engines": len(opened), "connections": sum(opened)}
+
+def warm_rbac() -> Dict[str, int]:
+    """Mapper configuration plus the role / permission loads of an authenticated request"""
+    from auth import get_user_permissions
+    from database import SessionLocal
+    from models import Role, User
+
+    configure_mappers()
+    db = SessionLocal()
+    try:
+        roles = db.query(Role).options(selectinload(Role.permissions)).all()
+        user = db.query(User).filter(User.is_active.is_(True)).first()
+        if user is not None:
+            # Same statements as get_current_user and the permission checks
+            user = db.query(User).filter(User.username == user.username).first()
+            get_user_permissions(user)
+        return {"roles": len(roles), "permissions": sum(len(role.permissions) for role in roles)}
+    finally:
+        db.close()
+
+def sample_value(annotation: Any, depth: int = 0) -> Any:
+    """A value that validates against `annotation` where a plain default exists; None otherwise"""
+    if depth > 5 or annotation is Any:
+        return None
+    origin = get_origin(annotation)
+    args = get_args(annotation)
+    if origin is Annotated:
+        return sample_value(args[0], depth)
+    if origin is Literal:
+        return args[0]
+    if origin is Union or origin is UnionType:
+        if type(None) in args:
+            return None
+        return sample_value(args[0], depth)
+    if origin in (list, set, frozenset, tuple):
+        return [sample_value(args[0], depth + 1)] if args and args[0] is not Ellipsis else []
+    if origin is dict:
+        return {}
+    if not isinstance(annotation, type):
+        return None
+    if issubclass(annotation, BaseModel):
+        return {
+            (field.alias or name): sample_value(field.annotation, depth + 1)
+            for name, field in annotation.model_fields.items()
+        }
+    if issubclass(annotation, enum.Enum):
+        return next(iter(annotation)).value
+    for kind, value in (
+        (bool, False),
+        (int, 1),
+        (float, 1.0),
+        (Decimal, Decimal("1")),
+        (str, "warmup"),
+        (dt.datetime, dt.datetime(2000, 1, 1, tzinfo=dt.timezone.utc)),
+        (dt.date, dt.date(2000, 1, 1)),
+        (uuid.UUID, uuid.UUID(int=1))
+    ):
+        if issubclass(annotation, kind):
+            return value
+    return None
+
+def warm_serializers(app) -> Dict[str, int]:
+    """Run a sample through each route's response field as FastAPI's serialize_response does"""
+    from fastapi.routing import APIRoute
+
+    routes = validated = 0
+    seen = set()
+    for route in app.routes:
+        field = getattr(route, "response_field", None) if isinstance(route, APIRoute) else None
+        if field is None or id(field) in seen:
+            continue
+        seen.add(id(field))
+        routes += 1
+        value, errors = field.validate(sample_value(field.field_info.annotation), {}, loc=("response",))
+        if errors:
+            # The sample was not good enough for this model; its first request compiles the rest
+            continue
+        field.serialize(value, mode="json", by_alias=True)
+        validated += 1
+    return {"response_models": routes, "exercised": validated}
+
+def warm_openapi(app) -> Dict[str, int]:
+    return {"paths": len(app.openapi().get("paths", {}))}
+
+def warm_redis(count: int) -> Dict[str, int]:
+    """Hold `count` connections of the shared client's pool at once, then release them"""
+    from cache_config import get_redis_client
+
+    pool = get_redis_client().connection_pool
+    connections = []
+    try:
+        for _ in range(count):
+            connection = pool.get_connection("PING")
+            connections.append(connection)
+            connection.send_command("PING")
+            connection.read_response()
+    finally:
+        for connection in connections:
+            pool.release(connection)
+    return {"connections": len(connections)}
+
+async def warm_async_redis() -> Dict[str, int]:
+    from token_revocation import get_async_client
+
+    await get_async_client().ping()
+    return {"connections": 1}
+
+def default_steps(app, engines: List[Engine]) -> List[Step]:
+    return [
+        ("database", lambda: warm_database(engines, settings.warmup_db_connections)),
+        ("rbac", warm_rbac),
+        ("serializers", lambda: warm_serializers(app)),
+        ("openapi", lambda: warm_openapi(app)),
+        ("redis", lambda: warm_redis(settings.warmup_redis_connections)),
+        ("redis_async", warm_async_redis)
+    ]
+
+class WarmUp:
+    """Runs the warm-up steps once per process, in the background; `ready` gates readiness"""
+
+    def __init__(self, timeout: float = None, enabled: bool = None):
+        self.timeout = timeout if timeout is not None else settings.warmup_timeout_seconds
+        self.enabled = enabled if enabled is not None else settings.warmup_enabled
+        self.status = "pending"  # pending, running, done, timed_out or disabled
+        self.seconds: Optional[float] = None
+        self.steps: List[Dict[str, Any]] = []
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status in ("done", "timed_out", "disabled")
+
+    async def run(self, steps: List[Step]):
+        """Run the steps in order (blocking ones in a thread), within the timeout"""
+        self.status = "running"
+        self.steps = []
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._run_steps(steps), self.timeout)
+            self.status = "done"
+        except asyncio.TimeoutError:
+            # A step still running in a thread finishes on its own
+            self.status = "timed_out"
+            logger.warning(f"Warm-up did not finish within {self.timeout}s; marking the worker ready")
+        self.seconds = round(time.perf_counter() - start, 4)
+        logger.info(f"Warm-up {self.status} in {self.seconds:.3f}s: "
+                    + ", ".join(f"{step['name']} {step['status']} {step['seconds']:.3f}s" for step in self.steps))
+
+    async def _run_steps(self, steps: List[Step]):
+        for name, step in steps:
+            entry = {"name": name, "status": "running", "seconds": 0.0}
+            self.steps.append(entry)
+            start = time.perf_counter()
+            try:
+                if inspect.iscoroutinefunction(step):
+                    entry["result"] = await step()
+                else:
+                    entry["result"] = await asyncio.to_thread(step)
+                entry["status"] = "ok"
+            except Exception as e:
+                entry["status"] = "failed"
+                entry["error"] = str(e)
+                logger.warning(f"Warm-up step {name} failed: {e}")
+            finally:
+                entry["seconds"] = round(time.perf_counter() - start, 4)
+
+    async def start(self, app, engines: List[Engine], steps: List[Step] = None):
+        """Start the warm-up task; the worker is not ready until it finishes"""
+        if not self.enabled:
+            self.status = "disabled"
+            return
+        if self._task is None or self._task.done():
+            self.status = "pending"
+            self._task = asyncio.create_task(self.run(steps if steps is not None else default_steps(app, engines)))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "ready": self.ready,
+            "seconds": self.seconds,
+            "steps": list(self.steps)
+        }
+
+    def public_state(self) -> Dict[str, Any]:
+        """state() without step results and errors, for unauthenticated probes (errors are logged)"""
+        return dict(self.state(), steps=[{"name": step["name"], "status": step["status"]} for step in self.steps])
+
+# Global instance
+warm_up = WarmUp()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark token verification throughput per core
+
+Runs single-threaded (one core) against a freshly generated RS256 key, so
+no backend is needed:
+    - cold:    every token is new (RSA signature check + claim validation)
+    - cached:  the same tokens again (verified-token cache hits)
+    - batch:   /verify/batch-style verification of N tokens per call
+    - http:    GET /auth through the ASGI app in-process (framework overhead)
+
+Usage:
+    python benchmark.py --tokens 5000 --batch-size 100
+"""
+
+import argparse
+import asyncio
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from jwks_client import JWKSVerifier
+from revocations import RevocationList
+from verification import TokenVerificationService, VerifiedTokenCache
+
+def make_tokens(count: int):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode()
+    public_jwk = {**jwk.construct(pem, "RS256").public_key().to_dict(), "kid": "bench", "use": "sig"}
+    now = datetime.utcnow()
+    tokens = [
+        jwt.encode(
+            {
+                "sub": f"user{i}", "exp": now + timedelta(minutes=30), "iat": now, "nbf": now,
+                "iss": "saas-api", "aud": "saas-client", "type": "access", "jti": uuid.uuid4().hex
+            },
+            pem,
+            algorithm="RS256",
+            headers={"kid": "bench"}
+        )
+        for i in range(count)
+    ]
+    return {"keys": [public_jwk]}, tokens
+
+def report(label: str, count: int, elapsed: float):
+    print(f"{label:8} {count / elapsed:>10,.0f} verifications/s per core  ({elapsed / count * 1e6:.1f} us each)")
+
+def run_http(service: TokenVerificationService, tokens, rounds: int):
+    import main
+    main.verification_service = service
+    scope_base = {"type": "http", "method": "GET", "path": "/auth", "query_string": b"", "scheme": "http",
+                  "server": ("bench", 80), "client": ("127.0.0.1", 1), "http_version": "1.1", "root_path": ""}
+
+    async def call(token):
+        scope = {**scope_base, "headers": [(b"authorization", f"Bearer {token}".encode())]}
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            pass
+
+        await main.app(scope, receive, send)
+
+    async def run():
+        start = time.perf_counter()
+        for _ in range(rounds):
+            for token in tokens:
+                await call(token)
+        return time.perf_counter() - start
+
+    return asyncio.run(run())
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark token verification")
+    parser.add_argument("--tokens", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--skip-http", action="store_true")
+    args = parser.parse_args()
+
+    print(f"Generating {args.tokens} tokens...")
+    jwks, tokens = make_tokens(args.tokens)
+    verifier = JWKSVerifier("unused://jwks")
+    verifier.load(jwks, max_age=3600)
+    revocations = RevocationList(None)
+    revocations.loaded = True
+    service = TokenVerificationService(verifier, VerifiedTokenCache(max_size=len(tokens)), revocations,
+                                       header_secret="bench")
+
+    start = time.perf_counter()
+    for token in tokens:
+        service.verify(token)
+    report("cold", len(tokens), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for token in tokens:
+        service.verify(token)
+    report("cached", len(tokens), time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(0, len(tokens), args.batch_size):
+        service.verify_many(tokens[i:i + args.batch_size])
+    report("batch", len(tokens), time.perf_counter() - start)
+
+    if not args.skip_http:
+        report("http", len(tokens), run_http(service, tokens, rounds=1))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+JWKS verifier client
+
+Verifies backend-issued JWTs locally using the public keys published at
+/.well-known/jwks.json. The key set is cached (for the max-age the backend
+sends, by default) so verification makes no network call per request. An
+unknown kid triggers a refetch, rate limited so forged kids can't turn
+into a request flood against the backend.
+"""
+import json
+import logging
+import re
+import threading
+import time
+import urllib.request
+from typing import Any, Dict, Optional
+
+from jose import jwt
+from jose.exceptions import JWTError
+
+logger = logging.getLogger(__name__)
+
+class JWKSVerifier:
+    """Caches a JWKS document and verifies tokens against it"""
+
+    def __init__(
+        self,
+        jwks_url: str,
+        audience: str = "saas-client",
+        issuer: str = "saas-api",
+        cache_ttl: Optional[float] = None,
+        min_refresh_interval: float = 30.0,
+        fetch_timeout: float = 2.0
+    ):
+        self.jwks_url = jwks_url
+        self.audience = audience
+        self.issuer = issuer
+        self.cache_ttl = cache_ttl
+        self.min_refresh_interval = min_refresh_interval
+        self.fetch_timeout = fetch_timeout
+        self._keys: Dict[str, Dict[str, Any]] = {}
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def _fetch(self):
+        with urllib.request.urlopen(self.jwks_url, timeout=self.fetch_timeout) as response:
+            document = json.loads(response.read())
+            max_age = self.cache_ttl
+            if max_age is None:
+                match = re.search(r"max-age=(\d+)", response.headers.get("Cache-Control", ""))
+                max_age = int(match.group(1)) if match else 300
+        self.load(document, max_age)
+        logger.info(f"Fetched {len(self._keys)} JWKS keys from {self.jwks_url}")
+
+    def load(self, document: Dict[str, Any], max_age: float):
+        """Install a JWKS document (fetched, or provided directly)"""
+        self._keys = {key["kid"]: key for key in document.get("keys", []) if "kid" in key}
+        self._fetched_at = time.monotonic()
+        self._expires_at = self._fetched_at + max_age
+
+    def refresh(self, force: bool = False):
+        """Refetch the key set if the cached copy is stale (or force, rate limited)"""
+        with self._lock:
+            now = time.monotonic()
+            if not force and now < self._expires_at:
+                return
+            if force and now - self._fetched_at < self.min_refresh_interval:
+                return
+            try:
+                self._fetch()
+            except Exception as e:
+                # Keep serving the cached keys; verification of known kids still works
+                logger.warning(f"JWKS fetch from {self.jwks_url} failed: {e}")
+                self._expires_at = now + min(self.min_refresh_interval, 5.0)
+
+    def seconds_until_stale(self) -> float:
+        return self._expires_at - time.monotonic()
+
+    def get_key(self, kid: Optional[str]) -> Dict[str, Any]:
+        """Public JWK for a kid, refetching the key set if it is unknown"""
+        self.refresh()
+        key = self._keys.get(kid)
+        if key is None:
+            self.refresh(force=True)
+            key = self._keys.get(kid)
+        if key is None:
+            raise JWTError(f"Unknown signing key: {kid}")
+        return key
+
+    def verify(self, token: str, expected_type: str = "access") -> Dict[str, Any]:
+        """Verify signature and standard claims; returns the payload"""
+        header = jwt.get_unverified_header(token)
+        key = self.get_key(header.get("kid"))
+        payload = jwt.decode(
+            token,
+            key,
+            algorithms=[key.get("alg", "RS256")],
+            audience=self.audience,
+            issuer=self.issuer
+        )
+        if payload.get("type") != expected_type:
+            raise JWTError(f"Invalid token type. Expected: {expected_type}, Got: {payload.get('type')}")
+        return payload
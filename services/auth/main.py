@@ -1,18 +1,120 @@
-from fastapi import FastAPI
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request, Response, status
+from pydantic import BaseModel, Field
 from datetime import datetime
+from typing import List
+from jose.exceptions import JWTError
+import asyncio
+import logging
+import os
 import uvicorn
 
+from jwks_client import JWKSVerifier
+from revocations import RevocationList, RevocationListUnavailable
+from verification import TokenVerificationService, VerifiedTokenCache
+
+logger = logging.getLogger(__name__)
+
+# Configuration
+JWKS_URL = os.getenv("JWKS_URL", "http://backend:8000/.well-known/jwks.json")
+UPSTREAM_AUTH_SECRET = os.getenv("UPSTREAM_AUTH_SECRET")
+REDIS_URL = os.getenv("REDIS_URL")  # the backend's Redis, for the revocation denylist
+REVOCATION_SYNC_INTERVAL = float(os.getenv("REVOCATION_SYNC_INTERVAL", "30"))
+VERIFY_CACHE_SIZE = int(os.getenv("VERIFY_CACHE_SIZE", "100000"))
+VERIFY_CACHE_TTL = float(os.getenv("VERIFY_CACHE_TTL", "60"))
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+
 app = FastAPI(
     title="Auth Service",
-    description="Authentication service with health endpoints",
-    version="1.0.0"
+    description="Token verification service (JWKS-based, with nginx auth_request support)",
+    version="1.1.0"
+)
+
+verification_service = TokenVerificationService(
+    JWKSVerifier(JWKS_URL),
+    VerifiedTokenCache(max_size=VERIFY_CACHE_SIZE, ttl=VERIFY_CACHE_TTL),
+    RevocationList(REDIS_URL, sync_interval=REVOCATION_SYNC_INTERVAL),
+    header_secret=UPSTREAM_AUTH_SECRET
 )
 
+class VerifyRequest(BaseModel):
+    token: str
+    token_type: str = "access"
+
+class BatchVerifyRequest(BaseModel):
+    tokens: List[str] = Field(..., max_length=MAX_BATCH_SIZE)
+    token_type: str = "access"
+
+async def _refresh_jwks():
+    """Keep the JWKS fresh off the request path"""
+    verifier = verification_service.verifier
+    while True:
+        await asyncio.to_thread(verifier.refresh)
+        await asyncio.sleep(max(1.0, verifier.seconds_until_stale()))
+
+@app.on_event("startup")
+async def start_background_sync():
+    app.state.jwks_task = asyncio.create_task(_refresh_jwks())
+    await verification_service.revocations.start()
+
+@app.on_event("shutdown")
+async def stop_background_sync():
+    app.state.jwks_task.cancel()
+    await verification_service.revocations.stop()
+
+@app.exception_handler(RevocationListUnavailable)
+async def revocation_list_unavailable(request: Request, exc: RevocationListUnavailable):
+    """Tokens are not vouched for until the denylist is loaded"""
+    return Response(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, headers={"Retry-After": "5"})
+
 @app.get("/")
 async def root():
     return {"message": "Auth Service is running"}
 
+@app.post("/verify")
+async def verify_token(body: VerifyRequest):
+    """Verify one token; returns its claims"""
+    try:
+        claims = await verification_service.verify_async(body.token, body.token_type)
+    except JWTError as e:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+    return {"valid": True, "claims": claims}
+
+@app.post("/verify/batch")
+async def verify_tokens(body: BatchVerifyRequest):
+    """Verify many tokens in one call; results are in request order"""
+    results = await asyncio.to_thread(verification_service.verify_many, body.tokens, body.token_type)
+    return {"results": results}
+
+@app.get("/auth")
+async def auth_request(request: Request, required: bool = False):
+    """
+    nginx auth_request endpoint.
+    Returns 200 with signed X-Auth-* principal headers for a valid access token.
+    Requests without a valid token pass as anonymous (200, no principal) so the
+    backend can handle public endpoints, refresh and API keys; with
+    required=true they get 401 instead.
+    """
+    token = request.cookies.get("access_token")
+    auth_header = request.headers.get("Authorization", "")
+    if not token and auth_header.startswith("Bearer "):
+        token = auth_header[len("Bearer "):]
+
+    if token:
+        try:
+            payload = await verification_service.verify_async(token)
+            return Response(status_code=200, headers=verification_service.principal_headers(payload))
+        except JWTError as e:
+            logger.debug(f"Edge verification failed: {e}")
+        except RevocationListUnavailable:
+            if required:
+                raise
+            # Can't vouch for the token; the backend validates it itself
+            logger.warning("Revocation list not loaded; passing the request through as anonymous")
+
+    if required:
+        return Response(status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    return Response(status_code=200, headers={"X-Auth-Status": "anonymous"})
+
 @app.get("/health")
 async def health_check():
     """Simple health check endpoint"""
@@ -21,14 +123,17 @@ async def health_check():
 @app.get("/health/detailed")
 async def health_check_detailed():
     """Detailed health check endpoint"""
+    cache = verification_service.cache
     return {
         "status": "healthy",
         "timestamp": datetime.utcnow().isoformat(),
         "service": "auth-service",
-        "version": "1.0.0",
+        "version": "1.1.0",
         "checks": {
             "service": {"status": "healthy"},
-            "dependencies": {"status": "healthy"}
+            "dependencies": {"status": "healthy"},
+            "verified_token_cache": {"size": len(cache), "hits": cache.hits, "misses": cache.misses},
+            "revocation_list": {"loaded": verification_service.revocations.loaded}
         }
     }
 
@@ -0,0 +1,131 @@
+"""
+Revoked token ids (jti), synced from the backend's denylist in Redis
+
+The backend writes every revocation to Redis (see backend/token_revocation.py):
+a sorted set of jti scored by expiry, a log scored by revocation time and a
+pub/sub message. This service keeps the unexpired revoked jtis in memory so
+checking a token is a dict lookup: it loads the set at startup, applies
+pub/sub messages as they arrive and replays the log periodically to cover
+messages missed while disconnected.
+
+Until the first load succeeds the list cannot answer; is_revoked raises
+RevocationListUnavailable and callers must not vouch for the token.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+
+import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+# Must match backend/token_revocation.py
+REVOKED_BY_EXP_KEY = "jti:revoked:exp"
+REVOCATION_LOG_KEY = "jti:revoked:log"
+REVOCATION_CHANNEL = "jti:revocations"
+
+class RevocationListUnavailable(Exception):
+    """The denylist has not been loaded from Redis yet"""
+
+class RevocationList:
+    """In-memory copy of the backend's jti denylist"""
+
+    def __init__(self, redis_url: Optional[str], sync_interval: float = 30.0, clock=time.time):
+        self.redis_url = redis_url
+        self.sync_interval = sync_interval
+        self._clock = clock
+        self._revoked: Dict[str, float] = {}  # jti -> exp
+        self._log_cursor = 0.0
+        self.loaded = False
+        self._client = None
+        self._tasks = []
+
+    def add(self, jti: str, exp: float):
+        if exp > self._clock():
+            self._revoked[jti] = exp
+
+    def is_revoked(self, jti: str) -> bool:
+        if not self.loaded:
+            raise RevocationListUnavailable("Token revocation list not loaded")
+        return jti in self._revoked
+
+    def expire(self):
+        now = self._clock()
+        self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+
+    def apply_message(self, message: str):
+        """Apply a "<jti>|<exp>" pub/sub message or log entry"""
+        jti, _, exp = message.rpartition("|")
+        try:
+            self.add(jti, float(exp))
+        except ValueError:
+            logger.warning(f"Ignoring malformed revocation message: {message}")
+
+    def _redis(self):
+        if self._client is None:
+            self._client = aioredis.from_url(self.redis_url, decode_responses=True, socket_timeout=2.0)
+        return self._client
+
+    async def load(self):
+        """Load revocations of unexpired tokens"""
+        now = self._clock()
+        entries = await self._redis().zrangebyscore(REVOKED_BY_EXP_KEY, now, "+inf", withscores=True)
+        for jti, exp in entries:
+            self.add(jti, exp)
+        self._log_cursor = now
+        self.loaded = True
+        logger.info(f"Loaded {len(entries)} token revocations")
+
+    async def catch_up(self):
+        """Apply revocations logged since the last sync"""
+        cursor = self._clock()
+        for entry in await self._redis().zrangebyscore(REVOCATION_LOG_KEY, self._log_cursor, "+inf"):
+            self.apply_message(entry)
+        # Overlap slightly so entries written during the read aren't skipped
+        self._log_cursor = cursor - 5
+
+    async def _listen(self):
+        while True:
+            try:
+                if not self.loaded:
+                    await self.load()
+                pubsub = self._redis().pubsub()
+                await pubsub.subscribe(REVOCATION_CHANNEL)
+                # Anything published while we were disconnected
+                await self.catch_up()
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.apply_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Revocation subscription lost, retrying: {e}")
+                await asyncio.sleep(5)
+
+    async def _maintain(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            self.expire()
+            if not self.loaded:
+                continue
+            try:
+                await self.catch_up()
+            except Exception as e:
+                logger.warning(f"Revocation sync failed: {e}")
+
+    async def start(self):
+        if not self.redis_url:
+            logger.error("REDIS_URL is not set; tokens cannot be checked for revocation and will not be vouched for")
+            return
+        self._tasks = [asyncio.create_task(self._listen()), asyncio.create_task(self._maintain())]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
@@ -0,0 +1,47 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jose import jwk, jwt
+
+from jwks_client import JWKSVerifier
+from revocations import RevocationList
+from verification import TokenVerificationService, VerifiedTokenCache
+
+class TokenIssuer:
+    """Signs tokens the way the backend does, with a throwaway RS256 key"""
+
+    def __init__(self):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.pem = private_key.private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        ).decode()
+        public_jwk = jwk.construct(self.pem, "RS256").public_key().to_dict()
+        self.jwks = {"keys": [{**public_jwk, "kid": "test", "use": "sig"}]}
+
+    def issue(self, sub: str = "alice", token_type: str = "access", minutes: int = 30):
+        now = datetime.utcnow()
+        claims = {
+            "sub": sub, "exp": now + timedelta(minutes=minutes), "iat": now, "nbf": now,
+            "iss": "saas-api", "aud": "saas-client", "type": token_type, "jti": uuid.uuid4().hex
+        }
+        token = jwt.encode(claims, self.pem, algorithm="RS256", headers={"kid": "test"})
+        return token, jwt.get_unverified_claims(token)
+
+@pytest.fixture(scope="session")
+def issuer():
+    return TokenIssuer()
+
+@pytest.fixture
+def revocations():
+    revocations = RevocationList(None)
+    revocations.loaded = True
+    return revocations
+
+@pytest.fixture
+def service(issuer, revocations):
+    verifier = JWKSVerifier("unused://jwks")
+    verifier.load(issuer.jwks, max_age=3600)
+    return TokenVerificationService(verifier, VerifiedTokenCache(), revocations, header_secret="edge-secret")
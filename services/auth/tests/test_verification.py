@@ -0,0 +1,106 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from jose.exceptions import JWTError
+
+import main
+from revocations import RevocationList, RevocationListUnavailable
+
+@pytest.fixture
+def client(service, monkeypatch):
+    monkeypatch.setattr(main, "verification_service", service)
+    # Not used as a context manager: the startup JWKS / Redis sync stays off
+    return TestClient(main.app)
+
+def test_revoked_tokens_fail_even_when_cached(service, revocations, issuer):
+    token, claims = issuer.issue()
+    assert service.verify(token)["sub"] == "alice"
+
+    revocations.add(claims["jti"], claims["exp"])
+    with pytest.raises(JWTError, match="revoked"):
+        service.verify(token)
+    with pytest.raises(JWTError, match="revoked"):
+        asyncio.run(service.verify_async(token))
+
+def test_unloaded_revocation_list_does_not_vouch(service, revocations, issuer):
+    revocations.loaded = False
+    token, _ = issuer.issue()
+    with pytest.raises(RevocationListUnavailable):
+        service.verify(token)
+
+def test_cache_misses_are_verified_off_the_event_loop(service, issuer, monkeypatch):
+    threads = []
+    verify = service.verifier.verify
+    monkeypatch.setattr(service.verifier, "verify", lambda *args: threads.append(threading.current_thread()) or verify(*args))
+    token, _ = issuer.issue()
+
+    asyncio.run(service.verify_async(token))
+    asyncio.run(service.verify_async(token))
+    assert len(threads) == 1
+    assert threads[0] is not threading.main_thread()
+
+def test_verify_endpoints_check_revocation(client, revocations, issuer):
+    token, _ = issuer.issue()
+    revoked, revoked_claims = issuer.issue(sub="bob")
+    revocations.add(revoked_claims["jti"], revoked_claims["exp"])
+
+    assert client.post("/verify", json={"token": token}).json()["claims"]["sub"] == "alice"
+    response = client.post("/verify", json={"token": revoked})
+    assert response.status_code == 401
+    assert "revoked" in response.json()["detail"]
+
+    results = client.post("/verify/batch", json={"tokens": [token, revoked, "garbage"]}).json()["results"]
+    assert [result["valid"] for result in results] == [True, False, False]
+    assert "revoked" in results[1]["error"]
+
+def test_auth_request_does_not_sign_revoked_principals(client, revocations, issuer):
+    token, claims = issuer.issue()
+    response = client.get("/auth", headers={"Authorization": f"Bearer {token}"})
+    assert response.headers["X-Auth-Jti"] == claims["jti"]
+    assert "X-Auth-Signature" in response.headers
+
+    revocations.add(claims["jti"], claims["exp"])
+    response = client.get("/auth", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.headers["X-Auth-Status"] == "anonymous"
+    assert "X-Auth-User" not in response.headers
+    assert client.get("/auth?required=true", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+def test_unavailable_revocation_list(client, revocations, issuer):
+    revocations.loaded = False
+    token, _ = issuer.issue()
+    assert client.post("/verify", json={"token": token}).status_code == 503
+    assert client.post("/verify/batch", json={"tokens": [token]}).status_code == 503
+    # The backend validates pass-through requests itself
+    assert client.get("/auth", headers={"Authorization": f"Bearer {token}"}).headers["X-Auth-Status"] == "anonymous"
+    assert client.get("/auth?required=true", headers={"Authorization": f"Bearer {token}"}).status_code == 503
+
+class FakeRedis:
+    def __init__(self, revoked, log):
+        self.revoked = revoked
+        self.log = log
+
+    async def zrangebyscore(self, key, low, high, withscores=False):
+        if withscores:
+            return [(jti, exp) for jti, exp in self.revoked if exp >= low]
+        return [entry for entry, at in self.log if at >= low]
+
+def test_revocation_list_syncs_from_redis():
+    now = time.time()
+    revocations = RevocationList("redis://unused", clock=lambda: now)
+    revocations._client = FakeRedis(revoked=[("a", now + 60), ("b", now + 600)], log=[])
+    asyncio.run(revocations.load())
+    assert revocations.is_revoked("a") and revocations.is_revoked("b")
+
+    revocations._client.log = [(f"c|{now + 60}", now + 1), ("malformed", now + 1), (f"d|{now - 1}", now + 1)]
+    asyncio.run(revocations.catch_up())
+    assert revocations.is_revoked("c")
+    assert not revocations.is_revoked("d")
+
+    revocations._clock = lambda: now + 120
+    revocations.expire()
+    assert not revocations.is_revoked("a")
+    assert revocations.is_revoked("b")
@@ -0,0 +1,138 @@
+"""
+Token verification with a verified-token cache and signed principal headers
+
+Tokens are verified locally against the backend's JWKS (see jwks_client.py).
+Successful verifications are cached by token digest until the token expires
+or the cache TTL passes, whichever is first, so repeat requests with the same
+token cost a hash and a dict lookup.
+
+Every result, cached or not, is checked against the revocation list (see
+revocations.py), so a revoked token stops verifying as soon as the
+revocation reaches this service. verify_async keeps the event loop free:
+cache misses, which may fetch the JWKS, run in a worker thread.
+
+For nginx auth_request the principal is returned in X-Auth-* headers signed
+with an HMAC shared with the backend (UPSTREAM_AUTH_SECRET); the backend
+accepts them instead of decoding the JWT again. The backend still checks the
+jti against its own revocation denylist.
+"""
+import asyncio
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from jose.exceptions import JWTError
+
+from jwks_client import JWKSVerifier
+from revocations import RevocationList
+
+PRINCIPAL_HEADERS = ("X-Auth-User", "X-Auth-Jti", "X-Auth-Exp", "X-Auth-Issued", "X-Auth-Signature")
+
+def principal_signature(secret: str, username: str, jti: str, exp: int, issued: int) -> str:
+    """HMAC over the principal fields; must match backend/upstream_auth.py"""
+    message = f"{username}|{jti}|{exp}|{issued}".encode()
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified token payloads keyed by token digest"""
+
+    def __init__(self, max_size: int = 100_000, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self._key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token: str, payload: Dict[str, Any]):
+        expires_at = min(float(payload["exp"]), time.time() + self.ttl)
+        with self._lock:
+            self._entries[self._key(token)] = (payload, expires_at)
+            self._entries.move_to_end(self._key(token))
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class TokenVerificationService:
+    """Verifies tokens (cached) and builds signed principal headers"""
+
+    def __init__(self, verifier: JWKSVerifier, cache: VerifiedTokenCache, revocations: RevocationList,
+                 header_secret: Optional[str] = None):
+        self.verifier = verifier
+        self.cache = cache
+        self.revocations = revocations
+        self.header_secret = header_secret
+
+    def _cached(self, token: str, expected_type: str) -> Optional[Dict[str, Any]]:
+        payload = self.cache.get(token)
+        if payload is not None and payload.get("type") != expected_type:
+            raise JWTError(f"Invalid token type. Expected: {expected_type}, Got: {payload.get('type')}")
+        return payload
+
+    def _check_revoked(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Raises JWTError for a revoked token, RevocationListUnavailable if that can't be known"""
+        if self.revocations.is_revoked(payload.get("jti")):
+            raise JWTError("Token has been revoked")
+        return payload
+
+    def verify(self, token: str, expected_type: str = "access") -> Dict[str, Any]:
+        """Verified payload; raises JWTError"""
+        payload = self._cached(token, expected_type)
+        if payload is None:
+            payload = self.verifier.verify(token, expected_type)
+            self.cache.put(token, payload)
+        return self._check_revoked(payload)
+
+    async def verify_async(self, token: str, expected_type: str = "access") -> Dict[str, Any]:
+        """verify() for request handlers: cache hits inline, misses in a worker thread"""
+        payload = self._cached(token, expected_type)
+        if payload is None:
+            payload = await asyncio.to_thread(self.verifier.verify, token, expected_type)
+            self.cache.put(token, payload)
+        return self._check_revoked(payload)
+
+    def verify_many(self, tokens: List[str], expected_type: str = "access") -> List[Dict[str, Any]]:
+        results = []
+        for token in tokens:
+            try:
+                results.append({"valid": True, "claims": self.verify(token, expected_type)})
+            except JWTError as e:
+                results.append({"valid": False, "error": str(e)})
+        return results
+
+    def principal_headers(self, payload: Dict[str, Any]) -> Dict[str, str]:
+        """X-Auth-* headers for a verified access token"""
+        username, jti, exp = payload["sub"], payload["jti"], int(payload["exp"])
+        issued = int(time.time())
+        headers = {
+            "X-Auth-User": username,
+            "X-Auth-Jti": jti,
+            "X-Auth-Exp": str(exp),
+            "X-Auth-Issued": str(issued)
+        }
+        if self.header_secret:
+            headers["X-Auth-Signature"] = principal_signature(self.header_secret, username, jti, exp, issued)
+        return headers